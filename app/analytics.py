@@ -0,0 +1,186 @@
+# 動画データの統計分析（NumPy によるベクトル化）
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+
+from app.models import VideoBatch
+
+# 集計対象のカウンタ（表示名 → 列名）
+COUNTER_COLUMNS = {
+    "views": "view_count",
+    "likes": "like_count",
+    "comments": "comment_count",
+    "shares": "share_count"
+}
+
+# 算出するパーセンタイル
+PERCENTILES = (50, 90, 99)
+
+
+def as_batch(data: Union[Sequence[Dict], VideoBatch]) -> VideoBatch:
+    """APIレスポンスのリストまたは VideoBatch を VideoBatch に揃える"""
+    if isinstance(data, VideoBatch):
+        return data
+    return VideoBatch.from_api_responses(data)
+
+
+def summarize(values: np.ndarray) -> Dict[str, float]:
+    """
+    1列分の要約統計量を計算
+
+    パーセンタイルは np.percentile（内部で部分ソート）でまとめて求める。
+    """
+    if len(values) == 0:
+        return {"count": 0, "sum": 0, "mean": 0.0, "min": 0, "max": 0, "median": 0.0, "p90": 0.0, "p99": 0.0}
+
+    median, p90, p99 = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(len(values)),
+        "sum": values.sum().item(),
+        "mean": float(values.mean()),
+        "min": values.min().item(),
+        "max": values.max().item(),
+        "median": float(median),
+        "p90": float(p90),
+        "p99": float(p99)
+    }
+
+
+def _rate(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """再生数0の動画を0として比率を計算"""
+    return np.divide(
+        numerator, denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0
+    )
+
+
+def _group_totals(group_ids: np.ndarray, size: int, views: np.ndarray, likes: np.ndarray,
+                  interactions: np.ndarray) -> Dict[str, np.ndarray]:
+    """グループIDごとに件数・合計を np.bincount で集計"""
+    return {
+        "videos": np.bincount(group_ids, minlength=size),
+        "views": np.bincount(group_ids, weights=views, minlength=size),
+        "likes": np.bincount(group_ids, weights=likes, minlength=size),
+        "interactions": np.bincount(group_ids, weights=interactions, minlength=size)
+    }
+
+
+def _top_groups(labels: Sequence[str], key: str, totals: Dict[str, np.ndarray], limit: int) -> List[Dict[str, Any]]:
+    """総再生数の多い順に上位グループを返す"""
+    views = totals["views"]
+    if limit < len(views):
+        top = np.argpartition(-views, limit)[:limit]
+    else:
+        top = np.arange(len(views))
+    top = top[np.argsort(-views[top], kind="stable")]
+
+    result = []
+    for i in top:
+        videos = int(totals["videos"][i])
+        if not videos:
+            continue
+        total_views = int(views[i])
+        result.append({
+            key: labels[i],
+            "videos": videos,
+            "total_views": total_views,
+            "total_likes": int(totals["likes"][i]),
+            "avg_views": total_views / videos,
+            "engagement_rate": totals["interactions"][i] / total_views if total_views else 0.0
+        })
+    return result
+
+
+def _explode_hashtags(batch: VideoBatch):
+    """
+    ハッシュタグ列を (行番号, タグID) の組に展開
+
+    文字列の分割は辞書の一意な値に対してのみ行い、行への展開は配列演算で行う。
+    """
+    codes, categories = batch.codes("hashtags")
+    tag_ids: Dict[str, int] = {}
+    category_tags: List[int] = []
+    lengths = np.zeros(len(categories), dtype=np.int64)
+    for i, value in enumerate(categories):
+        tags = [tag for tag in (value or "").split() if tag.startswith("#")]
+        lengths[i] = len(tags)
+        category_tags.extend(tag_ids.setdefault(tag, len(tag_ids)) for tag in tags)
+
+    labels = list(tag_ids)
+    rows = np.flatnonzero(codes >= 0)
+    if not len(rows) or not labels:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), labels
+
+    flat = np.asarray(category_tags, dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    row_codes = codes[rows]
+    row_lengths = lengths[row_codes]
+
+    # 各行のタグ数だけ行番号を繰り返し、行内での位置を足して辞書上の位置を求める
+    repeated_rows = np.repeat(rows, row_lengths)
+    starts = np.repeat(offsets[row_codes], row_lengths)
+    positions = np.arange(row_lengths.sum()) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    return repeated_rows, flat[starts + positions], labels
+
+
+def group_by_creator(batch: VideoBatch, limit: int = 10) -> List[Dict[str, Any]]:
+    """作成者ごとの集計（総再生数の多い順）"""
+    codes, categories = batch.codes("creator_id")
+    valid = codes >= 0
+    views = batch.column("view_count")[valid]
+    likes = batch.column("like_count")[valid]
+    interactions = likes + batch.column("comment_count")[valid] + batch.column("share_count")[valid]
+    totals = _group_totals(codes[valid], len(categories), views, likes, interactions)
+    return _top_groups(categories, "creator_id", totals, limit)
+
+
+def group_by_hashtag(batch: VideoBatch, limit: int = 10) -> List[Dict[str, Any]]:
+    """ハッシュタグごとの集計（1動画に複数のタグがある場合はそれぞれに計上）"""
+    rows, tag_ids, labels = _explode_hashtags(batch)
+    if not labels:
+        return []
+    likes = batch.column("like_count")
+    interactions = likes + batch.column("comment_count") + batch.column("share_count")
+    totals = _group_totals(tag_ids, len(labels), batch.column("view_count")[rows], likes[rows], interactions[rows])
+    return _top_groups(labels, "hashtag", totals, limit)
+
+
+def compute_stats(data: Union[Sequence[Dict], VideoBatch], group_limit: int = 10) -> Dict[str, Any]:
+    """
+    動画データの統計情報をまとめて計算
+
+    各カウンタの件数・合計・平均・中央値・p90・p99、エンゲージメント率といいね率、
+    作成者別・ハッシュタグ別の集計を返す。
+
+    Args:
+        data: APIレスポンスのリストまたは VideoBatch
+        group_limit: 作成者別・ハッシュタグ別に返す上位件数
+
+    Returns:
+        統計情報（total_videos / total_views / total_likes / avg_views / avg_likes は従来と同じ）
+    """
+    batch = as_batch(data)
+    counters = {label: summarize(batch.column(name)) for label, name in COUNTER_COLUMNS.items()}
+
+    views = batch.column("view_count")
+    likes = batch.column("like_count")
+    interactions = likes + batch.column("comment_count") + batch.column("share_count")
+    total_views = counters["views"]["sum"]
+
+    return {
+        "total_videos": len(batch),
+        "total_views": total_views,
+        "total_likes": counters["likes"]["sum"],
+        "avg_views": counters["views"]["mean"],
+        "avg_likes": counters["likes"]["mean"],
+        "counters": counters,
+        "rates": {
+            "engagement_rate": summarize(_rate(interactions, views)),
+            "like_rate": summarize(_rate(likes, views))
+        },
+        # 全体のエンゲージメント率（再生数で重み付け）
+        "overall_engagement_rate": int(interactions.sum()) / total_views if total_views else 0.0,
+        "by_creator": group_by_creator(batch, group_limit),
+        "by_hashtag": group_by_hashtag(batch, group_limit)
+    }
@@ -2,29 +2,28 @@
 import os
 import requests
 from datetime import datetime, timedelta
+import inspect
 import json
 import time
 from app.config import (
     USE_MOCK_API, TIKTOK_API_KEY, TIKTOK_API_SECRET, 
-    TIKTOK_ACCESS_TOKEN, API_RATE_LIMIT, API_RATE_WINDOW, API_BASE_URL
+    TIKTOK_ACCESS_TOKEN, API_RATE_LIMIT, API_RATE_WINDOW, API_BASE_URL,
+    FETCH_MAX_PAGES, FETCH_PAGE_SIZE
 )
 from app.api.exceptions import APIError
 from app.api.mock import MockTikTokAPI
+from app.api.rate_limiter import RateLimiter
+from app.checkpoint import CrawlProgress
+from app.filters import VideoFilter
+from app.profiling import span
+from app.ranking import rank_videos
 import logging
 from typing import Dict, Any, Optional, List
 import webbrowser
 from urllib.parse import urlencode
 
-# ロガーの設定
+# ロガーの設定（出力先は起動時に app.logger.setup_logging で設定する）
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
 
 class TikTokAPIClient:
     """TikTok公式APIのクライアントクラス"""
@@ -35,11 +34,19 @@ class TikTokAPIClient:
         "video.list.basic",     # 動画基本情報
     ]
     
-    def __init__(self):
+    def __init__(self, use_mock: Optional[bool] = None, rate_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            use_mock: モックAPIを使うか（None の場合は環境変数 USE_MOCK_API に従う）
+            rate_limiter: 複数のジョブで共有するレート制限（指定時は上限到達時に待機する）
+        """
         self.logger = logging.getLogger(__name__)
         self.logger.info("TikTokAPIClientが初期化されました")
         
-        self.use_mock = os.getenv("USE_MOCK_API", "true").lower() == "true"
+        if use_mock is None:
+            use_mock = os.getenv("USE_MOCK_API", "true").lower() == "true"
+        self.use_mock = use_mock
+        self.rate_limiter = rate_limiter
         self.mock_client = MockTikTokAPI() if self.use_mock else None
         self.base_url = API_BASE_URL
         self.api_key = os.getenv("TIKTOK_API_KEY")
@@ -57,6 +64,12 @@ class TikTokAPIClient:
     
     def _check_rate_limit(self):
         """レート制限をチェック（600回/分に修正）"""
+        if self.rate_limiter is not None:
+            # 共有のレート制限がある場合は、上限に達したら次のウィンドウまで待機
+            with span("api.rate_limit_wait"):
+                self.rate_limiter.acquire()
+            return
+        
         current_time = datetime.now()
         window_start = current_time - timedelta(seconds=API_RATE_WINDOW)
         
@@ -96,27 +109,30 @@ class TikTokAPIClient:
     async def fetch_videos(self, settings: Dict) -> List[Dict]:
         """設定に基づいてデータを取得"""
         try:
+            video_filter = VideoFilter(
+                min_views=settings.get("min_views", 0),
+                min_likes=settings.get("min_likes", 0),
+                days_ago=settings.get("time_range")
+            )
             if settings["type"] == "hashtag":
                 if not settings.get("hashtag"):
                     # ハッシュタグが空の場合はトレンド動画を取得
                     return await self.get_trending_videos(
                         count=settings["count"],
-                        min_views=settings.get("min_views", 0),
-                        sort_by=settings.get("sort_by", "views")
+                        sort_by=settings.get("sort_by", "views"),
+                        video_filter=video_filter
                     )
                 return await self.get_hashtag_videos(
                     hashtag=settings["hashtag"],
                     count=settings["count"],
-                    min_views=settings.get("min_views", 0),
-                    sort_by=settings.get("sort_by", "views")
+                    sort_by=settings.get("sort_by", "views"),
+                    video_filter=video_filter
                 )
             elif settings["type"] == "trend":
                 return await self.get_trending_videos(
                     count=settings["count"],
-                    min_views=settings["min_views"],
-                    min_likes=settings.get("min_likes", 0),
                     sort_by=settings.get("sort_by", "views"),
-                    days_ago=settings.get("time_range")
+                    video_filter=video_filter
                 )
             elif settings["type"] == "video":
                 videos = []
@@ -127,16 +143,23 @@ class TikTokAPIClient:
                 return videos
                 
         except Exception as e:
-            print(f"データ取得エラー: {e}")
+            logger.error("データ取得エラー: %s", e)
             return []
 
-    async def get_trending_videos(self, count=10, min_views=1000, min_likes=0, sort_by="views", days_ago=None):
-        """トレンド動画の取得"""
+    async def get_trending_videos(self, count=10, min_views=1000, min_likes=0, sort_by="views", days_ago=None,
+                                  video_filter: Optional[VideoFilter] = None, progress: Optional[CrawlProgress] = None):
+        """
+        トレンド動画の取得（絞り込み条件はリクエストに含め、条件に合う動画が count 件になるまでページを取得）
+        
+        progress 指定時はページごとの進捗を記録し、記録済みのカーソルから取得を再開する。
+        """
+        video_filter = video_filter or VideoFilter(min_views=min_views, min_likes=min_likes, days_ago=days_ago)
         if self.use_mock:
             return self.mock_client.get_mock_trending_videos(
                 count=count,
-                min_views=min_views,
-                sort_by=sort_by
+                min_views=video_filter.min_views,
+                sort_by=sort_by,
+                video_filter=video_filter
             )
         
         # 実際のAPI呼び出し
@@ -145,68 +168,30 @@ class TikTokAPIClient:
             "Content-Type": "application/json"
         }
         
-        params = {"fields": "id,desc,createTime,stats,video.playAddr,author.uniqueId"}
-        
-        data = {
-            "max_count": count,
-            "filters": {
-                "stats.viewCount": {"gte": min_views},
-                "like_count": {"gte": min_likes}
-            },
-            "sort_type": sort_by
-        }
-        
-        try:
-            self._check_rate_limit()
-            response = requests.post(
-                f"{self.base_url}video/list/",
-                headers=headers,
-                json=data
-            )
+        def request_page(cursor):
+            data = {
+                "max_count": FETCH_PAGE_SIZE,
+                "filters": video_filter.to_api_filters(),
+                "sort_type": sort_by
+            }
+            if cursor is not None:
+                data["cursor"] = cursor
             
+            self._check_rate_limit()
+            with span("api.request"):
+                response = requests.post(
+                    f"{self.base_url}video/list/",
+                    headers=headers,
+                    json=data
+                )
             self._handle_api_error(response)
-            
-            data = response.json()
-            videos = data.get("data", {}).get("videos", [])
-            
-            # データの変換とフィルタリング
-            formatted_videos = []
-            for video in videos:
-                if video.get("view_count", 0) >= min_views:
-                    formatted_videos.append({
-                        "id": video.get("id"),
-                        "desc": video.get("video_description", ""),
-                        "createTime": datetime.fromisoformat(video.get("create_time")).timestamp(),
-                        "author": {
-                            "uniqueId": video.get("author", {}).get("username", ""),
-                            "nickname": video.get("author", {}).get("display_name", "")
-                        },
-                        "stats": {
-                            "diggCount": video.get("like_count", 0),
-                            "commentCount": video.get("comment_count", 0),
-                            "shareCount": video.get("share_count", 0),
-                            "playCount": video.get("view_count", 0)
-                        },
-                        "music": {
-                            "title": video.get("music_info", {}).get("title", ""),
-                            "authorName": video.get("music_info", {}).get("author", "")
-                        },
-                        "video": {
-                            "playAddr": video.get("embed_link", "")
-                        }
-                    })
-            
-            # ソート
-            if sort_by == "views":
-                formatted_videos.sort(key=lambda x: x["stats"]["playCount"], reverse=True)
-            elif sort_by == "likes":
-                formatted_videos.sort(key=lambda x: x["stats"]["diggCount"], reverse=True)
-            elif sort_by == "comments":
-                formatted_videos.sort(key=lambda x: x["stats"]["commentCount"], reverse=True)
-            elif sort_by == "shares":
-                formatted_videos.sort(key=lambda x: x["stats"]["shareCount"], reverse=True)
-            
-            return formatted_videos[:count]
+            with span("api.parse"):
+                return self._parse_video_page(response.json())
+        
+        try:
+            videos = await self._fetch_until(request_page, video_filter, count, progress=progress)
+            # 上位 count 件を選択
+            return rank_videos(videos, sort_by, count)
             
         except APIError as e:
             logger.error(f"API Error: {e.message}")
@@ -215,6 +200,73 @@ class TikTokAPIClient:
             logger.error(f"Unexpected error: {str(e)}")
             raise APIError("予期せぬエラーが発生しました", 500)
     
+    async def _fetch_until(self, request_page, video_filter: VideoFilter, count: int,
+                           max_pages: int = FETCH_MAX_PAGES, progress: Optional[CrawlProgress] = None) -> List[Dict]:
+        """
+        条件に合う動画が count 件になるか、上限ページ数に達するまでページを取得
+        
+        Args:
+            request_page: カーソルを受け取り (動画リスト, 次のカーソル, 続きがあるか) を返す関数
+            video_filter: API側で絞り込めなかった条件の確認に使う絞り込み条件
+            count: 必要な件数
+            max_pages: 取得するページ数の上限
+            progress: 指定時はページごとに進捗を記録し、記録済みのページは取得しない
+        """
+        if progress is None:
+            matched, cursor, pages = [], None, 0
+        elif progress.exhausted:
+            return list(progress.videos)
+        else:
+            matched, cursor, pages = list(progress.videos), progress.cursor, progress.pages
+        
+        while pages < max_pages:
+            page = request_page(cursor)
+            if inspect.isawaitable(page):
+                page = await page
+            videos, cursor, has_more = page
+            pages += 1
+            page_matched = video_filter.apply(videos)
+            matched.extend(page_matched)
+            done = len(matched) >= count or not has_more
+            if progress is not None:
+                progress.record_page(cursor, page_matched, exhausted=done)
+            if done:
+                break
+        return matched
+    
+    def _parse_video_page(self, result: Dict) -> tuple:
+        """APIレスポンスから (動画リスト, 次のカーソル, 続きがあるか) を取り出す"""
+        data = result.get("data", {})
+        return self._format_video_data(data.get("videos", [])), data.get("cursor"), data.get("has_more", False)
+    
+    def _format_video_data(self, videos: List[Dict]) -> List[Dict]:
+        """公式APIの動画データをアプリ内の形式に変換"""
+        return [
+            {
+                "id": video.get("id"),
+                "desc": video.get("video_description", ""),
+                "createTime": datetime.fromisoformat(video.get("create_time")).timestamp(),
+                "author": {
+                    "uniqueId": video.get("author", {}).get("username", ""),
+                    "nickname": video.get("author", {}).get("display_name", "")
+                },
+                "stats": {
+                    "diggCount": video.get("like_count", 0),
+                    "commentCount": video.get("comment_count", 0),
+                    "shareCount": video.get("share_count", 0),
+                    "playCount": video.get("view_count", 0)
+                },
+                "music": {
+                    "title": video.get("music_info", {}).get("title", ""),
+                    "authorName": video.get("music_info", {}).get("author", "")
+                },
+                "video": {
+                    "playAddr": video.get("embed_link", "")
+                }
+            }
+            for video in videos
+        ]
+    
     def get_user_videos(self, username, count=20, sort_by="views"):
         """
         特定ユーザーの動画を取得する関数
@@ -252,15 +304,15 @@ class TikTokAPIClient:
             )
             
             if user_response.status_code != 200:
-                print(f"ユーザー情報取得エラー: ステータスコード {user_response.status_code}")
-                print(f"レスポンス: {user_response.text}")
+                logger.error("ユーザー情報取得エラー: ステータスコード %s - レスポンス: %s",
+                             user_response.status_code, user_response.text)
                 return []
             
             user_data = user_response.json()
             user_id = user_data.get("data", {}).get("user", {}).get("user_id")
             
             if not user_id:
-                print(f"ユーザーID取得エラー: {username}")
+                logger.error("ユーザーID取得エラー: %s", username)
                 return []
             
             # ユーザーの動画を取得
@@ -278,38 +330,15 @@ class TikTokAPIClient:
             )
             
             if video_response.status_code != 200:
-                print(f"動画取得エラー: ステータスコード {video_response.status_code}")
-                print(f"レスポンス: {video_response.text}")
+                logger.error("動画取得エラー: ステータスコード %s - レスポンス: %s",
+                             video_response.status_code, video_response.text)
                 return []
             
             data = video_response.json()
             videos = data.get("data", {}).get("videos", [])
             
             # データの変換
-            formatted_videos = []
-            for video in videos:
-                formatted_videos.append({
-                    "id": video.get("id"),
-                    "desc": video.get("video_description", ""),
-                    "createTime": datetime.fromisoformat(video.get("create_time")).timestamp(),
-                    "author": {
-                        "uniqueId": video.get("author", {}).get("username", ""),
-                        "nickname": video.get("author", {}).get("display_name", "")
-                    },
-                    "stats": {
-                        "diggCount": video.get("like_count", 0),
-                        "commentCount": video.get("comment_count", 0),
-                        "shareCount": video.get("share_count", 0),
-                        "playCount": video.get("view_count", 0)
-                    },
-                    "music": {
-                        "title": video.get("music_info", {}).get("title", ""),
-                        "authorName": video.get("music_info", {}).get("author", "")
-                    },
-                    "video": {
-                        "playAddr": video.get("embed_link", "")
-                    }
-                })
+            formatted_videos = self._format_video_data(videos)
             
             # エンゲージメント率の計算
             for video in formatted_videos:
@@ -322,30 +351,21 @@ class TikTokAPIClient:
                 video["engagement_rate"] = (likes + comments + shares) / plays if plays > 0 else 0
                 video["like_rate"] = likes / plays if plays > 0 else 0
             
-            # ソート
-            if sort_by == "views":
-                formatted_videos.sort(key=lambda x: x["stats"]["playCount"], reverse=True)
-            elif sort_by == "likes":
-                formatted_videos.sort(key=lambda x: x["stats"]["diggCount"], reverse=True)
-            elif sort_by == "comments":
-                formatted_videos.sort(key=lambda x: x["stats"]["commentCount"], reverse=True)
-            elif sort_by == "date":
-                formatted_videos.sort(key=lambda x: x["createTime"], reverse=True)
-            
-            return formatted_videos[:count]
+            # 上位 count 件を選択
+            return rank_videos(formatted_videos, sort_by, count)
             
         except Exception as e:
-            print(f"ユーザー動画取得エラー: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("ユーザー動画取得エラー: %s", e)
             return []
     
-    async def get_hashtag_videos(self, hashtag, count=20, sort_by="views", min_views=0):
-        """ハッシュタグ付きの動画を取得する関数"""
+    async def get_hashtag_videos(self, hashtag, count=20, sort_by="views", min_views=0,
+                                 video_filter: Optional[VideoFilter] = None, progress: Optional[CrawlProgress] = None):
+        """ハッシュタグ付きの動画を取得する関数（progress 指定時は記録済みのカーソルから再開）"""
+        video_filter = video_filter or VideoFilter(min_views=min_views)
         if self.use_mock:
             # モックデータを使用
             from app.api.mock import get_mock_hashtag_videos
-            return get_mock_hashtag_videos(hashtag, count, sort_by, min_views)
+            return get_mock_hashtag_videos(hashtag, count, sort_by, video_filter.min_views, video_filter)
         
         try:
             endpoint = "video/search/"
@@ -354,38 +374,41 @@ class TikTokAPIClient:
                 "Content-Type": "application/json"
             }
             
-            # APIリクエストのボディ
-            data = {
-                "query": {
-                    "and": [
-                        {
-                            "operation": "EQ",
-                            "field_name": "hashtag_name",
-                            "field_values": [hashtag]
-                        }
-                    ]
-                },
-                "max_count": count
-            }
-            
-            self._check_rate_limit()
-            response = await self.session.post(
-                f"{self.base_url}{endpoint}",
-                headers=headers,
-                json=data
-            )
-            
-            if response.status != 200:
-                raise APIError(f"ハッシュタグ検索エラー: {response.status}", response.status)
-            
-            result = await response.json()
-            videos = result.get("data", {}).get("videos", [])
+            def request_page(cursor):
+                # APIリクエストのボディ（投稿日は検索条件に含め、再生数などは取得後に確認）
+                data = {
+                    "query": {
+                        "and": [
+                            {
+                                "operation": "EQ",
+                                "field_name": "hashtag_name",
+                                "field_values": [hashtag]
+                            },
+                            *video_filter.to_api_conditions()
+                        ]
+                    },
+                    "max_count": FETCH_PAGE_SIZE
+                }
+                if cursor is not None:
+                    data["cursor"] = cursor
+                
+                self._check_rate_limit()
+                with span("api.request"):
+                    response = requests.post(
+                        f"{self.base_url}{endpoint}",
+                        headers=headers,
+                        json=data
+                    )
+                
+                if response.status_code != 200:
+                    raise APIError(f"ハッシュタグ検索エラー: {response.status_code}", response.status_code)
+                with span("api.parse"):
+                    return self._parse_video_page(response.json())
             
-            # データの変換とフィルタリング
-            formatted_videos = self._format_video_data(videos, min_views)
+            videos = await self._fetch_until(request_page, video_filter, count, progress=progress)
             
-            # ソート処理
-            return self._sort_videos(formatted_videos, sort_by)[:count]
+            # 上位 count 件を選択
+            return rank_videos(videos, sort_by, count)
             
         except Exception as e:
             logger.error(f"ハッシュタグ動画取得エラー: {e}")
@@ -422,7 +445,8 @@ class TikTokAPIClient:
             }
             
             self._check_rate_limit()  # レート制限チェックの追加
-            response = requests.post(url, headers=headers, json=data)
+            with span("api.request"):
+                response = requests.post(url, headers=headers, json=data)
             
             if response.status_code == 429:
                 raise APIError("Rate limit exceeded", 429, response)
@@ -440,6 +464,45 @@ class TikTokAPIClient:
         except Exception as e:
             raise APIError(f"Unexpected error: {str(e)}", None)
 
+    async def get_videos_by_ids(self, video_ids: List[str]) -> List[Dict]:
+        """
+        複数の動画IDの動画をまとめて取得する
+        
+        Args:
+            video_ids: 取得する動画のIDのリスト（FETCH_PAGE_SIZE 件ごとに1リクエストで取得）
+            
+        Returns:
+            取得できた動画データのリスト
+        """
+        if self.use_mock:
+            from app.api.mock import get_mock_video_by_id
+            videos = [get_mock_video_by_id(video_id) for video_id in video_ids]
+            return [video for video in videos if video]
+        
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json"
+        }
+        video_ids = list(video_ids)
+        videos = []
+        for start in range(0, len(video_ids), FETCH_PAGE_SIZE):
+            data = {
+                "filters": {
+                    "video_ids": video_ids[start:start + FETCH_PAGE_SIZE]
+                },
+                "fields": ["id", "video_description", "create_time", "author", "music_info", "embed_link",
+                          "like_count", "comment_count", "share_count", "view_count"]
+            }
+            
+            self._check_rate_limit()
+            with span("api.request"):
+                response = requests.post(f"{self.base_url}video/query/", headers=headers, json=data)
+            self._handle_api_error(response)
+            with span("api.parse"):
+                page, _, _ = self._parse_video_page(response.json())
+            videos.extend(page)
+        return videos
+
     def _handle_error_response(self, response):
         """APIエラーレスポンスを処理"""
         try:
@@ -1,11 +1,27 @@
 # モックデータを提供するモジュール
 import json
+import logging
 import os
 import random
+import threading
 from datetime import datetime, timedelta
 import time
 from typing import List, Dict, Any, Optional
+import numpy as np
 from app.api.exceptions import APIError  # client.pyではなくexceptions.pyからインポート
+from app.filters import VideoFilter
+from app.logger import SampledLogger
+from app.models import HASHTAG_PATTERN
+from app.ranking import rank_videos
+
+logger = logging.getLogger(__name__)
+# 動画ごとの取得ログ（特定動画の取得では動画の数だけ発生するため出力数を制限する）。
+# 多く発生するログが他のログの出力枠を使い切らないよう、ログの種類ごとに制限する
+_lookup_log = SampledLogger(logger)
+_found_by_id_log = SampledLogger(logger)
+_found_by_url_log = SampledLogger(logger)
+_not_found_log = SampledLogger(logger)
+_generated_log = SampledLogger(logger)
 
 # モックデータファイルのパス
 MOCK_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'mock_videos.json')
@@ -17,7 +33,7 @@ def load_mock_data() -> List[Dict[str, Any]]:
         with open(data_path, 'r', encoding='utf-8') as file:
             return json.load(file)
     except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"モックデータ読み込みエラー: {e}")
+        logger.warning("モックデータ読み込みエラー: %s", e)
         # 基本的なモックデータを返す
         return generate_mock_data(30)
 
@@ -75,30 +91,132 @@ def generate_mock_data(count: int = 30) -> List[Dict[str, Any]]:
         os.makedirs(data_dir, exist_ok=True)
         data_path = os.path.join(data_dir, "mock_videos.json")
         
-        with open(data_path, 'w', encoding='utf-8') as file:
+        # 並行して読み込まれても書きかけのファイルが見えないよう、一時ファイルから置き換える
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
             json.dump(videos, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, data_path)
         
-        print(f"生成したモックデータを {data_path} に保存しました")
+        logger.info("生成したモックデータを %s に保存しました", data_path)
     except Exception as e:
-        print(f"モックデータ保存エラー: {e}")
+        logger.error("モックデータ保存エラー: %s", e)
     
     return videos
 
-def get_mock_trending_videos(count=10, sort_by="views", min_views=0):
-    """モックのトレンド動画データを生成"""
-    videos = generate_mock_data(count * 2)  # フィルタリング用に多めに生成
+class MockVideoStore:
+    """
+    モックデータの検索用インデックス
+
+    再生数・いいね数・投稿日時のソート済み配列とハッシュタグの転置インデックスを持ち、
+    絞り込み条件のうち最も件数の少ない範囲を起点に候補を選ぶ。
+    """
+
+    def __init__(self, videos: List[Dict[str, Any]]):
+        self.videos = videos
+        self.columns = {
+            "views": np.array([v.get("stats", {}).get("playCount", 0) for v in videos], dtype=np.int64),
+            "likes": np.array([v.get("stats", {}).get("diggCount", 0) for v in videos], dtype=np.int64),
+            "created": np.array([v.get("createTime", 0) for v in videos], dtype=np.float64)
+        }
+        self.orders = {name: np.argsort(values, kind="stable") for name, values in self.columns.items()}
+        self.sorted = {name: self.columns[name][order] for name, order in self.orders.items()}
+
+        hashtags: Dict[str, List[int]] = {}
+        for i, video in enumerate(videos):
+            for tag in set(HASHTAG_PATTERN.findall(video.get("desc") or "")):
+                hashtags.setdefault(tag, []).append(i)
+        self.hashtags = {tag: np.array(positions) for tag, positions in hashtags.items()}
+
+    def _range(self, name: str, lower) -> np.ndarray:
+        """列の値が lower 以上の位置（ソート済み配列の二分探索）"""
+        start = np.searchsorted(self.sorted[name], lower, side="left")
+        return self.orders[name][start:]
+
+    def query(self, video_filter: VideoFilter, hashtag: Optional[str] = None) -> List[Dict[str, Any]]:
+        """条件を満たす動画を元の順序で返す"""
+        bounds = {"views": video_filter.min_views, "likes": video_filter.min_likes}
+        created_after = video_filter.created_after
+        if created_after:
+            bounds["created"] = created_after.timestamp()
+
+        ranges = [self._range(name, lower) for name, lower in bounds.items()]
+        if hashtag:
+            ranges.append(self.hashtags.get(hashtag.lstrip("#"), np.zeros(0, dtype=np.int64)))
+
+        # 最も小さい候補集合を起点に、残りの条件は列の値で判定する
+        candidates = np.sort(min(ranges, key=len))
+        mask = np.ones(len(candidates), dtype=bool)
+        for name, lower in bounds.items():
+            mask &= self.columns[name][candidates] >= lower
+        if hashtag:
+            mask &= np.isin(candidates, ranges[-1])
+        return [self.videos[i] for i in candidates[mask]]
+
+
+_mock_store: Optional[MockVideoStore] = None
+_mock_store_mtime: Optional[float] = None
+
+def get_mock_store() -> MockVideoStore:
+    """モックデータファイルのインデックスを返す（ファイルが更新された場合は作り直す）"""
+    global _mock_store, _mock_store_mtime
+    mtime = os.path.getmtime(MOCK_DATA_FILE) if os.path.exists(MOCK_DATA_FILE) else None
+    if _mock_store is None or mtime != _mock_store_mtime:
+        _mock_store = MockVideoStore(load_mock_data())
+        _mock_store_mtime = mtime
+    return _mock_store
+
+def _generate_matching_videos(count: int, video_filter: VideoFilter, hashtag: Optional[str] = None) -> List[Dict[str, Any]]:
+    """絞り込み条件（再生数・いいね数・投稿日）を満たすモックの動画を count 件生成（インデックスの件数が足りない場合の補充用）"""
+    extra_videos = []
+    now = datetime.now()
     
-    # フィルタリングと並び替え
-    filtered_videos = [v for v in videos if v["stats"]["playCount"] >= min_views]
+    creators = ["人気クリエイター", "おもしろクリエイター", "料理の達人", "ダンサー", "メイク職人"]
     
-    if sort_by == "views":
-        filtered_videos.sort(key=lambda x: x["stats"]["playCount"], reverse=True)
-    elif sort_by == "likes":
-        filtered_videos.sort(key=lambda x: x["stats"]["diggCount"], reverse=True)
-    elif sort_by == "date":
-        filtered_videos.sort(key=lambda x: x["createTime"], reverse=True)
+    for i in range(count):
+        creator_idx = i % len(creators)
+        views = random.randint(max(video_filter.min_views, 10000), max(video_filter.min_views, 1000000))
+        # 追加分も絞り込み条件（投稿日・いいね数）を満たすように生成
+        max_days = min(14, video_filter.days_ago - 1) if video_filter.days_ago else 14
+        post_date = now - timedelta(days=random.randint(0, max(max_days, 0)))
+        
+        hashtag_text = f"#{hashtag}" if hashtag else "#人気 #トレンド"
         
-    return filtered_videos[:count]
+        extra_videos.append({
+            "id": f"hashtag_{hashtag or 'trend'}_{i:04d}",
+            "desc": f"{hashtag_text} 関連動画 #{i+1}",
+            "createTime": int(post_date.timestamp()),
+            "author": {
+                "uniqueId": f"creator_{creator_idx}",
+                "nickname": creators[creator_idx]
+            },
+            "stats": {
+                "diggCount": max(int(views * random.uniform(0.1, 0.3)), video_filter.min_likes),
+                "commentCount": int(views * random.uniform(0.01, 0.05)),
+                "shareCount": int(views * random.uniform(0.03, 0.1)),
+                "playCount": views
+            },
+            "music": {
+                "title": f"#{hashtag or 'トレンド'}で人気の曲{i+1}",
+                "authorName": "トレンドアーティスト"
+            },
+            "video": {
+                "playAddr": f"https://example.com/hashtag/{hashtag or 'trend'}/video{i+1}"
+            }
+        })
+    
+    return video_filter.apply(extra_videos)
+
+def get_mock_trending_videos(count=10, sort_by="views", min_views=0, video_filter: Optional[VideoFilter] = None):
+    """
+    モックのトレンド動画を取得（条件はインデックスで絞り込み、件数が足りない場合は条件を満たす動画を補充）
+    """
+    video_filter = video_filter or VideoFilter(min_views=min_views)
+    filtered_videos = get_mock_store().query(video_filter)
+    if len(filtered_videos) < count:
+        filtered_videos.extend(_generate_matching_videos(count - len(filtered_videos), video_filter))
+    
+    # 上位 count 件を選択
+    return rank_videos(filtered_videos, sort_by, count)
 
 def get_mock_user_videos(username: str, count: int = 20, sort_by: str = "views") -> List[Dict[str, Any]]:
     """
@@ -112,7 +230,7 @@ def get_mock_user_videos(username: str, count: int = 20, sort_by: str = "views")
     Returns:
         動画データのリスト
     """
-    print(f"モックデータから {username} の動画を取得します... ソート: {sort_by}")
+    logger.info("モックデータから %s の動画を取得します... ソート: %s", username, sort_by)
     
     # モックデータの読み込み
     all_videos = load_mock_data()
@@ -156,26 +274,16 @@ def get_mock_user_videos(username: str, count: int = 20, sort_by: str = "views")
         
         filtered_videos.extend(extra_videos)
     
-    # ソート
-    if sort_by == "views":
-        filtered_videos.sort(key=lambda x: x["stats"]["playCount"], reverse=True)
-    elif sort_by == "likes":
-        filtered_videos.sort(key=lambda x: x["stats"]["diggCount"], reverse=True)
-    elif sort_by == "comments":
-        filtered_videos.sort(key=lambda x: x["stats"]["commentCount"], reverse=True)
-    elif sort_by == "date":
-        filtered_videos.sort(key=lambda x: x["createTime"], reverse=True)
-    
-    # 指定の数まで切り詰める
-    result_videos = filtered_videos[:count]
+    # 上位 count 件を選択
+    result_videos = rank_videos(filtered_videos, sort_by, count)
     
     # 遅延をシミュレート
     time.sleep(0.5)
     
-    print(f"{len(result_videos)}件の {username} の動画を取得しました")
+    logger.info("%d件の %s の動画を取得しました", len(result_videos), username)
     return result_videos
 
-def get_mock_hashtag_videos(hashtag, count=20, sort_by="views", min_views=0):
+def get_mock_hashtag_videos(hashtag, count=20, sort_by="views", min_views=0, video_filter: Optional[VideoFilter] = None):
     """
     モックの特定ハッシュタグの動画を取得する関数
     
@@ -184,85 +292,35 @@ def get_mock_hashtag_videos(hashtag, count=20, sort_by="views", min_views=0):
         count: 取得する動画数
         sort_by: ソート基準 ("views", "likes", "comments")
         min_views: 最小再生回数
+        video_filter: 絞り込み条件（指定時は min_views より優先）
         
     Returns:
         動画データのリスト
     """
+    video_filter = video_filter or VideoFilter(min_views=min_views)
+    min_views = video_filter.min_views
     if not hashtag:
-        print(f"モックデータから全てのハッシュタグの動画を取得します... ソート: {sort_by}, 最小再生回数: {min_views}")
+        logger.info("モックデータから全てのハッシュタグの動画を取得します... ソート: %s, 最小再生回数: %s", sort_by, min_views)
     else:
-        print(f"モックデータから #{hashtag} の動画を取得します... ソート: {sort_by}, 最小再生回数: {min_views}")
+        logger.info("モックデータから #%s の動画を取得します... ソート: %s, 最小再生回数: %s", hashtag, sort_by, min_views)
     
-    # モックデータの読み込み
-    all_videos = load_mock_data()
-    
-    # ハッシュタグに基づくフィルタリング
-    if hashtag:
-        tag = f"#{hashtag}"
-        filtered_videos = [v for v in all_videos if tag in v["desc"] and v["stats"]["playCount"] >= min_views]
-    else:
-        # ハッシュタグが指定されていない場合は、再生回数のみでフィルタリング
-        filtered_videos = [v for v in all_videos if v["stats"]["playCount"] >= min_views]
+    # ハッシュタグ・再生数などの条件でインデックスから絞り込み
+    filtered_videos = get_mock_store().query(video_filter, hashtag or None)
     
-    # データが少ない場合は追加生成
+    # データが少ない場合は条件を満たす動画を追加生成
     if len(filtered_videos) < count:
-        extra_videos = []
-        now = datetime.now()
-        
-        creators = ["人気クリエイター", "おもしろクリエイター", "料理の達人", "ダンサー", "メイク職人"]
-        
-        for i in range(count - len(filtered_videos)):
-            creator_idx = i % len(creators)
-            views = random.randint(max(min_views, 10000), 1000000)
-            post_date = now - timedelta(days=random.randint(0, 14))
-            
-            hashtag_text = f"#{hashtag}" if hashtag else "#人気 #トレンド"
-            
-            extra_videos.append({
-                "id": f"hashtag_{hashtag or 'trend'}_{i:04d}",
-                "desc": f"{hashtag_text} 関連動画 #{i+1}",
-                "createTime": int(post_date.timestamp()),
-                "author": {
-                    "uniqueId": f"creator_{creator_idx}",
-                    "nickname": creators[creator_idx]
-                },
-                "stats": {
-                    "diggCount": int(views * random.uniform(0.1, 0.3)),
-                    "commentCount": int(views * random.uniform(0.01, 0.05)),
-                    "shareCount": int(views * random.uniform(0.03, 0.1)),
-                    "playCount": views
-                },
-                "music": {
-                    "title": f"#{hashtag or 'トレンド'}で人気の曲{i+1}",
-                    "authorName": "トレンドアーティスト"
-                },
-                "video": {
-                    "playAddr": f"https://example.com/hashtag/{hashtag or 'trend'}/video{i+1}"
-                }
-            })
-        
-        filtered_videos.extend(extra_videos)
-    
-    # ソート
-    if sort_by == "views":
-        filtered_videos.sort(key=lambda x: x["stats"]["playCount"], reverse=True)
-    elif sort_by == "likes":
-        filtered_videos.sort(key=lambda x: x["stats"]["diggCount"], reverse=True)
-    elif sort_by == "comments":
-        filtered_videos.sort(key=lambda x: x["stats"]["commentCount"], reverse=True)
-    elif sort_by == "date":
-        filtered_videos.sort(key=lambda x: x["createTime"], reverse=True)
+        filtered_videos.extend(_generate_matching_videos(count - len(filtered_videos), video_filter, hashtag or None))
     
-    # 指定の数まで切り詰める
-    result_videos = filtered_videos[:count]
+    # 上位 count 件を選択
+    result_videos = rank_videos(filtered_videos, sort_by, count)
     
     # 遅延をシミュレート
     time.sleep(0.5)
     
     if not hashtag:
-        print(f"{len(result_videos)}件のトレンド動画を取得しました")
+        logger.info("%d件のトレンド動画を取得しました", len(result_videos))
     else:
-        print(f"{len(result_videos)}件の #{hashtag} の動画を取得しました")
+        logger.info("%d件の #%s の動画を取得しました", len(result_videos), hashtag)
     
     return result_videos
 
@@ -276,7 +334,7 @@ def get_mock_video_by_id(video_id):
     Returns:
         動画データ（見つからない場合はNone）
     """
-    print(f"モックデータから動画ID/URL: {video_id} の動画を取得します...")
+    _lookup_log.debug("モックデータから動画ID/URL: %s の動画を取得します...", video_id)
     
     # モックデータの読み込み
     all_videos = load_mock_data()
@@ -285,15 +343,15 @@ def get_mock_video_by_id(video_id):
     for video in all_videos:
         # IDでの検索
         if str(video.get("id", "")) == str(video_id):
-            print(f"動画ID: {video_id} の動画を取得しました")
+            _found_by_id_log.debug("動画ID: %s の動画を取得しました", video_id)
             return video
         
         # URLでの検索
         if video.get("video", {}).get("playAddr", "") == video_id:
-            print(f"動画URL: {video_id} の動画を取得しました")
+            _found_by_url_log.debug("動画URL: %s の動画を取得しました", video_id)
             return video
     
-    print(f"動画ID/URL: {video_id} の動画は見つかりませんでした")
+    _not_found_log.info("動画ID/URL: %s の動画は見つかりませんでした", video_id)
     
     # 見つからない場合はランダムに生成したモックデータを返す（デモ用）
     if video_id.isdigit():
@@ -327,7 +385,7 @@ def get_mock_video_by_id(video_id):
                 "playAddr": f"https://example.com/video/{video_id}"
             }
         }
-        print(f"動画ID: {video_id} のダミーデータを生成しました")
+        _generated_log.info("動画ID: %s のダミーデータを生成しました", video_id)
         return mock_video
     
     return None
@@ -350,21 +408,21 @@ class MockTikTokAPI:
         if self.requests_count > 1000:
             raise APIError("Mock rate limit exceeded", 429)
 
-    def get_mock_trending_videos(self, count=10, min_views=0, sort_by="views"):
+    def get_mock_trending_videos(self, count=10, min_views=0, sort_by="views", video_filter=None):
         """モックのトレンド動画を取得する関数"""
         # レート制限チェックの追加が必要
         self._check_mock_rate_limit()
-        return get_mock_trending_videos(count, sort_by, min_views)
+        return get_mock_trending_videos(count, sort_by, min_views, video_filter)
     
     def get_mock_user_videos(self, username, count=20, sort_by="views"):
         """モックの特定ユーザーの動画を取得する関数"""
         self._check_mock_rate_limit()
         return get_mock_user_videos(username, count, sort_by)
         
-    def get_mock_hashtag_videos(self, hashtag, count=20, sort_by="views", min_views=0):
+    def get_mock_hashtag_videos(self, hashtag, count=20, sort_by="views", min_views=0, video_filter=None):
         """モックの特定ハッシュタグの動画を取得する関数"""
         self._check_mock_rate_limit()
-        return get_mock_hashtag_videos(hashtag, count, sort_by, min_views)
+        return get_mock_hashtag_videos(hashtag, count, sort_by, min_views, video_filter)
         
     def get_mock_video_by_id(self, video_id):
         """モックの特定動画IDから動画を取得する関数"""
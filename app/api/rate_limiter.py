@@ -0,0 +1,35 @@
+# 複数のジョブ・スレッドで共有するAPIのレート制限
+import threading
+import time
+
+from app.config import API_RATE_LIMIT, API_RATE_WINDOW
+
+
+class RateLimiter:
+    """
+    固定ウィンドウ方式のレート制限（スレッドセーフ）
+
+    ウィンドウ内のリクエスト数が上限に達した場合は、例外にせず
+    次のウィンドウが始まるまで待機する。
+    """
+
+    def __init__(self, limit: int = API_RATE_LIMIT, window: float = API_RATE_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._count = 0
+        self._reset_at = 0.0
+
+    def acquire(self, requests: int = 1):
+        """requests 回分のリクエスト枠を確保する（必要に応じて待機）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._reset_at:
+                    self._count = 0
+                    self._reset_at = now + self.window
+                if self._count + requests <= self.limit or self._count == 0:
+                    self._count += requests
+                    return
+                wait = self._reset_at - now
+            time.sleep(wait)
@@ -0,0 +1,131 @@
+# 対話モードのセッション中に取得した結果を保持するキャッシュ（並び替え・絞り込み・統計をAPIを呼ばずに行う）
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.filters import VideoFilter
+from app.models import VideoBatch
+from app.ranking import rank_indices
+
+# 動画の内容が変わったかの判定に使う項目
+_CHANGE_KEYS = ("playCount", "diggCount", "commentCount", "shareCount")
+
+
+def query_key(settings: Dict[str, Any]) -> Tuple:
+    """取得設定のうち取得対象を表す部分（並び順・件数・絞り込み条件は含めない）"""
+    if settings["type"] == "video":
+        return ("video", tuple(settings.get("video_ids", [])))
+    if settings["type"] == "hashtag" and settings.get("hashtag"):
+        return ("hashtag", settings["hashtag"].lstrip("#"))
+    return ("trend",)
+
+
+def settings_filter(settings: Dict[str, Any]) -> VideoFilter:
+    """取得設定の絞り込み条件"""
+    return VideoFilter(
+        min_views=settings.get("min_views", 0),
+        min_likes=settings.get("min_likes", 0),
+        days_ago=settings.get("time_range")
+    )
+
+
+def _covers(fetched: VideoFilter, requested: VideoFilter) -> bool:
+    """fetched の条件で取得した結果に requested の条件の動画がすべて含まれるか"""
+    if requested.min_views < fetched.min_views or requested.min_likes < fetched.min_likes:
+        return False
+    if fetched.days_ago:
+        return bool(requested.days_ago) and requested.days_ago <= fetched.days_ago
+    return True
+
+
+def _is_changed(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    old_stats, new_stats = old.get("stats", {}), new.get("stats", {})
+    return any(old_stats.get(key) != new_stats.get(key) for key in _CHANGE_KEYS)
+
+
+@dataclass
+class CachedResult:
+    """1つの取得対象の取得結果（APIレスポンスと、同じ順序の列指向のバッチ）"""
+
+    videos: List[Dict[str, Any]]
+    batch: VideoBatch
+    fetched_filter: VideoFilter
+    fetched_count: int
+
+    @classmethod
+    def create(cls, videos: List[Dict[str, Any]], settings: Dict[str, Any]) -> "CachedResult":
+        return cls(
+            videos=list(videos),
+            batch=VideoBatch.from_api_responses(videos),
+            fetched_filter=settings_filter(settings),
+            fetched_count=settings.get("count") or len(videos)
+        )
+
+    def can_serve(self, settings: Dict[str, Any]) -> bool:
+        """
+        取得し直さずに設定どおりの結果を返せるか
+
+        条件が取得時と同じか厳しく、かつ条件に合う動画が件数分あるか、
+        取得時に件数分の動画がなかった（それ以上は存在しない）場合に返せる。
+        """
+        video_filter = settings_filter(settings)
+        if not _covers(self.fetched_filter, video_filter):
+            return False
+        count = settings.get("count") or len(self.videos)
+        exhausted = len(self.videos) < self.fetched_count
+        return exhausted or int(video_filter.mask(self.batch).sum()) >= count
+
+    def select(self, settings: Dict[str, Any]) -> np.ndarray:
+        """設定の絞り込み・並び順・件数に合う行の位置（並び順の指定がなければ取得順）"""
+        matched = np.flatnonzero(settings_filter(settings).mask(self.batch))
+        order = rank_indices(self.batch.take(matched), settings.get("sort_by") or [], settings.get("count"))
+        return matched[order]
+
+    def view(self, settings: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], VideoBatch]:
+        """設定に合う動画を APIレスポンスのリストとバッチで返す"""
+        indices = self.select(settings)
+        return [self.videos[i] for i in indices], self.batch.take(indices)
+
+    def merge(self, videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        再取得した動画を取り込み、新しい動画と内容が変わった動画だけを返す
+
+        既存の動画は最新の値に置き換え、取得順の末尾に新しい動画を追加する。
+        """
+        positions = {video["id"]: i for i, video in enumerate(self.videos)}
+        updated = []
+        for video in videos:
+            position = positions.get(video["id"])
+            if position is None:
+                positions[video["id"]] = len(self.videos)
+                self.videos.append(video)
+                updated.append(video)
+            elif _is_changed(self.videos[position], video):
+                self.videos[position] = video
+                updated.append(video)
+        if updated:
+            self.batch = VideoBatch.from_api_responses(self.videos)
+        return updated
+
+
+class SessionCache:
+    """取得対象ごとの取得結果のキャッシュ（対話モードのセッション中のみ保持）"""
+
+    def __init__(self):
+        self.results: Dict[Tuple, CachedResult] = {}
+
+    def get(self, settings: Dict[str, Any]) -> Optional[CachedResult]:
+        return self.results.get(query_key(settings))
+
+    def lookup(self, settings: Dict[str, Any]) -> Optional[CachedResult]:
+        """取得し直さずに返せる場合のみキャッシュを返す"""
+        result = self.get(settings)
+        if result is not None and result.can_serve(settings):
+            return result
+        return None
+
+    def store(self, settings: Dict[str, Any], videos: List[Dict[str, Any]]) -> CachedResult:
+        result = CachedResult.create(videos, settings)
+        self.results[query_key(settings)] = result
+        return result
@@ -0,0 +1,209 @@
+# 長時間の取得を途中から再開するためのチェックポイント（ページングのカーソル・完了した項目・未保存のデータ）
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.config import CRAWL_CHECKPOINT_DIR
+
+
+class CrawlProgress:
+    """
+    1件の取得（ジョブ・コマンド）の進捗
+
+    ページを取得するたびに次のカーソルとそのページで条件に合った動画を、保存前には
+    取得結果を未保存データとしてチェックポイントに追記する。
+    """
+
+    def __init__(self, checkpoint: "CrawlCheckpoint", key: str):
+        self.checkpoint = checkpoint
+        self.key = key
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return self.checkpoint.items.get(self.key, {})
+
+    @property
+    def cursor(self) -> Any:
+        """次に取得するページのカーソル（未取得の場合は None）"""
+        return self.state.get("cursor")
+
+    @property
+    def pages(self) -> int:
+        """取得済みのページ数"""
+        return self.state.get("pages", 0)
+
+    @property
+    def videos(self) -> List[Dict[str, Any]]:
+        """取得済みのページで条件に合った動画"""
+        return self.state.get("videos", [])
+
+    @property
+    def exhausted(self) -> bool:
+        """ページングが終わっているか（件数に達したか、続きがない）"""
+        return self.state.get("exhausted", False)
+
+    @property
+    def pending(self) -> Optional[List[Dict[str, Any]]]:
+        """取得を終えてまだ保存していない動画（なければ None）"""
+        return self.state.get("pending")
+
+    @property
+    def saved(self) -> bool:
+        return self.state.get("saved", False)
+
+    def record_page(self, cursor: Any, videos: List[Dict[str, Any]], exhausted: bool = False):
+        """1ページ分の取得を記録（videos はこのページで条件に合った動画のみ）"""
+        self.checkpoint.append_page(self.key, cursor, videos, exhausted)
+
+    def set_pending(self, videos: List[Dict[str, Any]]):
+        """取得結果を未保存データとして記録（ページングの途中経過は不要になるので消す）"""
+        self.checkpoint.replace(self.key, {"pending": videos})
+
+    def mark_saved(self):
+        """未保存データをデータベースに保存したことを記録"""
+        self.checkpoint.update(self.key, saved=True)
+
+    def complete(self):
+        """取得と保存が完了したことを記録（取得結果は保持しない）"""
+        self.checkpoint.replace(self.key, {"completed": True})
+
+
+def _fsync_directory(directory: str):
+    """ファイルの作成・置き換え・削除をディレクトリのエントリーごと永続化する"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CrawlCheckpoint:
+    """
+    取得全体のチェックポイント（取得条件ごとの JSON Lines ファイル）
+
+    ファイル名は取得条件から作る crawl_id なので、条件の異なる取得が互いの
+    チェックポイントを上書きしない。更新は状態全体を書き直さず、ページ・状態の
+    変更を1行ずつ追記して fsync し、開く時に先頭から再生して状態を復元する
+    （書き込み途中で落ちた最後の行は読み飛ばす）。更新は複数のワーカースレッドから
+    行われるのでロックする。
+    """
+
+    def __init__(self, crawl_id: str, directory: str = CRAWL_CHECKPOINT_DIR,
+                 items: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.crawl_id = crawl_id
+        self.directory = directory
+        self.path = os.path.join(directory, f"{crawl_id}.jsonl")
+        self.items: Dict[str, Dict[str, Any]] = items or {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_id(params: Dict[str, Any]) -> str:
+        """取得条件からチェックポイントのIDを作る"""
+        encoded = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def open(cls, params: Dict[str, Any], resume: bool = False, directory: str = CRAWL_CHECKPOINT_DIR) -> "CrawlCheckpoint":
+        """
+        取得条件に対応するチェックポイントを開く
+
+        resume が真で、同じ条件のチェックポイントがあれば続きから、
+        それ以外は空の状態から始める（他の条件のチェックポイントには触れない）。
+        """
+        checkpoint = cls(cls.make_id(params), directory)
+        if resume:
+            if os.path.exists(checkpoint.path):
+                checkpoint._load()
+                print(f"チェックポイントから再開します（完了済み {checkpoint.completed_count}件）")
+                return checkpoint
+            print("同じ取得条件のチェックポイントがないため最初から取得します")
+        checkpoint._create()
+        return checkpoint
+
+    @property
+    def completed_count(self) -> int:
+        return sum(1 for state in self.items.values() if state.get("completed"))
+
+    def is_completed(self, key: str) -> bool:
+        return self.items.get(key, {}).get("completed", False)
+
+    def progress(self, key: str) -> CrawlProgress:
+        return CrawlProgress(self, key)
+
+    @staticmethod
+    def _apply(items: Dict[str, Dict[str, Any]], record: Dict[str, Any]):
+        """追記した1行を状態に反映"""
+        key = record["key"]
+        if "page" in record:
+            page = record["page"]
+            state = items.setdefault(key, {})
+            state.setdefault("videos", []).extend(page["videos"])
+            state["cursor"] = page["cursor"]
+            state["pages"] = state.get("pages", 0) + 1
+            state["exhausted"] = page["exhausted"]
+        elif "replace" in record:
+            items[key] = record["replace"]
+        else:
+            items[key] = {**items.get(key, {}), **record["update"]}
+
+    def _load(self):
+        """追記した行を再生して状態を復元（書き込み途中で中断した末尾は切り詰める）"""
+        valid = 0
+        with open(self.path, "rb+") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(self.items, record)
+                valid += len(line)
+            f.truncate(valid)
+
+    def _create(self):
+        """空のチェックポイントを作る（一意な一時ファイルに書いてから置き換える）"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{self.crawl_id}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _fsync_directory(self.directory)
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            self._apply(self.items, record)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append_page(self, key: str, cursor: Any, videos: List[Dict[str, Any]], exhausted: bool):
+        """1ページ分の取得を追記"""
+        self._append({"key": key, "page": {"cursor": cursor, "videos": videos, "exhausted": exhausted}})
+
+    def update(self, key: str, **values):
+        """項目の状態の一部を更新"""
+        self._append({"key": key, "update": values})
+
+    def replace(self, key: str, state: Dict[str, Any]):
+        """項目の状態を置き換え"""
+        self._append({"key": key, "replace": state})
+
+    def clear(self):
+        """取得がすべて完了した場合にチェックポイントを削除"""
+        with self._lock:
+            self.items = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                _fsync_directory(self.directory)
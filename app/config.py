@@ -22,11 +22,27 @@ API_RATE_LIMIT = 600  # 1分あたりのリクエスト上限（TikTok公式の
 API_RATE_WINDOW = 60  # レート制限のウィンドウ（秒）
 
 # データ保持期間
-DATA_RETENTION_DAYS = 30
+DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", 30))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 1000))  # 1トランザクションで削除する行数
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", 0.1))  # バッチ間の待機秒数
 
 # プライバシー設定
-ANONYMIZE_DATA = True
-ENCRYPT_STORAGE = True
+ANONYMIZE_DATA = os.getenv("ANONYMIZE_DATA", "false").lower() == "true"  # 保存前に作成者情報を仮名化
+ENCRYPT_STORAGE = os.getenv("ENCRYPT_STORAGE", "true").lower() == "true"  # 保存時に ENCRYPTED_COLUMNS を暗号化
+ENCRYPTED_COLUMNS = tuple(
+    c.strip() for c in os.getenv("ENCRYPTED_COLUMNS", "description").split(",") if c.strip()
+)  # 暗号化する videos の列（暗号化後は元の値より長くなるため TEXT 列を推奨）
+ENCRYPTION_KEY_FILE = os.getenv(
+    "ENCRYPTION_KEY_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", ".encryption_key")
+)  # ENCRYPTION_KEY 未設定時に使う鍵ファイル
+ENCRYPT_WORKERS = int(os.getenv("ENCRYPT_WORKERS", os.cpu_count() or 1))
+ENCRYPT_PARALLEL_THRESHOLD = 20000  # この件数以上はプロセスプールで並列に暗号化
+PSEUDONYM_CACHE_SIZE = 100000  # 仮名化済みIDのキャッシュ件数
+PSEUDONYM_KEY_FILE = os.getenv(
+    "PSEUDONYM_KEY_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", ".pseudonym_key")
+)  # PSEUDONYM_KEY 未設定時に使う鍵ファイル
 
 # 追加が必要な設定
 REDIRECT_URI = os.getenv("REDIRECT_URI", "http://localhost:3000/auth/callback")  # 開発環境用 
@@ -45,9 +61,70 @@ APP_DESCRIPTION = """
 # API設定
 API_BASE_URL = "https://open.tiktokapis.com/v2/"
 API_TIMEOUT = 30  # seconds
+FETCH_PAGE_SIZE = 100  # 1リクエストで取得する動画数（APIの上限）
+FETCH_MAX_PAGES = int(os.getenv("FETCH_MAX_PAGES", 10))  # 条件に合う動画を探す際に取得するページ数の上限
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", 8))  # バッチ実行時に同時に実行するジョブ数
+
+# データ変換設定
+CONVERT_CHUNK_SIZE = int(os.getenv("CONVERT_CHUNK_SIZE", 50000))  # プロセスプールで変換する際の1タスクあたりの件数
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", os.cpu_count() or 1))  # 変換・CSV出力に使うプロセス数（1で無効）
+PROCESS_PARALLEL_THRESHOLD = int(os.getenv("PROCESS_PARALLEL_THRESHOLD", 20000))  # この件数以上のバッチはプロセスプールで処理
+
+# 定期取得（スケジューラ）設定
+SCHEDULER_MIN_INTERVAL = int(os.getenv("SCHEDULER_MIN_INTERVAL", 300))  # 取得間隔の下限（秒）
+SCHEDULER_MAX_INTERVAL = int(os.getenv("SCHEDULER_MAX_INTERVAL", 24 * 60 * 60))  # 取得間隔の上限（秒）
+SCHEDULER_TARGET_VIEWS = int(os.getenv("SCHEDULER_TARGET_VIEWS", 10000))  # この再生数が増える見込みの時間を取得間隔にする
+SCHEDULER_CALL_BUDGET = int(os.getenv("SCHEDULER_CALL_BUDGET", API_RATE_LIMIT // 2))  # 1回の処理で使うAPI呼び出し数の上限
+SCHEDULER_VIDEO_BATCH_SIZE = 20  # 1回のAPI呼び出しでまとめて取得する動画数
+SCHEDULER_HASHTAG_COUNT = 30  # ハッシュタグごとに取得する動画数
+SCHEDULER_IDLE_SLEEP = 60  # 取得予定がない場合の最大待機秒数
+SCHEDULER_RETENTION_INTERVAL = 24 * 60 * 60  # 保持期間を過ぎたデータの削除を行う間隔（秒）
+
+# 統計設定
+STATS_SKETCH_K = int(os.getenv("STATS_SKETCH_K", 200))  # 分位点スケッチの精度（大きいほど高精度・高メモリ）
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", 1000))  # トレンド集計で追跡する要素数（種類ごと）
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))  # トレンド集計の件数が半分に減衰するまでの時間
+TRENDING_SEEN_HOURS = float(os.getenv("TRENDING_SEEN_HOURS", 24))  # 同じ動画を再度数えるまでの時間（それまでの再取得は数えない）
+TRENDING_SEEN_CAPACITY = int(os.getenv("TRENDING_SEEN_CAPACITY", 10000))  # 数え直さないよう覚えておく動画IDの上限（古いものから忘れる）
+TRENDING_STATE_FILE = os.getenv(
+    "TRENDING_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "trending.json")
+)  # トレンド集計の保存先
+CRAWL_CHECKPOINT_DIR = os.getenv(
+    "CRAWL_CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "checkpoints")
+)  # 取得を途中から再開するためのチェックポイントの保存先（取得条件ごとのファイル）
+VELOCITY_WINDOW_HOURS = int(os.getenv("VELOCITY_WINDOW_HOURS", 72))  # 再生数の伸びの計算に使う履歴の期間（時間）
+VELOCITY_Z_THRESHOLD = float(os.getenv("VELOCITY_Z_THRESHOLD", 3.5))  # 異常値とみなすロバスト z スコア
+VELOCITY_MIN_COHORT = 5  # これ未満の件数のハッシュタグは全体と比較する
+
+# 表示設定
+PAGER_PAGE_SIZE = int(os.getenv("PAGER_PAGE_SIZE", 20))  # 結果の表示で1ページに表示する行数
+
+# ログ設定
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "app.log")  # ログファイル（空文字列でファイルに出力しない）
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))  # ログファイルを切り替えるサイズ
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))  # 残す古いログファイルの数
+LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", 10))  # リクエスト・行ごとのログを1種類あたり LOG_SAMPLE_INTERVAL 秒に出力する件数
+LOG_SAMPLE_INTERVAL = float(os.getenv("LOG_SAMPLE_INTERVAL", 60))
+
+# プロファイル設定（--profile 指定時のみ使う）
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # プロファイル結果の出力先
+PROFILE_TRACE_MEMORY = os.getenv("PROFILE_TRACE_MEMORY", "true").lower() == "true"  # tracemalloc でメモリも計測するか
+
+# エクスポート設定
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 10000))  # ストリーミング出力で1回に読み書きする行数
+EXPORT_WATERMARK_LAG = int(os.getenv("EXPORT_WATERMARK_LAG", 300))  # 差分エクスポートで直近この秒数の行は次回に回す（遅れてコミットされる行の取りこぼし防止）
+EXPORT_SERIALIZE_ROWS = 2000  # 圧縮出力時に一度にCSVへシリアライズする行数
+EXPORT_COMPRESSION_BLOCK_SIZE = int(os.getenv("EXPORT_COMPRESSION_BLOCK_SIZE", 1024 * 1024))  # 独立して圧縮するブロックのバイト数
+EXPORT_COMPRESSION_WORKERS = int(os.getenv("EXPORT_COMPRESSION_WORKERS", os.cpu_count() or 1))
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", 256 * 1024))  # 分析用途のスキャンに適した行グループの行数
 
 # データベース設定
 DB_CHARSET = "utf8mb4"
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 500))  # 1回の INSERT にまとめる行数
 DB_COLLATION = "utf8mb4_unicode_ci"
 
 # セキュリティ設定
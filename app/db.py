@@ -1,28 +1,34 @@
 # データベース関連機能
 import mysql.connector
-import os
-from dotenv import load_dotenv
+import itertools
+import logging
 import time
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Union
 from mysql.connector import Error
 from contextlib import contextmanager
 from app.config import (
     DB_HOST, DB_PORT, DB_NAME, 
-    DB_USER, DB_PASSWORD
+    DB_USER, DB_PASSWORD, DB_WRITE_BATCH_SIZE, ENCRYPT_STORAGE, EXPORT_CHUNK_SIZE
 )
 
-from app.models import VideoData
+from app.filters import VideoFilter
+from app.logger import SampledLogger
+from app.models import VideoBatch, VideoData
+from app.profiling import span
+from app.security.data_protection import DataProtection
 
-# 環境変数の読み込み
-load_dotenv()
+logger = logging.getLogger(__name__)
+# 1件ずつ再試行した時の保存エラー（行ごとに発生しうるため出力数を制限する）
+_row_error_log = SampledLogger(logger)
 
-# データベース接続情報
+# データベース接続情報（環境変数は app.config で1回だけ読み込む）
 db_config = {
-    'host': os.getenv('DB_HOST'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME')
+    'host': DB_HOST,
+    'user': DB_USER,
+    'password': DB_PASSWORD,
+    'database': DB_NAME
 }
 
 class Database:
@@ -39,7 +45,7 @@ class Database:
             )
             yield conn
         except Error as e:
-            print(f"データベース接続エラー: {e}")
+            logger.error("データベース接続エラー: %s", e)
             raise
         finally:
             if conn and conn.is_connected():
@@ -71,14 +77,15 @@ def get_connection(max_retries=5, retry_delay=5):
 
     while retries < max_retries:
         try:
-            conn = mysql.connector.connect(**db_config)
-            print("データベースに接続しました")
+            with span("db.connect"):
+                conn = mysql.connector.connect(**db_config)
+            logger.debug("データベースに接続しました")
             return conn
         except mysql.connector.Error as err:
-            print(f"データベース接続エラー: {err}")
+            logger.warning("データベース接続エラー: %s", err)
             retries += 1
             if retries < max_retries:
-                print(f"{retry_delay}秒後にリトライします...")
+                logger.info("%s秒後にリトライします...", retry_delay)
                 time.sleep(retry_delay)
             else:
                 raise Exception("データベース接続に失敗しました")
@@ -106,55 +113,163 @@ def setup_database():
         music_title VARCHAR(255),
         music_author VARCHAR(255),
         hashtags TEXT,
-        UNIQUE(video_id)
+        UNIQUE(video_id),
+        INDEX idx_fetch_date (fetch_date)
     )
     """)
     
+    # 取得ごとの再生数などの履歴（再生数の伸びの計算に使う）
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS video_snapshots (
+        video_id VARCHAR(255) NOT NULL,
+        fetch_date DATETIME NOT NULL,
+        view_count INT NOT NULL,
+        like_count INT NOT NULL,
+        comment_count INT NOT NULL,
+        share_count INT NOT NULL,
+        PRIMARY KEY (video_id, fetch_date),
+        INDEX idx_snapshot_fetch_date (fetch_date)
+    )
+    """)
+    
+    # 定期取得の対象（ハッシュタグ・動画）と次回の取得予定
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS watchlist (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        item_type VARCHAR(16) NOT NULL,
+        item_value VARCHAR(255) NOT NULL,
+        next_poll_at DATETIME NOT NULL,
+        last_polled_at DATETIME,
+        interval_seconds INT NOT NULL,
+        last_velocity DOUBLE NOT NULL DEFAULT 0,
+        UNIQUE(item_type, item_value),
+        INDEX idx_next_poll_at (next_poll_at)
+    )
+    """)
+    
+    # 差分エクスポートの出力済み位置（ウォーターマーク）
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermarks (
+        target VARCHAR(255) PRIMARY KEY,
+        last_fetch_date DATETIME NOT NULL,
+        last_id INT NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+    """)
+    
+    # 既存のテーブルには CREATE TABLE IF NOT EXISTS で追加したインデックスが作られないため個別に追加する
+    for table, index, columns in INDEX_MIGRATIONS:
+        _ensure_index(cursor, table, index, columns)
+    
     conn.commit()
     cursor.close()
     conn.close()
-    print("データベーステーブルを確認しました")
+    logger.info("データベーステーブルを確認しました")
+
+# テーブルの作成後に追加したインデックス（テーブル, インデックス名, 列）
+INDEX_MIGRATIONS = [
+    ("videos", "idx_fetch_date", "fetch_date"),
+]
+
+def _ensure_index(cursor, table: str, index: str, columns: str):
+    """インデックスがなければ作成する"""
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index))
+    if cursor.fetchone()[0]:
+        return
+    logger.info("%s にインデックス %s を作成します", table, index)
+    cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+# 動画データの保存（既存の動画は再生数などを更新）
+INSERT_VIDEO_QUERY = """
+INSERT INTO videos (
+    video_id, creator_id, creator_name, video_url, 
+    view_count, like_count, comment_count, share_count,
+    post_date, fetch_date, description, music_title, 
+    music_author, hashtags
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    view_count = VALUES(view_count),
+    like_count = VALUES(like_count),
+    comment_count = VALUES(comment_count),
+    share_count = VALUES(share_count),
+    fetch_date = VALUES(fetch_date)
+"""
 
-def save_video_data(videos: List[VideoData]):
-    """動画データをデータベースに保存"""
-    if not videos:
+# 取得時点の再生数などの履歴（同じ取得日時の重複は無視）
+INSERT_SNAPSHOT_QUERY = """
+INSERT IGNORE INTO video_snapshots (
+    video_id, fetch_date, view_count, like_count, comment_count, share_count
+) VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+def _snapshot_row(row):
+    """INSERT_VIDEO_QUERY 用の行から履歴用の行を作成"""
+    return (row[0], row[9], row[4], row[5], row[6], row[7])
+
+def save_video_data(videos: Union[List[VideoData], VideoBatch], batch_size: int = DB_WRITE_BATCH_SIZE):
+    """
+    動画データをデータベースに保存
+
+    batch_size 件ずつ複数行の INSERT にまとめて書き込む。
+    バッチ内でエラーが発生した場合は、そのバッチのみ1件ずつ再試行して
+    問題のある動画を特定する。
+    同じトランザクションで video_snapshots に取得時点の再生数などを記録する。
+    ENCRYPT_STORAGE が有効な場合は ENCRYPTED_COLUMNS を書き込み前にまとめて暗号化する。
+
+    Args:
+        videos: VideoData のリストまたは VideoBatch
+        batch_size: 1回の INSERT にまとめる件数
+    """
+    if not len(videos):
         return
     
+    if not isinstance(videos, VideoBatch):
+        videos = VideoBatch.from_videos(videos)
+    if ENCRYPT_STORAGE:
+        with span("db.encrypt"):
+            videos = DataProtection().encrypt_batch(videos)
+    rows = videos.iter_rows()
+    
     conn = get_connection()
     cursor = conn.cursor()
     
-    for video in videos:
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
         try:
-            cursor.execute("""
-            INSERT INTO videos (
-                video_id, creator_id, creator_name, video_url, 
-                view_count, like_count, comment_count, share_count,
-                post_date, fetch_date, description, music_title, 
-                music_author, hashtags
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                view_count = %s,
-                like_count = %s,
-                comment_count = %s,
-                share_count = %s,
-                fetch_date = %s
-            """, (
-                video.video_id, video.creator_id, video.creator_name, video.video_url,
-                video.view_count, video.like_count, video.comment_count, video.share_count,
-                video.post_date, video.fetch_date, video.description, video.music_title,
-                video.music_author, video.hashtags,
-                # 更新用の値
-                video.view_count, video.like_count, video.comment_count, video.share_count,
-                video.fetch_date
-            ))
-        except Exception as e:
-            print(f"保存エラー: {e} - 動画ID: {video.video_id}")
+            with span("db.write"):
+                cursor.executemany(INSERT_VIDEO_QUERY, batch)
+                cursor.executemany(INSERT_SNAPSHOT_QUERY, [_snapshot_row(row) for row in batch])
+                conn.commit()
+        except Error:
+            conn.rollback()
+            for row in batch:
+                try:
+                    cursor.execute(INSERT_VIDEO_QUERY, row)
+                    cursor.execute(INSERT_SNAPSHOT_QUERY, _snapshot_row(row))
+                except Exception as e:
+                    _row_error_log.warning("保存エラー: %s - 動画ID: %s", e, row[0])
+            conn.commit()
     
-    conn.commit()
     cursor.close()
     conn.close()
 
-def get_saved_videos(limit: int = 10, offset: int = 0, sort_by: str = "view_count", search_term: Optional[str] = None):
+def _build_search_clause(search_term: Optional[str] = None, video_filter: Optional[VideoFilter] = None):
+    """検索語と絞り込み条件から WHERE 句とパラメータを作成"""
+    conditions, params = video_filter.to_sql() if video_filter else ([], [])
+    if search_term:
+        conditions.insert(0, "(creator_id LIKE %s OR hashtags LIKE %s)")
+        params[:0] = [f"%{search_term}%", f"%{search_term}%"]
+    if not conditions:
+        return "", []
+    return "WHERE " + " AND ".join(conditions), params
+
+def get_saved_videos(limit: int = 10, offset: int = 0, sort_by: str = "view_count", search_term: Optional[str] = None,
+                     video_filter: Optional[VideoFilter] = None):
     """保存済みの動画データを取得"""
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
@@ -169,12 +284,7 @@ def get_saved_videos(limit: int = 10, offset: int = 0, sort_by: str = "view_coun
     }.get(sort_by, "view_count")
     
     # 検索条件
-    where_clause = ""
-    params = []
-    
-    if search_term:
-        where_clause = "WHERE creator_id LIKE %s OR hashtags LIKE %s"
-        params = [f"%{search_term}%", f"%{search_term}%"]
+    where_clause, params = _build_search_clause(search_term, video_filter)
     
     # クエリ実行
     query = f"""
@@ -185,14 +295,231 @@ def get_saved_videos(limit: int = 10, offset: int = 0, sort_by: str = "view_coun
     """
     
     params.extend([limit, offset])
-    cursor.execute(query, params)
+    with span("db.query"):
+        cursor.execute(query, params)
+        result = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    
+    # 暗号化された列を復号化
+    if ENCRYPT_STORAGE:
+        result = DataProtection().decrypt_rows(result)
     
+    return result
+
+def _iter_query_chunks(query: str, params, chunk_size: int):
+    """バッファなしカーソルでクエリ結果を chunk_size 件ずつ返す"""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+
+    try:
+        with span("db.query"):
+            cursor.execute(query, params)
+        while True:
+            # 区間は yield をまたがないよう1チャンクの読み込みごとに計測する
+            with span("db.fetch"):
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # 途中で打ち切られた場合は未読の結果が残るため、カーソルのクローズ失敗は無視する
+        try:
+            cursor.close()
+        except Error:
+            pass
+        conn.close()
+
+def iter_saved_videos(chunk_size: int = EXPORT_CHUNK_SIZE, search_term: Optional[str] = None,
+                      video_filter: Optional[VideoFilter] = None):
+    """
+    保存済みの動画データをチャンク単位で逐次取得する
+
+    バッファなしカーソルでサーバーから行をストリーミングし、chunk_size 件ずつ
+    返すため、テーブル全体の件数に関わらずメモリ使用量は一定になる。
+
+    Args:
+        chunk_size: 1チャンクあたりの行数
+        search_term: 検索語（creator_id / hashtags の部分一致）
+        video_filter: 再生数・いいね数・投稿日の絞り込み条件
+
+    Yields:
+        行（辞書）のリスト
+    """
+    where_clause, params = _build_search_clause(search_term, video_filter)
+    # 主キー順なのでサーバー側でのソートも発生しない
+    query = f"""
+    SELECT * FROM videos
+    {where_clause}
+    ORDER BY id
+    """
+    yield from _iter_query_chunks(query, params, chunk_size)
+
+def iter_changed_videos(since_fetch_date: Optional[datetime] = None, since_id: int = 0,
+                        chunk_size: int = EXPORT_CHUNK_SIZE, until: Optional[datetime] = None):
+    """
+    指定位置より後に追加・更新された動画データをチャンク単位で取得する
+
+    更新時も fetch_date が更新されるため、(fetch_date, id) の順で
+    ウォーターマークより後の行だけを idx_fetch_date のレンジスキャンで読む。
+    until 指定時は fetch_date が until より前の行のみを返す（fetch_date は書き込む側の
+    時刻なので、直近の行は他の書き込みがまだコミットされていない可能性がある）。
+    """
+    conditions, params = [], []
+    if since_fetch_date is not None:
+        conditions.append("(fetch_date > %s OR (fetch_date = %s AND id > %s))")
+        params.extend([since_fetch_date, since_fetch_date, since_id])
+    if until is not None:
+        conditions.append("fetch_date < %s")
+        params.append(until)
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+    query = f"SELECT * FROM videos {where_clause} ORDER BY fetch_date, id"
+    yield from _iter_query_chunks(query, params, chunk_size)
+
+def get_video_snapshots(since: datetime, video_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    指定日時以降の再生数の履歴を取得（動画ID・取得日時順）
+
+    Returns:
+        video_id / fetch_date / view_count / hashtags を持つ行のリスト
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    query = """
+    SELECT s.video_id, s.fetch_date, s.view_count, v.hashtags
+    FROM video_snapshots s
+    JOIN videos v ON v.video_id = s.video_id
+    WHERE s.fetch_date >= %s
+    """
+    params: List[Any] = [since]
+    if video_ids:
+        query += f" AND s.video_id IN ({', '.join(['%s'] * len(video_ids))})"
+        params.extend(video_ids)
+    query += " ORDER BY s.video_id, s.fetch_date"
+
+    cursor.execute(query, params)
     result = cursor.fetchall()
     cursor.close()
     conn.close()
-    
+
+    if ENCRYPT_STORAGE:
+        result = DataProtection().decrypt_rows(result, columns=["hashtags"])
+    return result
+
+def get_export_watermark(target: str) -> Optional[Dict[str, Any]]:
+    """エクスポート先ごとのウォーターマークを取得"""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT last_fetch_date, last_id FROM export_watermarks WHERE target = %s",
+        (target,)
+    )
+    result = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return result
+
+def save_export_watermark(target: str, last_fetch_date: datetime, last_id: int):
+    """エクスポート先ごとのウォーターマークを保存"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO export_watermarks (target, last_fetch_date, last_id, updated_at)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        last_fetch_date = VALUES(last_fetch_date),
+        last_id = VALUES(last_id),
+        updated_at = VALUES(updated_at)
+    """, (target, last_fetch_date, last_id, datetime.now()))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def add_watch_items(items: List[tuple], interval_seconds: int, now: Optional[datetime] = None):
+    """定期取得の対象を追加（(種類, 値) のリスト。登録済みの対象はそのまま）"""
+    now = now or datetime.now()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("""
+    INSERT INTO watchlist (item_type, item_value, next_poll_at, interval_seconds)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE item_type = item_type
+    """, [(item_type, item_value, now, interval_seconds) for item_type, item_value in items])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def remove_watch_items(items: List[tuple]):
+    """定期取得の対象を削除（(種類, 値) のリスト）"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("DELETE FROM watchlist WHERE item_type = %s AND item_value = %s", items)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def get_due_watch_items(now: datetime, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """取得予定時刻を過ぎた対象を予定の早い順に取得（limit 指定時はその件数まで）"""
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    query = """
+    SELECT id, item_type, item_value, next_poll_at, interval_seconds, last_velocity
+    FROM watchlist
+    WHERE next_poll_at <= %s
+    ORDER BY next_poll_at
+    """
+    if limit is None:
+        cursor.execute(query, (now,))
+    else:
+        cursor.execute(query + " LIMIT %s", (now, limit))
+    result = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return result
+
+def get_next_poll_time() -> Optional[datetime]:
+    """次に取得予定の時刻（対象がなければ None）"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(next_poll_at) FROM watchlist")
+    result = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
     return result
 
+def set_next_poll_times(schedule: List[Tuple[int, datetime]]):
+    """対象ごとの次回の取得予定だけを変更（(id, next_poll_at) のリスト）"""
+    if not schedule:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "UPDATE watchlist SET next_poll_at = %s WHERE id = %s",
+        [(next_poll_at, item_id) for item_id, next_poll_at in schedule]
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def update_watch_items(updates: List[Dict[str, Any]]):
+    """取得結果に応じて次回の取得予定・間隔・伸びを更新"""
+    if not updates:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("""
+    UPDATE watchlist
+    SET next_poll_at = %s, last_polled_at = %s, interval_seconds = %s, last_velocity = %s
+    WHERE id = %s
+    """, [
+        (u["next_poll_at"], u["last_polled_at"], u["interval_seconds"], u["last_velocity"], u["id"])
+        for u in updates
+    ])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
 def get_video_statistics():
     """動画の統計情報を取得"""
     conn = get_connection()
@@ -235,9 +562,20 @@ def get_video_statistics():
         "popular_hashtags": hashtags
     }
 
-def export_to_csv(data, filename="tiktok_data.csv"):
-    """データをCSVファイルに出力"""
-    df = pd.DataFrame(data)
-    df.to_csv(filename, index=False, encoding='utf-8-sig')
+def export_to_csv(data, filename="tiktok_data.csv", compression=None):
+    """データをCSVファイルに出力（compression 指定時は並列圧縮して出力）"""
+    if isinstance(data, VideoBatch):
+        data = data.to_records()
+
+    if compression:
+        from app.export import export_stream_to_csv, with_compression_suffix
+        filename = with_compression_suffix(filename, compression)
+        export_stream_to_csv([data], filename, compression=compression)
+        print(f"データをCSVファイル '{filename}' に出力しました")
+        return filename
+
+    with span("export.csv"):
+        df = pd.DataFrame(data)
+        df.to_csv(filename, index=False, encoding='utf-8-sig')
     print(f"データをCSVファイル '{filename}' に出力しました")
     return filename
@@ -0,0 +1,137 @@
+# CPUを使う処理（APIレスポンスの変換・CSVへのシリアライズ）を大きなバッチごとにプロセスプールで実行する
+import csv
+import io
+import math
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from app.config import CONVERT_CHUNK_SIZE, PROCESS_PARALLEL_THRESHOLD, PROCESS_WORKERS
+from app.models import VideoBatch, api_responses_to_columns
+
+
+def batch_to_buffer(batch: VideoBatch) -> bytes:
+    """バッチを Arrow IPC 形式のバイト列に変換（プロセス間の受け渡し用）"""
+    import pyarrow as pa
+
+    table = batch.to_arrow()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def batch_from_buffer(buffer: bytes) -> VideoBatch:
+    """batch_to_buffer() のバイト列からバッチを復元"""
+    import pyarrow as pa
+
+    return VideoBatch.from_arrow(pa.ipc.open_stream(buffer).read_all())
+
+
+def serialize_csv_rows(batch: VideoBatch, columns: Sequence[str]) -> bytes:
+    """バッチをヘッダーなしのCSV（UTF-8）に変換"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction="ignore")
+    writer.writerows(batch.to_records())
+    return buffer.getvalue().encode("utf-8")
+
+
+def _convert_chunk(data: Sequence[Dict[str, Any]], fetch_date: datetime) -> bytes:
+    """ワーカープロセスで APIレスポンスを変換し、Arrow のバイト列で返す"""
+    return batch_to_buffer(VideoBatch.from_columns(api_responses_to_columns(data, fetch_date=fetch_date)))
+
+
+def _serialize_chunk(buffer: bytes, columns: Sequence[str]) -> bytes:
+    """ワーカープロセスで Arrow のバイト列をCSVに変換"""
+    return serialize_csv_rows(batch_from_buffer(buffer), columns)
+
+
+class StageExecutor:
+    """
+    CPUを使う処理をプロセスプールで実行するクラス
+
+    threshold 件以上のバッチのみを分割してワーカープロセスに渡し、それ未満や
+    workers が1の場合は呼び出したスレッドで処理する。ワーカーとの間の
+    バッチは行ごとの Python オブジェクトではなく Arrow のバッファで受け渡す。
+    プールは最初に使う時に作成し、以降のバッチで使い回す。
+    """
+
+    def __init__(self, workers: int = PROCESS_WORKERS, threshold: int = PROCESS_PARALLEL_THRESHOLD,
+                 chunk_size: int = CONVERT_CHUNK_SIZE):
+        self.workers = max(workers, 1)
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def is_parallel(self, rows: int) -> bool:
+        return self.workers > 1 and rows >= self.threshold
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _task_size(self, rows: int) -> int:
+        """1タスクの件数（全ワーカーに行き渡る大きさで、chunk_size を上限とする）"""
+        return max(min(self.chunk_size, math.ceil(rows / self.workers)), 1)
+
+    def convert(self, data: Sequence[Dict[str, Any]]) -> VideoBatch:
+        """
+        APIレスポンスのリストをバッチに変換（ハッシュタグの抽出を含む）
+
+        ワーカーごとのバッチは文字列列をデコードせず、値の辞書を合わせて連結する。
+        """
+        if not self.is_parallel(len(data)):
+            return VideoBatch.from_api_responses(data)
+
+        fetch_date = datetime.now()
+        size = self._task_size(len(data))
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        buffers = self._get_pool().map(_convert_chunk, chunks, [fetch_date] * len(chunks))
+        return VideoBatch.concat([batch_from_buffer(buffer) for buffer in buffers])
+
+    def serialize_csv(self, batch: VideoBatch, columns: Sequence[str]) -> Iterator[bytes]:
+        """バッチをヘッダーなしのCSVに変換し、元の行順でバイト列を返す"""
+        if not self.is_parallel(len(batch)):
+            yield serialize_csv_rows(batch, columns)
+            return
+
+        size = self._task_size(len(batch))
+        buffers = (
+            batch_to_buffer(batch.take(range(start, min(start + size, len(batch)))))
+            for start in range(0, len(batch), size)
+        )
+        yield from self._get_pool().map(_serialize_chunk, buffers, [columns] * math.ceil(len(batch) / size))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+# 処理全体で共有する実行器（--workers で変更する）
+_executor: Optional[StageExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> StageExecutor:
+    """共有の実行器を取得（未設定の場合は PROCESS_WORKERS で作成）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = StageExecutor()
+        return _executor
+
+
+def configure_executor(workers: int) -> StageExecutor:
+    """共有の実行器のワーカー数を変更"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.close()
+        _executor = StageExecutor(workers=workers)
+        return _executor
@@ -0,0 +1,500 @@
+# データエクスポート関連機能
+import collections
+import csv
+import functools
+import io
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from app.config import (
+    ENCRYPT_STORAGE, EXPORT_CHUNK_SIZE, EXPORT_COMPRESSION_BLOCK_SIZE, EXPORT_COMPRESSION_WORKERS,
+    EXPORT_SERIALIZE_ROWS, EXPORT_WATERMARK_LAG, PARQUET_COMPRESSION, PARQUET_ROW_GROUP_SIZE
+)
+from app.models import HASHTAG_PATTERN, VIDEO_FIELDS, VideoBatch
+from app.profiling import span
+
+# Parquet出力時の列の型（videos テーブルに対応）
+VIDEO_ARROW_TYPES = {
+    "id": "int64",
+    "video_id": "string",
+    "creator_id": "string",
+    "creator_name": "string",
+    "video_url": "string",
+    "view_count": "int64",
+    "like_count": "int64",
+    "comment_count": "int64",
+    "share_count": "int64",
+    "post_date": "timestamp[us]",
+    "fetch_date": "timestamp[us]",
+    "description": "string",
+    "music_title": "string",
+    "music_author": "string",
+    "hashtags": "string"
+}
+
+# パーティション指定と、出力時に追加するパーティション列の対応
+PARTITION_COLUMNS = {
+    "fetch_date": "fetch_day",  # 取得日（YYYY-MM-DD）
+    "hashtag": "hashtag"        # 先頭のハッシュタグ（#なし）
+}
+
+
+# 圧縮形式ごとの拡張子
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst"
+}
+
+
+def with_compression_suffix(filename: str, compression: Optional[str]) -> str:
+    """圧縮形式に応じた拡張子を付ける（付いている場合はそのまま）"""
+    suffix = COMPRESSION_SUFFIXES.get(compression, "")
+    return filename if filename.endswith(suffix) else filename + suffix
+
+
+class ParallelCompressedWriter:
+    """
+    ブロック単位の圧縮をスレッドプールで並列に行うファイルライター
+
+    書き込まれたデータを block_size ごとに独立した gzip メンバー / zstd フレームとして
+    圧縮する。連結したメンバー・フレームは gzip / zstd コマンドでそのまま展開できる。
+    zlib・zstandard は圧縮中に GIL を解放するため、呼び出し側の行のシリアライズと
+    複数ブロックの圧縮が同時に進む。
+    """
+
+    def __init__(self, filename: str, compression: str = "gzip", workers: int = EXPORT_COMPRESSION_WORKERS,
+                 block_size: int = EXPORT_COMPRESSION_BLOCK_SIZE, level: Optional[int] = None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"未対応の圧縮形式です: {compression}")
+        self._compress = self._make_compressor(compression, level)
+        self._file = open(filename, "wb")
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = collections.deque()
+        # 圧縮待ちのブロック数を制限してメモリ使用量を抑える
+        self._max_pending = workers * 2
+        self._block_size = block_size
+        self._buffer = bytearray()
+
+    @staticmethod
+    def _make_compressor(compression: str, level: Optional[int]):
+        """ブロックを独立して圧縮する関数を返す"""
+        if compression == "gzip":
+            import gzip
+            return functools.partial(gzip.compress, compresslevel=6 if level is None else level)
+
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd 圧縮には zstandard パッケージが必要です（pip install zstandard）")
+
+        # ZstdCompressor はスレッド間で共有できないため、スレッドごとに作成する
+        local = threading.local()
+
+        def compress(data: bytes) -> bytes:
+            if not hasattr(local, "compressor"):
+                local.compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+            return local.compressor.compress(data)
+        return compress
+
+    def write(self, data: bytes):
+        """データを書き込む（block_size に達するごとに圧縮を依頼）"""
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._executor.submit(self._compress, block))
+        while len(self._pending) > self._max_pending:
+            self._file.write(self._pending.popleft().result())
+
+    def close(self):
+        """残りのデータを圧縮し、順番通りに書き出して閉じる"""
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown(wait=True)
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def export_stream_to_csv(chunks: Iterable[Union[List[Dict], VideoBatch]], filename: str, columns: Optional[List[str]] = None,
+                         compression: Optional[str] = None) -> int:
+    """
+    チャンク単位のデータを逐次CSVファイルに書き出す
+
+    各チャンクは届いた時点で書き込まれ、保持されないため
+    メモリ使用量はチャンクサイズのみに比例する。
+
+    Args:
+        chunks: 行（辞書）のリストまたは VideoBatch を返すイテラブル
+        filename: 出力ファイル名
+        columns: 出力する列（未指定の場合は最初のチャンクの列）
+        compression: 圧縮形式（"gzip", "zstd"）。未指定の場合は非圧縮
+
+    Returns:
+        書き出した行数
+    """
+    if compression:
+        return _export_stream_to_compressed_csv(chunks, filename, columns, compression)
+
+    from app.executor import get_executor
+    executor = get_executor()
+
+    total = 0
+    # export_to_csv と同様、Excelで開けるようにBOM付きUTF-8で出力
+    with open(filename, "w", newline="", encoding="utf-8-sig") as f:
+        writer = None
+        for rows in chunks:
+            if not len(rows):
+                continue
+            if isinstance(rows, VideoBatch) and executor.is_parallel(len(rows)):
+                # 大きなバッチはプロセスプールでシリアライズ（ヘッダーは書き込み済みにしてから追記）
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=columns or list(VIDEO_FIELDS), extrasaction="ignore")
+                    writer.writeheader()
+                f.flush()
+                for data in executor.serialize_csv(rows, writer.fieldnames):
+                    f.buffer.write(data)
+                f.buffer.flush()
+                total += len(rows)
+                continue
+            rows = _as_records(rows)
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=columns or list(rows[0].keys()), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerows(rows)
+            total += len(rows)
+    return total
+
+
+def _export_stream_to_compressed_csv(chunks: Iterable[List[Dict]], filename: str,
+                                     columns: Optional[List[str]], compression: str) -> int:
+    """CSVへのシリアライズと並列圧縮を重ねて書き出す"""
+    from app.executor import get_executor
+    executor = get_executor()
+    total = 0
+    buffer = io.StringIO()
+    writer = None
+    encoding = "utf-8-sig"  # BOMはファイル先頭にのみ付ける
+
+    with ParallelCompressedWriter(filename, compression, block_size=EXPORT_COMPRESSION_BLOCK_SIZE) as out:
+        for rows in chunks:
+            if not len(rows):
+                continue
+            if isinstance(rows, VideoBatch) and executor.is_parallel(len(rows)):
+                # 大きなバッチはプロセスプールでシリアライズし、その結果を圧縮に回す
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=columns or list(VIDEO_FIELDS), extrasaction="ignore")
+                    writer.writeheader()
+                    out.write(buffer.getvalue().encode(encoding))
+                    encoding = "utf-8"
+                    buffer.seek(0)
+                    buffer.truncate()
+                for data in executor.serialize_csv(rows, writer.fieldnames):
+                    out.write(data)
+                total += len(rows)
+                continue
+            rows = _as_records(rows)
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=columns or list(rows[0].keys()), extrasaction="ignore")
+                writer.writeheader()
+
+            # 大きなチャンクも一定行数ごとに渡し、圧縮の開始を待たせない
+            for start in range(0, len(rows), EXPORT_SERIALIZE_ROWS):
+                writer.writerows(rows[start:start + EXPORT_SERIALIZE_ROWS])
+                out.write(buffer.getvalue().encode(encoding))
+                encoding = "utf-8"
+                buffer.seek(0)
+                buffer.truncate()
+            total += len(rows)
+    return total
+
+
+def _as_records(rows) -> List[Dict]:
+    """チャンク（辞書のリストまたは VideoBatch）を辞書のリストに変換"""
+    return rows.to_records() if isinstance(rows, VideoBatch) else rows
+
+
+def _build_arrow_schema(rows: List[Dict], names: List[str]):
+    """列名リストからArrowスキーマを作成（既知の列は固定の型、それ以外は推論）"""
+    import pyarrow as pa
+
+    fields = []
+    for name in names:
+        if name in VIDEO_ARROW_TYPES:
+            type_ = pa.type_for_alias(VIDEO_ARROW_TYPES[name])
+        else:
+            type_ = pa.array([row.get(name) for row in rows]).type
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def _add_partition_columns(table, partition_by: List[str]):
+    """パーティション用の派生列を追加"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if "fetch_date" in partition_by:
+        table = table.append_column("fetch_day", pc.strftime(table["fetch_date"], format="%Y-%m-%d"))
+    if "hashtag" in partition_by:
+        # 1動画を複数パーティションに重複させないよう、先頭のハッシュタグで分割する。
+        # 分析・トレンド集計と同じタグになるよう HASHTAG_PATTERN で一意な値ごとに抽出する
+        hashtags = table["hashtags"].combine_chunks()
+        if not pa.types.is_dictionary(hashtags.type):
+            hashtags = hashtags.dictionary_encode()
+        first = [_first_hashtag(value) for value in hashtags.dictionary.to_pylist()]
+        table = table.append_column("hashtag", pc.take(pa.array(first, type=pa.string()), hashtags.indices))
+    return table
+
+
+def _first_hashtag(value: Optional[str]) -> Optional[str]:
+    """先頭のハッシュタグ（#なし。なければ None）"""
+    match = HASHTAG_PATTERN.search(value) if value else None
+    return match.group(1) if match else None
+
+
+def export_to_parquet(
+    chunks: Iterable[Union[List[Dict], VideoBatch]],
+    path: str,
+    columns: Optional[List[str]] = None,
+    partition_by: Optional[List[str]] = None,
+    compression: str = PARQUET_COMPRESSION,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE
+) -> int:
+    """
+    チャンク単位のデータをParquet形式で書き出す
+
+    文字列列は辞書エンコードし、行グループは row_group_size 行ごとにまとめる
+    （チャンクが小さくても行グループが細切れにならないようバッファリングする）。
+
+    Args:
+        chunks: 行（辞書）のリストまたは VideoBatch を返すイテラブル
+        path: 出力先。partition_by 指定時はディレクトリ（Hive形式 key=value/）
+        columns: 出力する列（未指定の場合は最初のチャンクの列）
+        partition_by: パーティション指定（"fetch_date", "hashtag"）
+        compression: 圧縮方式（"zstd", "snappy", "gzip", "none" など）
+        row_group_size: 1行グループあたりの行数
+
+    Returns:
+        書き出した行数
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    partition_by = partition_by or []
+    unknown = [key for key in partition_by if key not in PARTITION_COLUMNS]
+    if unknown:
+        raise ValueError(f"未対応のパーティション指定です: {', '.join(unknown)}")
+
+    iterator = iter(chunks)
+    first = next((rows for rows in iterator if rows), None)
+    if first is None:
+        return 0
+
+    if isinstance(first, VideoBatch):
+        output_names = columns or list(VIDEO_FIELDS)
+    else:
+        output_names = columns or list(first[0].keys())
+    # パーティション列の導出に必要な元の列は、出力対象でなくても読み込む
+    source_names = list(output_names)
+    for key, needed in (("fetch_date", "fetch_date"), ("hashtag", "hashtags")):
+        if key in partition_by and needed not in source_names:
+            source_names.append(needed)
+
+    # VideoBatch の列は型が既知のため、推論用の行は不要
+    sample = [] if isinstance(first, VideoBatch) else first
+    source_schema = _build_arrow_schema(sample, source_names)
+    string_columns = [f.name for f in source_schema if pa.types.is_string(f.type) and f.name in output_names]
+    compression = None if compression == "none" else compression
+
+    def iter_tables() -> Iterator:
+        # 先読みした最初のチャンクと残りを連結
+        for rows in itertools.chain([first], iterator):
+            if not rows:
+                continue
+            if isinstance(rows, VideoBatch):
+                # 列指向のまま変換（文字列の辞書はParquet側で改めて辞書エンコードされる）
+                table = rows.to_arrow(source_names).cast(source_schema)
+            else:
+                table = pa.Table.from_pylist(rows, schema=source_schema)
+            table = _add_partition_columns(table, partition_by)
+            yield table.select(output_names + [PARTITION_COLUMNS[key] for key in partition_by])
+
+    total = 0
+    if partition_by:
+        import pyarrow.dataset as ds
+
+        partition_fields = [pa.field(PARTITION_COLUMNS[key], pa.string()) for key in partition_by]
+        schema = pa.schema([source_schema.field(name) for name in output_names] + partition_fields)
+
+        def iter_batches():
+            nonlocal total
+            for table in iter_tables():
+                total += table.num_rows
+                yield from table.to_batches()
+
+        ds.write_dataset(
+            iter_batches(),
+            path,
+            schema=schema,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema(partition_fields), flavor="hive"),
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=compression, use_dictionary=string_columns
+            ),
+            min_rows_per_group=row_group_size,
+            max_rows_per_group=row_group_size,
+            existing_data_behavior="overwrite_or_ignore"
+        )
+        return total
+
+    writer = None
+    pending = []
+    pending_rows = 0
+    try:
+        for table in iter_tables():
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression=compression, use_dictionary=string_columns)
+            pending.append(table)
+            pending_rows += table.num_rows
+            total += table.num_rows
+
+            # 行グループ単位に満たない端数は次のチャンクと合わせて書き出す
+            if pending_rows >= row_group_size:
+                buffered = pa.concat_tables(pending)
+                full = (buffered.num_rows // row_group_size) * row_group_size
+                writer.write_table(buffered.slice(0, full), row_group_size=row_group_size)
+                pending = [buffered.slice(full)]
+                pending_rows = buffered.num_rows - full
+
+        if writer is not None and pending_rows:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def _decrypt_chunks(chunks: Iterable[List[Dict]], columns: Optional[List[str]] = None) -> Iterable[List[Dict]]:
+    """DBから読み出したチャンクを、出力する暗号化列だけ1チャンクずつ復号化"""
+    if not ENCRYPT_STORAGE:
+        return chunks
+    from app.security.data_protection import DataProtection
+    return DataProtection().decrypt_chunks(chunks, columns)
+
+
+def export_saved_videos(
+    filename: str,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    search_term: Optional[str] = None,
+    export_format: str = "csv",
+    columns: Optional[List[str]] = None,
+    partition_by: Optional[List[str]] = None,
+    compression: Optional[str] = None
+) -> int:
+    """データベースの保存済みデータをストリーミングでCSV / Parquetに出力"""
+    from app.db import iter_saved_videos
+
+    chunks = _decrypt_chunks(iter_saved_videos(chunk_size, search_term), columns)
+    if export_format == "parquet":
+        with span("export.parquet"):
+            total = export_to_parquet(chunks, filename, columns=columns, partition_by=partition_by)
+        print(f"{total:,}件のデータをParquet '{filename}' に出力しました")
+    else:
+        filename = with_compression_suffix(filename, compression)
+        with span("export.csv"):
+            total = export_stream_to_csv(chunks, filename, columns=columns, compression=compression)
+        print(f"{total:,}件のデータをCSVファイル '{filename}' に出力しました")
+    return total
+
+
+def _track_last_row(chunks: Iterable[List[Dict]], position: Dict) -> Iterator[List[Dict]]:
+    """チャンクを素通ししながら最後の行の (fetch_date, id) を記録"""
+    for rows in chunks:
+        if rows:
+            position["fetch_date"] = rows[-1]["fetch_date"]
+            position["id"] = rows[-1]["id"]
+        yield rows
+
+
+def export_incremental(
+    target: str,
+    output_dir: str,
+    export_format: str = "csv",
+    columns: Optional[List[str]] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    compression: Optional[str] = None,
+    lag_seconds: int = EXPORT_WATERMARK_LAG
+) -> Optional[str]:
+    """
+    前回のエクスポート以降に追加・更新された行だけを新しいファイルに出力する
+
+    エクスポート先（target）ごとに最後に出力した (fetch_date, id) を
+    ウォーターマークとして保存し、次回はその続きから読み出す。
+    処理時間はテーブル全体ではなく変更量に比例する。
+    fetch_date は書き込む側で付けるため、遅れてコミットされた行や同時に書き込まれた行が
+    ウォーターマークより前に入らないよう、直近 lag_seconds 秒の行は出力せず次回に回す
+    （ウォーターマークもその時点までしか進めない）。
+
+    Args:
+        target: エクスポート先の識別名
+        output_dir: 差分ファイルの出力ディレクトリ
+        export_format: "csv" または "parquet"
+        columns: 出力する列
+        chunk_size: 1チャンクあたりの行数
+        compression: CSV出力時の圧縮形式（"gzip", "zstd"）
+        lag_seconds: 出力を次回に回す直近の秒数
+
+    Returns:
+        出力したファイルのパス（変更がない場合は None）
+    """
+    from app.db import get_export_watermark, iter_changed_videos, save_export_watermark
+
+    until = datetime.now() - timedelta(seconds=lag_seconds)
+    watermark = get_export_watermark(target)
+    if watermark:
+        chunks = iter_changed_videos(watermark["last_fetch_date"], watermark["last_id"], chunk_size, until=until)
+    else:
+        chunks = iter_changed_videos(chunk_size=chunk_size, until=until)
+    chunks = _decrypt_chunks(chunks, columns)
+
+    # 変更がない場合は空のファイルを作らない
+    first = next((rows for rows in chunks if rows), None)
+    if first is None:
+        print(f"'{target}' に出力する変更はありません")
+        return None
+
+    position: Dict = {}
+    tracked = _track_last_row(itertools.chain([first], chunks), position)
+
+    os.makedirs(output_dir, exist_ok=True)
+    extension = "parquet" if export_format == "parquet" else "csv"
+    path = os.path.join(output_dir, f"{target}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
+    if export_format == "parquet":
+        with span("export.parquet"):
+            total = export_to_parquet(tracked, path, columns=columns)
+    else:
+        path = with_compression_suffix(path, compression)
+        with span("export.csv"):
+            total = export_stream_to_csv(tracked, path, columns=columns, compression=compression)
+
+    # 書き込みが完了してからウォーターマークを進める
+    save_export_watermark(target, position["fetch_date"], position["id"])
+    print(f"{total:,}件の変更を '{path}' に出力しました")
+    return path
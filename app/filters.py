@@ -0,0 +1,95 @@
+# 動画の絞り込み条件（API・モック・SQL のできるだけ手前で適用する）
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models import VideoBatch
+
+
+@dataclass(frozen=True)
+class VideoFilter:
+    """
+    再生数・いいね数・投稿日の絞り込み条件
+
+    to_api_filters() / to_api_conditions() でAPIリクエストに、to_sql() で WHERE 句に変換する。
+    API側で絞り込めない条件は matches() / apply() で取得したページごとに適用する。
+    """
+
+    min_views: int = 0
+    min_likes: int = 0
+    days_ago: Optional[int] = None
+
+    @property
+    def created_after(self) -> Optional[datetime]:
+        """投稿日時の下限（days_ago 未指定の場合は None）"""
+        if not self.days_ago:
+            return None
+        return datetime.now() - timedelta(days=self.days_ago)
+
+    def is_empty(self) -> bool:
+        return not (self.min_views > 0 or self.min_likes > 0 or self.days_ago)
+
+    def matches(self, video: Dict[str, Any]) -> bool:
+        """APIレスポンス形式の動画が条件を満たすか"""
+        stats = video.get("stats", {})
+        if stats.get("playCount", 0) < self.min_views:
+            return False
+        if stats.get("diggCount", 0) < self.min_likes:
+            return False
+        created_after = self.created_after
+        if created_after and video.get("createTime", 0) < created_after.timestamp():
+            return False
+        return True
+
+    def apply(self, videos: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """条件を満たす動画のみを返す"""
+        if self.is_empty():
+            return list(videos)
+        return [video for video in videos if self.matches(video)]
+
+    def mask(self, batch: VideoBatch) -> np.ndarray:
+        """VideoBatch の各行が条件を満たすかの真偽値配列"""
+        mask = (batch.column("view_count") >= self.min_views) & (batch.column("like_count") >= self.min_likes)
+        created_after = self.created_after
+        if created_after:
+            mask &= batch.column("post_date") >= np.datetime64(created_after, "us")
+        return mask
+
+    def to_api_filters(self) -> Dict[str, Dict[str, Any]]:
+        """動画一覧APIの filters 用の条件"""
+        filters = {
+            "view_count": {"gte": self.min_views},
+            "like_count": {"gte": self.min_likes}
+        }
+        created_after = self.created_after
+        if created_after:
+            filters["create_time"] = {"gte": created_after.isoformat()}
+        return filters
+
+    def to_api_conditions(self) -> List[Dict[str, Any]]:
+        """検索APIの query.and 用の条件（検索APIで絞り込めるのは投稿日のみ）"""
+        created_after = self.created_after
+        if not created_after:
+            return []
+        return [{
+            "operation": "GTE",
+            "field_name": "create_date",
+            "field_values": [created_after.strftime("%Y%m%d")]
+        }]
+
+    def to_sql(self) -> Tuple[List[str], List[Any]]:
+        """videos テーブルに対する WHERE 条件とパラメータ"""
+        conditions, params = [], []
+        if self.min_views > 0:
+            conditions.append("view_count >= %s")
+            params.append(self.min_views)
+        if self.min_likes > 0:
+            conditions.append("like_count >= %s")
+            params.append(self.min_likes)
+        created_after = self.created_after
+        if created_after:
+            conditions.append("post_date >= %s")
+            params.append(created_after)
+        return conditions, params
@@ -0,0 +1,248 @@
+# ジョブファイル（YAML / JSONL）に書いた複数の取得条件をまとめて実行するバッチ処理
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from app.api.client import TikTokAPIClient
+from app.api.rate_limiter import RateLimiter
+from app.checkpoint import CrawlCheckpoint, CrawlProgress
+from app.config import CRAWL_CHECKPOINT_DIR, JOB_CONCURRENCY
+from app.db import save_video_data
+from app.export import export_stream_to_csv, export_to_parquet, with_compression_suffix
+from app.models import VideoBatch
+from app.pipeline import get_videos_by_mode, prepare_batch
+from app.profiling import span
+from app.sketches import StreamingStats, record_trending
+
+# ジョブの種類
+JOB_TYPES = ("trend", "hashtag", "user", "video")
+
+
+@dataclass
+class Job:
+    """1件の取得条件（query はハッシュタグ・ユーザー名、video の場合は ids に動画IDまたはURL）"""
+
+    type: str
+    query: Optional[str] = None
+    ids: List[str] = field(default_factory=list)
+    count: int = 10
+    sort_by: str = "views"
+    min_views: int = 0
+    min_likes: int = 0
+    days_ago: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """辞書からジョブを作成（未知のキーや不正な種類はエラー）"""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"不明なジョブの項目です: {', '.join(sorted(unknown))}")
+        job = cls(**data)
+        if job.type not in JOB_TYPES:
+            raise ValueError(f"不明なジョブの種類です: {job.type}")
+        if job.type in ("hashtag", "user") and not job.query:
+            raise ValueError(f"{job.type} ジョブには query が必要です")
+        if job.type == "video" and not job.ids:
+            raise ValueError("video ジョブには ids が必要です")
+        return job
+
+    @property
+    def label(self) -> str:
+        if self.type == "video":
+            return f"video({len(self.ids)}件)"
+        return f"{self.type}:{self.query}" if self.query else self.type
+
+
+def load_jobs(path: str) -> List[Job]:
+    """
+    ジョブファイルを読み込む
+
+    JSONL の場合は1行1ジョブ。YAML の場合はジョブのリスト、または
+    defaults（全ジョブ共通の設定）と jobs を持つマッピング。
+
+    例（YAML）:
+        defaults: {count: 50, min_views: 1000}
+        jobs:
+          - {type: hashtag, query: ダンス}
+          - {type: user, query: creator_1, sort_by: likes}
+          - {type: video, ids: ["7123456789012345678"]}
+    """
+    defaults: Dict[str, Any] = {}
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    elif path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAMLのジョブファイルを読み込むには PyYAML をインストールしてください")
+        with open(path, encoding="utf-8") as f:
+            document = yaml.safe_load(f) or []
+        if isinstance(document, dict):
+            defaults = document.get("defaults", {})
+            entries = document.get("jobs", [])
+        else:
+            entries = document
+    else:
+        raise ValueError(f"対応していないジョブファイルの形式です: {path}（.jsonl / .yaml / .yml）")
+
+    return [Job.from_dict({**defaults, **entry}) for entry in entries]
+
+
+class JobProgress:
+    """ジョブ全体の進捗と取得速度を1行で表示"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.videos = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    def update(self, videos: int = 0, failed: bool = False, skipped: bool = False):
+        self.completed += 1
+        self.failed += failed
+        self.skipped += skipped
+        self.videos += videos
+        elapsed = time.monotonic() - self.started
+        print(
+            f"\r進捗: {self.completed}/{self.total} ジョブ（失敗 {self.failed}）"
+            f" 動画 {self.videos:,}件 {self.videos / elapsed if elapsed else 0:,.1f}件/秒",
+            end="", flush=True
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "jobs": self.total,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "videos": self.videos,
+            "elapsed": elapsed,
+            "videos_per_second": self.videos / elapsed if elapsed else 0.0
+        }
+
+
+def _run_job(api_client: TikTokAPIClient, rate_limiter: RateLimiter, job: Job,
+             progress: Optional[CrawlProgress] = None) -> VideoBatch:
+    """
+    1件のジョブを取得・変換・保存する（ワーカースレッドで実行）
+
+    APIクライアントの取得処理は内部で同期的に通信・待機するため、
+    スレッドごとにイベントループを作って実行する。progress 指定時は
+    取得済みで未保存のデータがあれば取得せずに保存する。
+    """
+    if progress is not None and progress.pending is not None:
+        videos = progress.pending
+    else:
+        if api_client.use_mock:
+            # モックはリクエストごとのレート制限を通らないため、ジョブ単位で枠を確保
+            rate_limiter.acquire()
+
+        search_term = job.ids if job.type == "video" else job.query
+        with span("fetch"):
+            videos = asyncio.run(get_videos_by_mode(
+                api_client, job.type, search_term,
+                count=job.count, sort_by=job.sort_by,
+                min_views=job.min_views, min_likes=job.min_likes, days_ago=job.days_ago,
+                progress=progress
+            ))
+        if progress is not None:
+            progress.set_pending(videos)
+
+    batch = prepare_batch(videos) if videos else VideoBatch.empty()
+    if len(batch):
+        with span("save"):
+            save_video_data(batch)
+    if progress is not None:
+        progress.complete()
+    return batch
+
+
+async def run_jobs(
+    jobs: List[Job],
+    concurrency: int = JOB_CONCURRENCY,
+    export_path: Optional[str] = None,
+    export_format: str = "csv",
+    compression: Optional[str] = None,
+    use_mock: Optional[bool] = None,
+    resume: bool = False,
+    checkpoint_dir: str = CRAWL_CHECKPOINT_DIR
+) -> Dict[str, Any]:
+    """
+    ジョブを同時実行数 concurrency で並行に実行する
+
+    全ジョブで1つのAPIクライアントとレート制限を共有する。取得結果はジョブごとに
+    データベースへまとめて保存し、トレンド集計・統計に加える。export_path 指定時は
+    全ジョブの結果を1つのファイルに出力する。
+
+    ジョブごとの進捗はチェックポイントに記録し、resume が真の場合は同じジョブファイルで
+    完了済みのジョブを飛ばし、途中のジョブは記録済みのページの続きから取得する
+    （飛ばしたジョブの結果は出力に含まれない）。全ジョブが成功した場合はチェックポイントを削除する。
+
+    Returns:
+        ジョブ数・失敗数・動画数・経過秒数・取得速度と、失敗したジョブのエラー
+    """
+    checkpoint = CrawlCheckpoint.open({"jobs": [asdict(job) for job in jobs]}, resume=resume, directory=checkpoint_dir)
+    rate_limiter = RateLimiter()
+    api_client = TikTokAPIClient(use_mock=use_mock, rate_limiter=rate_limiter)
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = JobProgress(len(jobs))
+    stream_stats = StreamingStats()
+    batches: List[VideoBatch] = []
+    errors: Dict[str, str] = {}
+
+    async def run(index: int, job: Job):
+        key = f"{index}:{job.label}"
+        if checkpoint.is_completed(key):
+            progress.update(skipped=True)
+            return
+        async with semaphore:
+            try:
+                batch = await asyncio.to_thread(_run_job, api_client, rate_limiter, job, checkpoint.progress(key))
+            except Exception as e:
+                errors[job.label] = str(e)
+                progress.update(failed=True)
+                return
+        # 統計はイベントループのスレッドでのみ更新する。トレンド集計はファイルのロック・
+        # 読み書きを伴うため、他のジョブを待たせないよう別スレッドで行う
+        if len(batch):
+            stream_stats.update(batch)
+            await asyncio.to_thread(record_trending, batch)
+            if export_path:
+                batches.append(batch)
+        progress.update(len(batch))
+
+    await asyncio.gather(*(run(index, job) for index, job in enumerate(jobs)))
+    print()
+    if not errors:
+        checkpoint.clear()
+
+    if export_path and batches:
+        if export_format == "parquet":
+            with span("export.parquet"):
+                export_to_parquet(batches, export_path)
+        else:
+            export_path = with_compression_suffix(export_path, compression)
+            with span("export.csv"):
+                export_stream_to_csv(batches, export_path, compression=compression)
+        print(f"取得結果を {export_path} に出力しました")
+
+    for label, message in errors.items():
+        print(f"ジョブ失敗: {label} - {message}")
+    if errors:
+        print("失敗したジョブは --resume で再実行できます")
+
+    summary = progress.summary()
+    summary["errors"] = errors
+    summary["stats"] = stream_stats.result()
+    print(
+        f"{summary['jobs'] - summary['failed']}/{summary['jobs']} ジョブが完了しました: "
+        f"動画 {summary['videos']:,}件（{summary['elapsed']:.1f}秒, {summary['videos_per_second']:,.1f}件/秒）"
+        + (f"、前回完了済み {summary['skipped']}ジョブを省略" if summary["skipped"] else "")
+    )
+    return summary
@@ -0,0 +1,110 @@
+# アプリ全体のログ設定（出力はキュー経由で別スレッドが行い、取得・保存の処理を待たせない）
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from app.config import (
+    LOG_BACKUP_COUNT, LOG_FILE, LOG_LEVEL, LOG_MAX_BYTES,
+    LOG_SAMPLE_INTERVAL, LOG_SAMPLE_RATE
+)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: str = LOG_FILE, console: bool = True) -> QueueListener:
+    """
+    ログの出力先を設定（起動時に1回だけ呼ぶ。2回目以降は設定済みのものを返す）
+
+    ルートロガーにはキューに積むだけの QueueHandler を付け、ファイル・コンソールへの
+    書き込みは QueueListener のスレッドで行う。キューに残ったログは終了時に書き出す。
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        handlers.append(RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        ))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """キューに残ったログを書き出して出力スレッドを止める"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class SampledLogger:
+    """
+    リクエスト・行ごとに発生するログの出力数を制限するロガー
+
+    interval 秒ごとに rate 件までを出力し、それを超えたログは件数だけを数えて、
+    次に出力するログに省略した件数を添える。出力しないレベルのログは
+    ロックも取らずに捨てるため、詳細ログを無効にしている間のコストはほぼない。
+    """
+
+    def __init__(self, logger: logging.Logger, rate: int = LOG_SAMPLE_RATE, interval: float = LOG_SAMPLE_INTERVAL):
+        self.logger = logger
+        self.rate = rate
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._window_end = 0.0
+        self._count = 0
+        self._suppressed = 0
+
+    def log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._window_end:
+                self._window_end = now + self.interval
+                self._count = 0
+            if self._count >= self.rate:
+                self._suppressed += 1
+                return
+            self._count += 1
+            suppressed, self._suppressed = self._suppressed, 0
+        if suppressed:
+            msg = f"{msg}（同種のログ {suppressed}件を省略）"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg: str, *args):
+        self.log(logging.WARNING, msg, *args)
+
+    def error(self, msg: str, *args):
+        self.log(logging.ERROR, msg, *args)
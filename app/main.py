@@ -1,100 +1,47 @@
 # TikTokデータ取得・分析アプリのメインスクリプト
-import asyncio
-import time
-import os
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
+#
+# 起動を速くするため、pandas・APIクライアント・データベースなどの重い依存は
+# モジュールの読み込み時ではなく、それを使う関数・サブコマンドの中で読み込む。
+from __future__ import annotations
+
 import argparse
-import pandas as pd
-from typing import Dict, List
-import pytz
+import logging
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Union
 
-from app.api.client import TikTokAPIClient
-from app.db import setup_database, save_video_data, get_saved_videos, get_video_statistics, export_to_csv
-from app.models import VideoData
-from app.config import USE_MOCK_API
-from app.ui.terminal_ui import TerminalUI
+from app.checkpoint import CrawlCheckpoint
+from app.config import ENCRYPT_STORAGE, JOB_CONCURRENCY, USE_MOCK_API
+from app.pipeline import get_videos_by_mode, prepare_batch
+from app.profiling import span
 from app.utils import extract_video_id
 
-# 環境変数の読み込み
-load_dotenv()
+if TYPE_CHECKING:
+    from app.api.client import TikTokAPIClient
+    from app.cache import SessionCache
+    from app.models import VideoBatch
+    from app.sketches import StreamingStats
+    from app.ui.terminal_ui import TerminalUI
+
+logger = logging.getLogger(__name__)
 
-async def get_videos_by_mode(api_client, mode, search_term=None, count=10, sort_by="views", min_views=1000, min_likes=0, days_ago=None):
+async def interactive_mode():
     """
-    指定したモードに応じて動画を取得する
+    インタラクティブモードのメイン処理
     
-    Args:
-        api_client: APIクライアント
-        mode: 取得モード
-        search_term: 検索語
-        count: 取得数
-        sort_by: ソート基準
-        min_views: 最小再生回数
-        min_likes: 最小いいね数
-        days_ago: 何日前までの動画を対象にするか
-        
-    Returns:
-        取得した動画リスト
+    取得した結果は取得対象ごとにセッション中キャッシュし、並び替え・絞り込みの変更や
+    同じ対象の再取得はキャッシュから行う。APIからの更新は結果画面で明示的に選んだ場合のみ行う。
     """
-    videos = []
-    
-    if mode == "trend":
-        print(f"トレンド動画を取得しています...")
-        videos = await api_client.get_trending_videos(
-            count=count,
-            sort_by=sort_by,
-            min_views=min_views,
-            min_likes=min_likes,
-            days_ago=days_ago
-        )
-        
-    elif mode == "hashtag":
-        if not search_term:
-            # ハッシュタグが指定されていない場合はトレンド動画を取得
-            print(f"トレンド動画を取得しています...")
-            videos = await api_client.get_trending_videos(
-                count=count,
-                sort_by=sort_by,
-                min_views=min_views,
-                min_likes=min_likes,
-                days_ago=days_ago
-            )
-        else:
-            # ハッシュタグが指定されている場合
-            hashtag = search_term.replace("#", "")
-            print(f"ハッシュタグ '#{hashtag}' の動画を取得しています...")
-            videos = await api_client.get_hashtag_videos(hashtag=hashtag, count=count, sort_by=sort_by, min_views=min_views)
-        
-    elif mode == "video":
-        print(f"指定された動画を取得しています...")
-        videos = []
-        for url in search_term:
-            video_id = extract_video_id(url)
-            if video_id:
-                try:
-                    video = await api_client.get_video_by_id(video_id)
-                    if video:
-                        videos.append(video)
-                except Exception as e:
-                    print(f"動画ID {video_id} の取得に失敗しました: {e}")
-                    continue
-    
-    # 日付フィルタリング
-    if days_ago and videos:
-        cutoff_date = datetime.now() - timedelta(days=days_ago)
-        cutoff_timestamp = int(cutoff_date.timestamp())
-        videos = [v for v in videos if v.get('createTime', 0) >= cutoff_timestamp]
-    
-    # いいね数でフィルタリング
-    if min_likes > 0 and videos:
-        videos = [v for v in videos if v.get('stats', {}).get('diggCount', 0) >= min_likes]
+    from app.api.client import TikTokAPIClient
+    from app.cache import SessionCache
+    from app.sketches import StreamingStats
+    from app.ui.terminal_ui import TerminalUI
     
-    return videos
-
-async def interactive_mode():
-    """インタラクティブモードのメイン処理"""
     ui = TerminalUI()
     api_client = TikTokAPIClient()
+    # セッション中に取得した全データの統計（行は保持しない）
+    session_stats = StreamingStats()
+    cache = SessionCache()
 
     while True:
         choice = ui.initial_screen()
@@ -104,33 +51,47 @@ async def interactive_mode():
         if choice == "1":  # データ取得
             settings = ui.data_settings_screen()
             if settings:
-                data = await fetch_data(api_client, settings)
+                cached = cache.lookup(settings)
+                if cached is not None:
+                    print("\n取得済みの結果から表示します（最新にするには結果画面で「更新」を選択）")
+                    data, batch = cached.view(settings)
+                else:
+                    data = await fetch_data(api_client, settings, session_stats)
+                    if data:
+                        data, batch = cache.store(settings, data).view(settings)
                 if data:
-                    stats = calculate_stats(data)
+                    stats = calculate_stats(batch)
+                    views = session_stats.result()["views"]
+                    print(f"\nセッション累計: {views['count']:,}件（再生数の平均: {views['mean']:,.0f} / 中央値: {views['median']:,.0f}）")
                     while True:
                         result_choice = ui.results_screen(stats)
+                        if result_choice in ("5", "6"):
+                            if result_choice == "5":  # 並び替え・絞り込み（キャッシュ内で処理）
+                                settings = ui.view_settings_screen(settings)
+                            else:  # APIから更新（新しい動画・変わった動画のみ保存）
+                                updated = await refresh_data(api_client, cache, settings, session_stats)
+                                print(f"\n{updated}件の新しい動画・更新された動画を取り込みました")
+                                input("Enterキーで続行...")
+                            data, batch = cache.get(settings).view(settings)
+                            stats = calculate_stats(batch)
+                            continue
                         if handle_results(result_choice, data, ui):
                             break
                 else:
                     print("\nデータが取得できませんでした。")
                     input("Enterキーで続行...")
 
-def calculate_stats(data: List[Dict]) -> Dict:
+def calculate_stats(data: Union[List[Dict], VideoBatch]) -> Dict:
     """データの統計情報を計算"""
-    total_views = sum(v.get("stats", {}).get("playCount", 0) for v in data)
-    total_likes = sum(v.get("stats", {}).get("diggCount", 0) for v in data)
-    
-    return {
-        "total_videos": len(data),
-        "total_views": total_views,
-        "total_likes": total_likes,
-        "avg_views": total_views / len(data) if data else 0,
-        "avg_likes": total_likes / len(data) if data else 0
-    }
+    from app.analytics import compute_stats
+    return compute_stats(data)
 
 def handle_results(choice: str, data: List[Dict], ui: TerminalUI) -> bool:
     """結果画面での選択を処理"""
     if choice == "1":  # CSVエクスポート
+        import pytz
+        from app.db import export_to_csv
+        
         # 日本時間の日付を取得
         jst = pytz.timezone('Asia/Tokyo')
         current_time = datetime.now(jst)
@@ -171,42 +132,66 @@ def display_videos_table(data: List[Dict]):
         print("\n表示するデータがありません。")
         return
 
-    # データ構造のデバッグ出力を追加
-    print("\nデータ構造確認:", data[0] if data else "データなし")
-    
     try:
-        # 表示するデータの準備
-        table_data = []
-        for video in data:
-            stats = video.get("stats", {})
-            author = video.get("author", {})
-            
-            # 行データの作成（データ構造に合わせて修正）
-            row = {
-                "投稿日時": datetime.fromtimestamp(int(video.get("createTime", 0))).strftime("%Y/%m/%d %H:%M"),
-                "作成者": author.get("uniqueId", "不明"),
-                "再生数": f'{stats.get("playCount", 0):,}',
-                "いいね数": f'{stats.get("diggCount", 0):,}',
-                "コメント数": f'{stats.get("commentCount", 0):,}',
-                "シェア数": f'{stats.get("shareCount", 0):,}',
-                "動画URL": video.get("video", {}).get("playAddr", "")
-            }
-            table_data.append(row)
-
-        # pandasを使用してテーブル表示
-        df = pd.DataFrame(table_data)
+        from app.analytics import compute_stats
+        from app.ui.pager import ResultPager
+        from app.ui.terminal_ui import format_stats_table
+        
+        # 表示するページの行だけを整形して表示
         print("\n=== 取得した動画のサマリー ===")
-        print(df.to_string(index=False))
+        ResultPager(data, columns=["投稿日時", "作成者", "再生数", "いいね数", "コメント数", "シェア数", "動画URL"]).run()
         
         # 統計情報の表示
+        stats = compute_stats(data)
         print("\n=== 統計情報 ===")
-        print(f"総動画数: {len(data):,}")
-        print(f"総再生数: {sum(v.get('stats', {}).get('playCount', 0) for v in data):,}")
-        print(f"総いいね数: {sum(v.get('stats', {}).get('diggCount', 0) for v in data):,}")
+        print(f"総動画数: {stats['total_videos']:,}")
+        print(f"総再生数: {stats['total_views']:,}")
+        print(f"総いいね数: {stats['total_likes']:,}")
+        print(f"エンゲージメント率: {stats['overall_engagement_rate']:.2%}")
+        print(format_stats_table(stats))
         
     except Exception as e:
         print(f"データ表示エラー: {e}")
 
+def rank_by_velocity(videos: List[Dict]) -> List[Dict]:
+    """保存済みの履歴から再生数の伸びを計算し、伸びの大きい順に並べ替える"""
+    from app.velocity import load_velocity
+    
+    velocity = load_velocity([video["id"] for video in videos])
+    if velocity.empty:
+        print("再生数の伸びを計算できる履歴がありません（同じ動画を2回以上取得すると計算できます）")
+        return videos
+
+    print("\n=== 再生数の伸び ===")
+    table = velocity.rename(columns={
+        "video_id": "動画ID", "cohort": "ハッシュタグ", "observations": "取得回数",
+        "views_per_hour": "再生数/時", "acceleration": "加速度", "robust_z": "zスコア"
+    })
+    print(table.drop(columns=["view_count", "is_anomaly"]).to_string(index=False, float_format="{:,.1f}".format))
+
+    anomalies = velocity[velocity["is_anomaly"]]
+    if not anomalies.empty:
+        print(f"\n急上昇中の動画: {', '.join(anomalies['video_id'])}")
+
+    # 伸びを計算できなかった動画は末尾に残す
+    order = {video_id: rank for rank, video_id in enumerate(velocity["video_id"])}
+    return sorted(videos, key=lambda video: order.get(video["id"], len(order)))
+
+def display_trending(limit: int = 10):
+    """これまでに取得したデータのトレンド（保存済みの集計から即座に表示）"""
+    from app.sketches import TrendingTracker
+    
+    tracker = TrendingTracker.load()
+    tracker.decay()
+    titles = {"hashtags": "ハッシュタグ", "creators": "クリエイター", "music": "楽曲"}
+    for kind, title in titles.items():
+        print(f"\n=== 人気の{title} ===")
+        top = tracker.top(kind, limit)
+        if not top:
+            print("データがありません")
+        for rank, entry in enumerate(top, 1):
+            print(f"{rank:>2}. {entry['item']} ({entry['count']:,.1f}件)")
+
 def format_number(num):
     """数値を読みやすい形式にフォーマット"""
     if num >= 1000000:
@@ -223,49 +208,137 @@ def parse_args():
                         help="取得モード: trend=トレンド動画, user=特定ユーザー, hashtag=ハッシュタグ")
     parser.add_argument("--search", type=str, help="検索語（ユーザー名またはハッシュタグ）")
     parser.add_argument("--count", type=int, default=10, help="取得する動画数")
-    parser.add_argument("--sort", choices=["views", "likes", "comments", "date"], default="views",
-                        help="ソート基準")
+    parser.add_argument("--sort", choices=["views", "likes", "comments", "shares", "date", "engagement_rate", "velocity"],
+                        default="views",
+                        help="ソート基準（velocity=過去の取得からの1時間あたりの再生数の伸び）")
     parser.add_argument("--min-views", type=int, default=1000, help="最小再生回数")
     parser.add_argument("--force-mock", action="store_true", help="Force using mock API")
     parser.add_argument("--force-real-api", action="store_true", help="Force using real API")
+    parser.add_argument("--jobs", type=str, metavar="FILE",
+                        help="ジョブファイル（.yaml / .jsonl）の取得条件をまとめて実行して終了（--export で結果を1ファイルに出力）")
+    parser.add_argument("--concurrency", type=int, default=JOB_CONCURRENCY, help="--jobs 実行時の同時実行ジョブ数")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="大きなバッチの変換・CSV出力に使うプロセス数（既定: CPUコア数、1で無効）")
+    parser.add_argument("--schedule", action="store_true",
+                        help="監視リストの対象を再生数の伸びに応じた間隔で取得し続ける（常駐）")
+    parser.add_argument("--watch", action="append", metavar="TYPE:VALUE",
+                        help="監視リストに追加して終了（例: hashtag:ダンス, video:7123456789012345678）")
+    parser.add_argument("--unwatch", action="append", metavar="TYPE:VALUE", help="監視リストから削除して終了")
+    parser.add_argument("--profile", action="store_true",
+                        help="処理段階ごとの時間・メモリを計測し、終了時にフレームグラフ用のプロファイルと集計表を出力")
+    parser.add_argument("--resume", action="store_true",
+                        help="中断した取得（コマンドライン引数モード・--jobs）をチェックポイントから再開")
+    parser.add_argument("--trending", action="store_true", help="これまでに取得したデータの人気ハッシュタグ・クリエイター・楽曲を表示して終了")
+    parser.add_argument("--purge", action="store_true", help="保持期間を過ぎたデータを削除して終了")
+    parser.add_argument("--archive", action="store_true", help="--purge 時に削除前にアーカイブテーブルへ退避")
+    parser.add_argument("--export", type=str, metavar="PATH", help="保存済みデータ全件をストリーミングで出力して終了")
+    parser.add_argument("--incremental", type=str, metavar="TARGET",
+                        help="前回のエクスポート以降の変更分のみを出力して終了（--export で出力先ディレクトリを指定）")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="エクスポート形式")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], help="CSV出力を並列圧縮する")
+    parser.add_argument("--columns", type=lambda s: s.split(","), help="出力する列（カンマ区切り）")
+    parser.add_argument("--partition-by", type=lambda s: s.split(","), metavar="fetch_date,hashtag",
+                        help="Parquet出力時のパーティション（fetch_date, hashtag）")
     
     return parser.parse_args()
 
-async def fetch_data(api_client: TikTokAPIClient, settings: Dict) -> List[Dict]:
-    """データ取得とソート処理"""
+def parse_watch_item(value: str) -> tuple:
+    """TYPE:VALUE 形式の監視対象を (種類, 値) に変換"""
+    item_type, _, item_value = value.partition(":")
+    if item_type not in ("hashtag", "video") or not item_value:
+        raise SystemExit(f"監視対象は hashtag:タグ名 または video:動画ID で指定してください: {value}")
+    if item_type == "hashtag":
+        item_value = item_value.lstrip("#")
+    else:
+        item_value = extract_video_id(item_value)
+    return item_type, item_value
+
+async def fetch_data(api_client: TikTokAPIClient, settings: Dict, stream_stats: StreamingStats = None) -> List[Dict]:
+    """データ取得と保存（stream_stats 指定時は取得したページを統計に加える）"""
+    from app.db import save_video_data
+    from app.sketches import record_trending
+    
     try:
-        # APIからデータを取得
-        data = await api_client.fetch_videos(settings)
-        
-        if data:
-            # ソートキーの設定
-            sort_keys = {
-                "views": ("stats", "playCount"),
-                "likes": ("stats", "diggCount"),
-                "comments": ("stats", "commentCount"),
-                "shares": ("stats", "shareCount")
-            }
-            
-            # ソート処理
-            sort_by = settings.get("sort_by", "views")
-            if sort_by in sort_keys:
-                key1, key2 = sort_keys[sort_by]
-                data.sort(key=lambda x: x.get(key1, {}).get(key2, 0), reverse=True)
+        # APIからデータを取得（並び替え・件数の絞り込みは取得時に1回だけ行う）
+        with span("fetch"):
+            data = await api_client.fetch_videos(settings)
         
         if data:
-            # データベースに保存
-            video_objects = [VideoData.from_api_response(v) for v in data]
-            save_video_data(video_objects)
+            # 列指向のバッチに変換してデータベースに保存
+            batch = prepare_batch(data)
+            if stream_stats is not None:
+                stream_stats.update(batch)
+            with span("save"):
+                record_trending(batch)
+                save_video_data(batch)
             return data
         return []
     except Exception as e:
-        print(f"データ取得エラー: {e}")
+        logger.error("データ取得エラー: %s", e)
         return []
 
-async def main(mode="trend", search_term=None, count=10, sort_by="views", min_views=1000):
+async def refresh_data(api_client: TikTokAPIClient, cache: SessionCache, settings: Dict,
+                       stream_stats: StreamingStats = None) -> int:
+    """
+    キャッシュ済みの取得対象をAPIから取得し直し、新しい動画と内容が変わった動画だけを保存
+    
+    取得はキャッシュした時の絞り込み条件で行う（特定動画の場合はまとめて1回の呼び出しで取得）。
+    
+    Returns:
+        取り込んだ動画の数
+    """
+    from app.db import save_video_data
+    from app.sketches import record_trending
+    
+    from app.cache import settings_filter
+    from app.filters import VideoFilter
+    
+    result = cache.get(settings)
+    # キャッシュした時と現在の条件のうち緩い方で取得する
+    fetched, requested = result.fetched_filter, settings_filter(settings)
+    video_filter = VideoFilter(
+        min_views=min(fetched.min_views, requested.min_views),
+        min_likes=min(fetched.min_likes, requested.min_likes),
+        days_ago=max(fetched.days_ago, requested.days_ago) if fetched.days_ago and requested.days_ago else None
+    )
+    count = max(result.fetched_count, settings.get("count") or 0)
+    with span("fetch"):
+        if settings["type"] == "video":
+            videos = await api_client.get_videos_by_ids(settings["video_ids"])
+        else:
+            videos = await api_client.fetch_videos({
+                **settings,
+                "count": count,
+                "min_views": video_filter.min_views,
+                "min_likes": video_filter.min_likes,
+                "time_range": video_filter.days_ago
+            })
+    
+    updated = result.merge(videos)
+    result.fetched_filter, result.fetched_count = video_filter, count
+    if updated:
+        batch = prepare_batch(updated)
+        if stream_stats is not None:
+            stream_stats.update(batch)
+        with span("save"):
+            record_trending(batch)
+            save_video_data(batch)
+    return len(updated)
+
+async def main(mode="trend", search_term=None, count=10, sort_by="views", min_views=1000,
+               export_format="csv", columns=None, partition_by=None, compression=None, resume=False):
     """
     メイン実行関数（コマンドライン引数用）
+    
+    取得の進捗はチェックポイントに記録し、resume が真の場合は同じ条件で中断した
+    取得の続き（未取得のページ、または取得済みで未保存のデータ）から再開する。
     """
+    import pytz
+    from app.api.client import TikTokAPIClient
+    from app.db import export_to_csv, save_video_data, setup_database
+    from app.export import export_to_parquet
+    from app.sketches import record_trending
+    
     print(f"TikTok検索を開始します... モード: {mode}, ソート: {sort_by}")
     
     # データベース初期化
@@ -282,19 +355,43 @@ async def main(mode="trend", search_term=None, count=10, sort_by="views", min_vi
     # APIクライアントの初期化
     api_client = TikTokAPIClient(use_mock=use_mock)
     
-    # 動画データ取得
-    videos = await get_videos_by_mode(api_client, mode, search_term, count, sort_by, min_views)
+    # 動画データ取得（伸びの順は保存後に履歴から計算するため、APIには再生数順を指定）
+    api_sort = "views" if sort_by == "velocity" else sort_by
+    checkpoint = CrawlCheckpoint.open(
+        {"mode": mode, "search_term": search_term, "count": count, "sort_by": api_sort, "min_views": min_views},
+        resume=resume
+    )
+    progress = checkpoint.progress("main")
+    if progress.pending is not None:
+        videos = progress.pending
+        print(f"取得済みの{len(videos)}件から再開します")
+    else:
+        with span("fetch"):
+            videos = await get_videos_by_mode(api_client, mode, search_term, count, api_sort, min_views, progress=progress)
+        progress.set_pending(videos)
     
     if not videos:
         print("条件に合う動画が見つかりませんでした。")
+        checkpoint.clear()
         return
         
-    # VideoDataオブジェクトに変換
-    video_objects = [VideoData.from_api_response(v) for v in videos]
+    # 列指向のバッチに変換
+    batch = prepare_batch(videos)
     
-    # データベースに保存
-    save_video_data(video_objects)
-    print("データをデータベースに保存しました")
+    # データベースに保存（再開時に保存済みであれば保存・集計し直さない）
+    if not progress.saved:
+        with span("save"):
+            save_video_data(batch)
+            record_trending(batch)
+        progress.mark_saved()
+        print("データをデータベースに保存しました")
+    
+    if sort_by == "velocity":
+        ranked = rank_by_velocity(videos)
+        # 出力するバッチも伸びの順に並べ替える
+        positions = {id(video): index for index, video in enumerate(videos)}
+        batch = batch.take([positions[id(video)] for video in ranked])
+        videos = ranked
     
     # 動画情報をテーブル形式で表示
     display_videos_table(videos)
@@ -312,15 +409,115 @@ async def main(mode="trend", search_term=None, count=10, sort_by="views", min_vi
         filename_prefix = "specific"
     
     # 日本時間でのタイムスタンプを追加
-    csv_filename = f"{filename_prefix}_{current_time.strftime('%Y%m%d_%H%M%S')}.csv"
+    timestamp = current_time.strftime('%Y%m%d_%H%M%S')
+    
+    if export_format == "parquet":
+        # Parquetに出力
+        parquet_path = f"{filename_prefix}_{timestamp}" + ("" if partition_by else ".parquet")
+        with span("export.parquet"):
+            export_to_parquet([batch], parquet_path, columns=columns, partition_by=partition_by)
+        print(f"データをParquet '{parquet_path}' に出力しました")
+    else:
+        # CSVに出力
+        csv_filename = f"{filename_prefix}_{timestamp}.csv"
+        rows = batch.to_records()
+        if columns:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        export_to_csv(rows, csv_filename, compression=compression)
     
-    # CSVに出力
-    export_to_csv([v.__dict__ for v in video_objects], csv_filename)
+    checkpoint.clear()
 
 if __name__ == "__main__":
     args = parse_args()
+    # ログの出力先はモジュールの読み込み時ではなく起動時に1回だけ設定する
+    from app.logger import setup_logging
+    setup_logging()
+    if ENCRYPT_STORAGE:
+        # 鍵の設定の誤りは最初の保存ではなく起動時に知らせる
+        from app.security.data_protection import check_encryption_key
+        try:
+            check_encryption_key()
+        except ValueError as e:
+            print(f"設定エラー: {e}")
+            sys.exit(1)
+    if args.profile:
+        from app.profiling import enable_profiling
+        enable_profiling()
+    import asyncio
+    if args.workers:
+        from app.executor import configure_executor
+        configure_executor(args.workers)
     
-    if args.interactive:
+    if args.watch or args.unwatch:
+        # 監視リストの編集
+        from app.db import add_watch_items, remove_watch_items, setup_database
+        from app.config import SCHEDULER_MIN_INTERVAL
+        setup_database()
+        if args.watch:
+            add_watch_items([parse_watch_item(item) for item in args.watch], SCHEDULER_MIN_INTERVAL)
+            print(f"{len(args.watch)}件を監視リストに追加しました")
+        if args.unwatch:
+            remove_watch_items([parse_watch_item(item) for item in args.unwatch])
+            print(f"{len(args.unwatch)}件を監視リストから削除しました")
+    elif args.schedule:
+        # 監視リストの定期取得
+        from app.db import setup_database
+        from app.scheduler import PollingScheduler
+        setup_database()
+        use_mock = True if args.force_mock else (False if args.force_real_api else None)
+        try:
+            asyncio.run(PollingScheduler(use_mock=use_mock).run_forever())
+        except KeyboardInterrupt:
+            print("\n定期取得を終了しました")
+    elif args.jobs:
+        # ジョブファイルの一括実行
+        from app.db import setup_database
+        from app.jobs import load_jobs, run_jobs
+        setup_database()
+        summary = asyncio.run(run_jobs(
+            load_jobs(args.jobs),
+            concurrency=args.concurrency,
+            export_path=args.export,
+            export_format=args.format,
+            compression=args.compress,
+            use_mock=True if args.force_mock else (False if args.force_real_api else None),
+            resume=args.resume
+        ))
+        # 失敗したジョブがあれば呼び出し元（cron など）に分かるよう終了コードで知らせる
+        if summary["failed"]:
+            sys.exit(1)
+    elif args.trending:
+        # 保存済みのトレンド集計を表示
+        display_trending()
+    elif args.purge:
+        # 保持期間を過ぎたデータの削除
+        from app.db import setup_database
+        from app.retention import run_retention
+        # 古いスキーマでは再生数の履歴のテーブルがまだないため先に作成する
+        setup_database()
+        run_retention(archive=args.archive)
+    elif args.incremental:
+        # 前回からの差分のみを出力
+        from app.export import export_incremental
+        export_incremental(
+            args.incremental,
+            args.export or "exports",
+            export_format=args.format,
+            columns=args.columns,
+            compression=args.compress
+        )
+    elif args.export:
+        # 保存済みデータのストリーミング出力
+        from app.export import export_saved_videos
+        export_saved_videos(
+            args.export,
+            search_term=args.search,
+            export_format=args.format,
+            columns=args.columns,
+            partition_by=args.partition_by,
+            compression=args.compress
+        )
+    elif args.interactive:
         # 対話モードで実行
         asyncio.run(interactive_mode())
     else:
@@ -330,5 +527,10 @@ if __name__ == "__main__":
             search_term=args.search,
             count=args.count,
             sort_by=args.sort,
-            min_views=args.min_views
+            min_views=args.min_views,
+            export_format=args.format,
+            columns=args.columns,
+            partition_by=args.partition_by,
+            compression=args.compress,
+            resume=args.resume
         ))
\ No newline at end of file
@@ -1,12 +1,29 @@
 # データモデル定義
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, fields
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
+import pandas as pd
 
-@dataclass
+from app.config import CONVERT_CHUNK_SIZE
+
+# ハッシュタグの抽出パターン（\w は日本語などのUnicode文字にも一致し、全角＃にも対応）
+# 「説明文#タグ」のように本文に続けて書かれたタグも抽出する
+HASHTAG_PATTERN = re.compile(r"[#＃](\w+)")
+
+
+def extract_hashtags(text: Optional[str]) -> str:
+    """テキストからハッシュタグを抽出し、空白区切りの文字列で返す"""
+    if not text:
+        return ""
+    return " ".join(["#" + tag for tag in HASHTAG_PATTERN.findall(text)])
+
+
+@dataclass(slots=True)
 class VideoData:
-    """TikTok動画のデータを格納するクラス"""
+    """TikTok動画のデータを格納するクラス（__slots__ により1件あたりのメモリを削減）"""
     
     video_id: str
     creator_id: str
@@ -28,7 +45,7 @@ class VideoData:
         """APIレスポンスからVideoDataオブジェクトを作成"""
         # ハッシュタグの抽出
         desc = data.get("desc", "")
-        hashtags = " ".join([tag for tag in desc.split() if tag.startswith("#")])
+        hashtags = extract_hashtags(desc)
         
         # Unix時間からdatetimeへの変換
         create_time = datetime.fromtimestamp(data.get("createTime", 0))
@@ -50,6 +67,24 @@ class VideoData:
             hashtags=hashtags
         )
 
+    @classmethod
+    def from_api_responses(cls, data: Sequence[Dict[str, Any]], workers: Optional[int] = None) -> List['VideoData']:
+        """
+        APIレスポンスのリストをまとめてVideoDataオブジェクトに変換
+
+        1ページ分を1回の走査で変換し、取得日時はバッチ全体で共通の値を使う。
+
+        Args:
+            data: APIレスポンスのリスト
+            workers: 指定した場合、大きなページをプロセスプールで並列変換する
+        """
+        columns = api_responses_to_columns(data, workers=workers)
+        return [cls(*row) for row in zip(*(columns[name] for name in VIDEO_FIELDS))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """辞書に変換（CSV出力・DataFrame作成用）"""
+        return {name: getattr(self, name) for name in VIDEO_FIELDS}
+
     def remove_sensitive_data(self):
         """機密データを削除"""
         self.creator_id = self._anonymize_id(self.creator_id)
@@ -58,5 +93,311 @@ class VideoData:
     
     @staticmethod
     def _anonymize_id(id_str):
-        """IDを匿名化"""
-        return f"user_{hash(id_str) % 10000:04d}"
+        """IDを匿名化（鍵付きHMACによる決定的な仮名）"""
+        from app.security.pseudonymization import get_pseudonymizer
+        return get_pseudonymizer().pseudonymize(id_str)
+
+
+# VideoData のフィールド名（定義順）
+VIDEO_FIELDS = tuple(f.name for f in fields(VideoData))
+
+
+def _convert_api_responses(data: Sequence[Dict[str, Any]], fetch_date: datetime) -> Dict[str, List]:
+    """APIレスポンスを1回の走査で列ごとのリストに変換"""
+    columns: Dict[str, List] = {name: [] for name in VIDEO_FIELDS}
+    video_id = columns["video_id"].append
+    creator_id = columns["creator_id"].append
+    creator_name = columns["creator_name"].append
+    video_url = columns["video_url"].append
+    view_count = columns["view_count"].append
+    like_count = columns["like_count"].append
+    comment_count = columns["comment_count"].append
+    share_count = columns["share_count"].append
+    post_date = columns["post_date"].append
+    description = columns["description"].append
+    music_title = columns["music_title"].append
+    music_author = columns["music_author"].append
+    hashtags = columns["hashtags"].append
+    find_tags = HASHTAG_PATTERN.findall
+    fromtimestamp = datetime.fromtimestamp
+    empty: Dict[str, Any] = {}
+
+    for item in data:
+        author = item.get("author") or empty
+        stats = item.get("stats") or empty
+        music = item.get("music") or empty
+        desc = item.get("desc", "")
+
+        video_id(item.get("id", ""))
+        creator_id(author.get("uniqueId", ""))
+        creator_name(author.get("nickname", ""))
+        video_url((item.get("video") or empty).get("playAddr", ""))
+        view_count(stats.get("playCount", 0))
+        like_count(stats.get("diggCount", 0))
+        comment_count(stats.get("commentCount", 0))
+        share_count(stats.get("shareCount", 0))
+        post_date(fromtimestamp(item.get("createTime", 0)))
+        description(desc)
+        music_title(music.get("title", ""))
+        music_author(music.get("authorName", ""))
+        hashtags(" ".join(["#" + tag for tag in find_tags(desc)]) if desc else "")
+
+    columns["fetch_date"] = [fetch_date] * len(columns["video_id"])
+    return columns
+
+
+def api_responses_to_columns(data: Sequence[Dict[str, Any]], workers: Optional[int] = None,
+                             fetch_date: Optional[datetime] = None) -> Dict[str, List]:
+    """
+    APIレスポンスのリストを列ごとのリストに変換
+
+    Args:
+        data: APIレスポンスのリスト
+        workers: 指定した場合、CONVERT_CHUNK_SIZE 件ごとに分割してプロセスプールで変換する
+        fetch_date: 取得日時（未指定の場合は現在時刻。バッチ全体で共通）
+    """
+    fetch_date = fetch_date or datetime.now()
+    if not workers or workers < 2 or len(data) <= CONVERT_CHUNK_SIZE:
+        return _convert_api_responses(data, fetch_date)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [data[i:i + CONVERT_CHUNK_SIZE] for i in range(0, len(data), CONVERT_CHUNK_SIZE)]
+    columns: Dict[str, List] = {name: [] for name in VIDEO_FIELDS}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for part in executor.map(_convert_api_responses, chunks, [fetch_date] * len(chunks)):
+            for name in VIDEO_FIELDS:
+                columns[name].extend(part[name])
+    return columns
+
+
+class VideoBatch:
+    """
+    動画データのバッチを列指向で保持するクラス
+
+    再生数などのカウンタは int64 配列、日時は datetime64 配列、
+    文字列は辞書エンコード（コード配列 + 一意な値の配列）で保持する。
+    同じクリエイター・楽曲・ハッシュタグが繰り返し現れる場合、
+    VideoData のリストや API レスポンスの辞書より大幅に少ないメモリで済む。
+    """
+
+    INT_COLUMNS = ("view_count", "like_count", "comment_count", "share_count")
+    DATETIME_COLUMNS = ("post_date", "fetch_date")
+    STRING_COLUMNS = (
+        "video_id", "creator_id", "creator_name", "video_url",
+        "description", "music_title", "music_author", "hashtags"
+    )
+
+    __slots__ = ("_columns", "_length")
+
+    def __init__(self, columns: Dict[str, Any], length: int):
+        """
+        Args:
+            columns: 列名から列データへの対応
+                （数値・日時は ndarray、文字列は (コード配列, 値の配列) のタプル）
+            length: 行数
+        """
+        self._columns = columns
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @classmethod
+    def empty(cls) -> 'VideoBatch':
+        """空のバッチを作成"""
+        return cls.from_columns({name: [] for name in VIDEO_FIELDS})
+
+    @classmethod
+    def from_columns(cls, values: Dict[str, Sequence]) -> 'VideoBatch':
+        """列ごとの値のリストからバッチを作成"""
+        columns: Dict[str, Any] = {}
+        for name in cls.INT_COLUMNS:
+            columns[name] = np.asarray(values[name], dtype=np.int64)
+        for name in cls.DATETIME_COLUMNS:
+            columns[name] = np.asarray(values[name], dtype="datetime64[us]")
+        for name in cls.STRING_COLUMNS:
+            columns[name] = _encode_strings(values[name])
+        return cls(columns, len(columns["view_count"]))
+
+    @classmethod
+    def from_videos(cls, videos: Iterable[VideoData]) -> 'VideoBatch':
+        """VideoData のイテラブルからバッチを作成"""
+        values: Dict[str, List] = {name: [] for name in VIDEO_FIELDS}
+        appends = [(values[name].append, name) for name in VIDEO_FIELDS]
+        for video in videos:
+            for append, name in appends:
+                append(getattr(video, name))
+        return cls.from_columns(values)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'VideoBatch':
+        """VideoData と同じキーを持つ辞書（DBの行など）からバッチを作成"""
+        values: Dict[str, List] = {name: [] for name in VIDEO_FIELDS}
+        for record in records:
+            for name in VIDEO_FIELDS:
+                values[name].append(record.get(name))
+        return cls.from_columns(values)
+
+    @classmethod
+    def from_api_responses(cls, data: Sequence[Dict[str, Any]], workers: Optional[int] = None) -> 'VideoBatch':
+        """APIレスポンスのリストから VideoData を経由せずにバッチを作成"""
+        return cls.from_columns(api_responses_to_columns(data, workers=workers))
+
+    @classmethod
+    def concat(cls, batches: Sequence['VideoBatch']) -> 'VideoBatch':
+        """複数のバッチを連結（文字列列はデコードせず、値の辞書を合わせてコードを付け替える）"""
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        columns: Dict[str, Any] = {}
+        for name in VIDEO_FIELDS:
+            if name in cls.STRING_COLUMNS:
+                columns[name] = _concat_encoded([b._columns[name] for b in batches])
+            else:
+                columns[name] = np.concatenate([b._columns[name] for b in batches])
+        return cls(columns, sum(len(b) for b in batches))
+
+    def column(self, name: str) -> np.ndarray:
+        """列を ndarray として取得（文字列列はデコードした object 配列）"""
+        if name in self.STRING_COLUMNS:
+            return _decode_strings(*self._columns[name])
+        return self._columns[name]
+
+    def codes(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """文字列列の (コード配列, 値の配列) を取得（欠損値のコードは -1）"""
+        return self._columns[name]
+
+    def take(self, indices) -> 'VideoBatch':
+        """指定した行だけを取り出したバッチを作成"""
+        indices = np.asarray(indices)
+        columns: Dict[str, Any] = {}
+        for name, data in self._columns.items():
+            if name in self.STRING_COLUMNS:
+                codes, categories = data
+                columns[name] = (codes[indices], categories)
+            else:
+                columns[name] = data[indices]
+        return VideoBatch(columns, len(columns["view_count"]))
+
+    def map_strings(self, name: str, func: Callable, vectorized: bool = False) -> 'VideoBatch':
+        """
+        文字列列の一意な値に関数を適用したバッチを作成
+
+        関数の呼び出し回数は行数ではなく一意な値の数になる。
+        vectorized=True の場合、関数は一意な値のリストを受け取り変換後のリストを返す。
+        変換後に値が重複した場合は辞書を詰め直す。
+        """
+        codes, categories = self._columns[name]
+        values = func(list(categories)) if vectorized else [func(v) for v in categories]
+        mapped_codes, uniques = _encode_strings(values)
+
+        # 元のコードを変換後の辞書のコードに付け替える（欠損値 -1 はそのまま）
+        new_codes = codes.copy()
+        valid = codes >= 0
+        new_codes[valid] = mapped_codes[codes[valid]]
+
+        columns = dict(self._columns)
+        columns[name] = (new_codes, uniques)
+        return VideoBatch(columns, self._length)
+
+    def iter_rows(self, names: Sequence[str] = VIDEO_FIELDS) -> Iterator[Tuple]:
+        """指定した列の値をタプルで1行ずつ返す（Python の値に変換済み）"""
+        return zip(*(self.column(name).tolist() for name in names))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """辞書のリストに変換（VideoData.to_dict と同じ形式）"""
+        return [dict(zip(VIDEO_FIELDS, row)) for row in self.iter_rows()]
+
+    def to_videos(self) -> List[VideoData]:
+        """VideoData のリストに変換"""
+        return [VideoData(*row) for row in self.iter_rows()]
+
+    def to_arrow(self, names: Optional[Sequence[str]] = None):
+        """pyarrow.Table に変換（数値・日時はコピーなし、文字列は辞書型のまま）"""
+        import pyarrow as pa
+
+        arrays = []
+        names = list(names or VIDEO_FIELDS)
+        for name in names:
+            if name in self.STRING_COLUMNS:
+                codes, categories = self._columns[name]
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, mask=codes < 0),
+                    pa.array(categories, type=pa.string())
+                ))
+            else:
+                arrays.append(pa.array(self._columns[name]))
+        return pa.Table.from_arrays(arrays, names=names)
+
+    @classmethod
+    def from_arrow(cls, table) -> 'VideoBatch':
+        """to_arrow() で変換した pyarrow.Table からバッチを作成（辞書型の文字列列は詰め直さない）"""
+        import pyarrow as pa
+
+        columns: Dict[str, Any] = {}
+        for name in VIDEO_FIELDS:
+            array = table.column(name).combine_chunks()
+            if name in cls.STRING_COLUMNS:
+                if not pa.types.is_dictionary(array.type):
+                    columns[name] = _encode_strings(array.to_pylist())
+                    continue
+                codes = array.indices.fill_null(-1).to_numpy().astype(np.int32, copy=False)
+                columns[name] = (codes, array.dictionary.to_numpy(zero_copy_only=False).astype(object))
+            elif name in cls.DATETIME_COLUMNS:
+                columns[name] = array.to_numpy().astype("datetime64[us]", copy=False)
+            else:
+                columns[name] = array.to_numpy().astype(np.int64, copy=False)
+        return cls(columns, table.num_rows)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """pandas.DataFrame に変換（文字列列は Categorical）"""
+        data = {}
+        for name in VIDEO_FIELDS:
+            if name in self.STRING_COLUMNS:
+                codes, categories = self._columns[name]
+                data[name] = pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+            else:
+                data[name] = self._columns[name]
+        return pd.DataFrame(data)
+
+    @property
+    def nbytes(self) -> int:
+        """列データのおおよそのバイト数"""
+        total = 0
+        for name, data in self._columns.items():
+            if name in self.STRING_COLUMNS:
+                codes, categories = data
+                total += codes.nbytes + sum(len(v.encode("utf-8")) for v in categories if v)
+            else:
+                total += data.nbytes
+        return total
+
+
+def _encode_strings(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """文字列を辞書エンコード（None はコード -1）"""
+    codes, categories = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=True)
+    return codes.astype(np.int32, copy=False), np.asarray(categories, dtype=object)
+
+
+def _concat_encoded(encoded: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """辞書エンコードされた複数の列を連結（値の辞書だけを factorize し、各コードを新しい辞書のコードに変換）"""
+    merged, categories = pd.factorize(np.concatenate([values for _, values in encoded]))
+    codes = []
+    offset = 0
+    for chunk_codes, values in encoded:
+        # 末尾に -1 用の要素を足し、欠損値のコードはそのまま -1 にする
+        mapping = np.append(merged[offset:offset + len(values)], -1).astype(np.int32)
+        codes.append(mapping[chunk_codes])
+        offset += len(values)
+    return np.concatenate(codes), np.asarray(categories, dtype=object)
+
+
+def _decode_strings(codes: np.ndarray, categories: np.ndarray) -> np.ndarray:
+    """辞書エンコードされた文字列を object 配列に戻す"""
+    decoded = np.empty(len(codes), dtype=object)
+    mask = codes >= 0
+    decoded[mask] = categories[codes[mask]]
+    return decoded
@@ -0,0 +1,107 @@
+# 動画の取得（モードごと）と保存用のバッチへの変換（CLI・バッチジョブ・定期取得で共通）
+#
+# app.main から起動時に読み込まれるため、重い依存は関数の中で読み込む。
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.config import ANONYMIZE_DATA
+from app.logger import SampledLogger
+from app.profiling import span
+from app.utils import extract_video_id
+
+if TYPE_CHECKING:
+    from app.checkpoint import CrawlProgress
+    from app.models import VideoBatch
+
+logger = logging.getLogger(__name__)
+# 動画ごとの取得失敗（指定した動画の数だけ発生しうるため出力数を制限する）
+_video_error_log = SampledLogger(logger)
+
+
+async def get_videos_by_mode(api_client, mode, search_term=None, count=10, sort_by="views", min_views=1000, min_likes=0, days_ago=None,
+                             progress: Optional[CrawlProgress] = None):
+    """
+    指定したモードに応じて動画を取得する
+    
+    Args:
+        api_client: APIクライアント
+        mode: 取得モード
+        search_term: 検索語
+        count: 取得数
+        sort_by: ソート基準
+        min_views: 最小再生回数
+        min_likes: 最小いいね数
+        days_ago: 何日前までの動画を対象にするか
+        progress: 取得の進捗（指定時は記録済みのページ・動画を取得し直さない）
+        
+    Returns:
+        取得した動画リスト
+    """
+    from app.filters import VideoFilter
+    
+    videos = []
+    # 絞り込み条件はAPI（モックの場合はインデックス）に渡し、取得時に適用する
+    video_filter = VideoFilter(min_views=min_views, min_likes=min_likes, days_ago=days_ago)
+    
+    if mode == "trend":
+        logger.info("トレンド動画を取得しています...")
+        videos = await api_client.get_trending_videos(
+            count=count, sort_by=sort_by, video_filter=video_filter, progress=progress
+        )
+        
+    elif mode == "hashtag":
+        if not search_term:
+            # ハッシュタグが指定されていない場合はトレンド動画を取得
+            logger.info("トレンド動画を取得しています...")
+            videos = await api_client.get_trending_videos(
+                count=count, sort_by=sort_by, video_filter=video_filter, progress=progress
+            )
+        else:
+            # ハッシュタグが指定されている場合
+            hashtag = search_term.replace("#", "")
+            logger.info("ハッシュタグ '#%s' の動画を取得しています...", hashtag)
+            videos = await api_client.get_hashtag_videos(
+                hashtag=hashtag, count=count, sort_by=sort_by, video_filter=video_filter, progress=progress
+            )
+        
+    elif mode == "user":
+        logger.info("ユーザー '%s' の動画を取得しています...", search_term)
+        videos = video_filter.apply(api_client.get_user_videos(search_term, count=count, sort_by=sort_by))
+        
+    elif mode == "video":
+        logger.info("指定された動画を取得しています...")
+        # 進捗のカーソルは処理済みのURLの数
+        start = (progress.cursor or 0) if progress else 0
+        videos = list(progress.videos) if progress else []
+        for position, url in enumerate(search_term[start:], start + 1):
+            video_id = extract_video_id(url)
+            fetched = []
+            if video_id:
+                try:
+                    video = await api_client.get_video_by_id(video_id)
+                    if video:
+                        fetched.append(video)
+                except Exception as e:
+                    _video_error_log.warning("動画ID %s の取得に失敗しました: %s", video_id, e)
+            videos.extend(fetched)
+            if progress is not None:
+                # チェックポイントにはこのURLで取得した動画だけを追記する
+                progress.record_page(position, fetched, exhausted=position == len(search_term))
+        # IDで取得した動画は取得後に絞り込む
+        videos = video_filter.apply(videos)
+    
+    return videos
+
+
+def prepare_batch(data: List[Dict]) -> VideoBatch:
+    """APIレスポンスを保存用のバッチに変換（設定に応じて仮名化。大きなバッチはプロセスプールで変換）"""
+    from app.executor import get_executor
+    
+    with span("normalize"):
+        batch = get_executor().convert(data)
+        if ANONYMIZE_DATA:
+            from app.security.pseudonymization import anonymize_batch
+            batch = anonymize_batch(batch)
+    return batch
@@ -0,0 +1,203 @@
+# 処理段階ごとの時間・メモリを計測するプロファイラ（--profile 指定時のみ有効）
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.config import PROFILE_DIR, PROFILE_TRACE_MEMORY
+
+
+class SpanStats:
+    """同じ呼び出し経路の区間の累計"""
+
+    __slots__ = ("count", "wall", "self_wall", "cpu", "memory", "peak")
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.self_wall = 0.0
+        self.cpu = 0.0
+        self.memory = 0
+        self.peak = 0
+
+
+class _Span:
+    """1回の区間の計測（with 文で使う）"""
+
+    __slots__ = ("profiler", "name", "path", "started", "cpu_started", "memory_started", "child_wall", "child_peak")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        parent = stack[-1] if stack else None
+        self.path = (parent.path if parent else ()) + (self.name,)
+        self.child_wall = 0.0
+        self.child_peak = 0
+        if self.profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # 外側の区間のそれまでの最大値を引き継いでから最大値をリセットする
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_started = current
+        stack.append(self)
+        self.cpu_started = time.thread_time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.started
+        cpu = time.thread_time() - self.cpu_started
+        memory = peak = 0
+        if self.profiler.trace_memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            memory = current - self.memory_started
+            peak = max(traced_peak, self.child_peak) - self.memory_started
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            if self.profiler.trace_memory:
+                stack[-1].child_peak = max(stack[-1].child_peak, self.memory_started + peak)
+        self.profiler._record(self.path, wall, wall - self.child_wall, cpu, memory, peak)
+        return False
+
+
+class _NullSpan:
+    """プロファイラが無効な場合の何もしない区間（1つのインスタンスを使い回す）"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """
+    区間ごとの実行時間・CPU時間・メモリの計測
+
+    区間はスレッドごとの入れ子として記録し、呼び出し経路（外側からの区間名の並び）ごとに
+    回数・経過時間・自身の時間（内側の区間を除く）・CPU時間を集計する。trace_memory が真の場合は
+    tracemalloc で区間内の正味の確保量と最大確保量も記録する（tracemalloc の最大値は
+    プロセス全体で1つのため、複数スレッドで同時に区間を計測した場合の最大値は概算）。
+    """
+
+    def __init__(self, trace_memory: bool = PROFILE_TRACE_MEMORY):
+        self.trace_memory = trace_memory
+        self.stats: Dict[Tuple[str, ...], SpanStats] = {}
+        self.started = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, path: Tuple[str, ...], wall: float, self_wall: float, cpu: float, memory: int, peak: int):
+        with self._lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = SpanStats()
+            stats.count += 1
+            stats.wall += wall
+            stats.self_wall += self_wall
+            stats.cpu += cpu
+            stats.memory += memory
+            stats.peak = max(stats.peak, peak)
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def folded(self) -> List[str]:
+        """
+        フレームグラフ用の折りたたみ形式（"外側;内側 自身の時間（マイクロ秒）"）
+
+        flamegraph.pl や speedscope でそのまま読み込める。
+        """
+        return [
+            f"{';'.join(path)} {round(stats.self_wall * 1_000_000)}"
+            for path, stats in sorted(self.stats.items())
+            if round(stats.self_wall * 1_000_000) > 0
+        ]
+
+    def summary(self) -> str:
+        """区間ごとの集計表（経過時間の長い順）"""
+        from tabulate import tabulate
+
+        headers = ["区間", "回数", "経過時間(秒)", "自身の時間(秒)", "CPU時間(秒)"]
+        if self.trace_memory:
+            headers += ["正味の確保(KB)", "最大確保(KB)"]
+        rows = []
+        for path, stats in sorted(self.stats.items(), key=lambda item: item[1].wall, reverse=True):
+            row = [" > ".join(path), stats.count, f"{stats.wall:.3f}", f"{stats.self_wall:.3f}", f"{stats.cpu:.3f}"]
+            if self.trace_memory:
+                row += [f"{stats.memory / 1024:,.1f}", f"{stats.peak / 1024:,.1f}"]
+            rows.append(row)
+        total = time.perf_counter() - self.started
+        return f"{tabulate(rows, headers=headers, tablefmt='simple')}\n全体の経過時間: {total:.3f}秒"
+
+    def write_report(self, directory: str = PROFILE_DIR) -> str:
+        """折りたたみ形式のプロファイルと集計表を書き出し、集計表を表示する"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.folded()) + "\n")
+        summary = self.summary()
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        print(f"\n{summary}", file=sys.stderr)
+        print(f"プロファイルを {base}.folded / {base}.txt に出力しました", file=sys.stderr)
+        return base
+
+
+# 処理全体で共有するプロファイラ（--profile 指定時のみ作成する）
+_profiler: Optional[Profiler] = None
+
+
+def span(name: str):
+    """
+    処理段階の区間（with span("db.write"): ...）
+
+    プロファイラが無効な場合は何もしない共有のオブジェクトを返すため、
+    呼び出しのコストは関数呼び出し1回分のみ。区間はスレッドごとの入れ子として
+    記録するため、同じスレッドで並行に動くコルーチンやジェネレーターの yield を
+    またいで区間を開いたままにしないこと。
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, name)
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+def enable_profiling(trace_memory: bool = PROFILE_TRACE_MEMORY, directory: str = PROFILE_DIR) -> Profiler:
+    """プロファイラを有効にし、終了時に結果を書き出すよう登録する"""
+    import atexit
+
+    global _profiler
+    _profiler = Profiler(trace_memory=trace_memory)
+    atexit.register(_profiler.write_report, directory)
+    return _profiler
+
+
+def disable_profiling():
+    global _profiler
+    _profiler = None
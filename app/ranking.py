@@ -0,0 +1,107 @@
+# 動画の並び替え（上位 count 件のみを選択するランキング処理）
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.models import VideoBatch
+
+# 並び替えキー → (APIレスポンス内のパス, VideoBatch の列)
+RANK_FIELDS = {
+    "views": (("stats", "playCount"), "view_count"),
+    "likes": (("stats", "diggCount"), "like_count"),
+    "comments": (("stats", "commentCount"), "comment_count"),
+    "shares": (("stats", "shareCount"), "share_count"),
+    "date": (("createTime",), "post_date")
+}
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """再生数0の動画を0として比率を計算"""
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+# 派生指標 → 計算式（引数は並び替えキーから値の配列を返す関数）
+DERIVED_METRICS: Dict[str, Callable[[Callable[[str], np.ndarray]], np.ndarray]] = {
+    "engagement_rate": lambda m: _ratio(m("likes") + m("comments") + m("shares"), m("views")),
+    "like_rate": lambda m: _ratio(m("likes"), m("views"))
+}
+
+
+def _api_values(videos: Sequence[Dict], path) -> np.ndarray:
+    """APIレスポンスのリストから1項目だけを配列として取り出す"""
+    if len(path) == 1:
+        values = (video.get(path[0]) or 0 for video in videos)
+    else:
+        values = (video.get(path[0], {}).get(path[1]) or 0 for video in videos)
+    return np.fromiter(values, dtype=np.float64, count=len(videos))
+
+
+def _metric_getter(data: Union[Sequence[Dict], VideoBatch]) -> Callable[[str], np.ndarray]:
+    """並び替えキーの値を返す関数（同じキーは1回だけ取り出す）"""
+    cache: Dict[str, np.ndarray] = {}
+
+    def metric(name: str) -> np.ndarray:
+        if name not in cache:
+            if name in DERIVED_METRICS:
+                cache[name] = DERIVED_METRICS[name](metric)
+            elif isinstance(data, VideoBatch):
+                column = data.column(RANK_FIELDS[name][1])
+                cache[name] = column.astype(np.int64) if column.dtype.kind == "M" else column
+            else:
+                cache[name] = _api_values(data, RANK_FIELDS[name][0])
+        return cache[name]
+
+    return metric
+
+
+def top_k_indices(keys: Sequence[np.ndarray], k: Optional[int] = None) -> np.ndarray:
+    """
+    複数のキーの降順で上位 k 件の位置を返す（同順位は元の順序を維持）
+
+    先頭のキーで np.partition により k 番目の値を求め、それ以上の値を持つ
+    候補だけをソートするため、全件のソートは行わない。
+    """
+    n = len(keys[0])
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    else:
+        primary = keys[0]
+        kth = np.partition(primary, n - k)[n - k]
+        candidates = np.flatnonzero(primary >= kth)
+
+    # np.lexsort は最後のキーが第1キー。元の位置を最後の比較に使う
+    order = np.lexsort([candidates] + [-key[candidates] for key in reversed(keys)])
+    return candidates[order][:k]
+
+
+def rank_indices(data: Union[Sequence[Dict], VideoBatch], sort_by: Union[str, Sequence[str]] = "views",
+                 count: Optional[int] = None) -> np.ndarray:
+    """rank_videos と同じ順序で上位 count 件の位置を返す（未対応のキーは無視し、有効なキーがなければ元の順序）"""
+    names = [sort_by] if isinstance(sort_by, str) else list(sort_by)
+    names = [name for name in names if name in RANK_FIELDS or name in DERIVED_METRICS]
+    if names and len(data):
+        metric = _metric_getter(data)
+        return top_k_indices([metric(name) for name in names], count)
+    return np.arange(len(data))[:count]
+
+
+def rank_videos(data: Union[List[Dict], VideoBatch], sort_by: Union[str, Sequence[str]] = "views",
+                count: Optional[int] = None) -> Union[List[Dict], VideoBatch]:
+    """
+    動画を並び替えて上位 count 件を返す
+
+    Args:
+        data: APIレスポンスのリストまたは VideoBatch
+        sort_by: 並び替えキー（views / likes / comments / shares / date / engagement_rate / like_rate）。
+                 リストを渡すと先頭から順に比較する
+        count: 返す件数（None の場合は全件）
+
+    Returns:
+        data と同じ型の並び替え済みデータ（未対応のキーは無視し、有効なキーがなければ元の順序）
+    """
+    indices = rank_indices(data, sort_by, count)
+    if isinstance(data, VideoBatch):
+        return data.take(indices)
+    return [data[i] for i in indices]
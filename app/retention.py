@@ -0,0 +1,250 @@
+# データ保持期間（DATA_RETENTION_DAYS）に基づく古いデータの削除・アーカイブ
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.config import DATA_RETENTION_DAYS, RETENTION_BATCH_SIZE, RETENTION_BATCH_PAUSE
+from app.db import get_connection
+
+# アーカイブ先テーブル
+ARCHIVE_TABLE = "videos_archive"
+
+
+def get_retention_cutoff(retention_days: int = DATA_RETENTION_DAYS, now: Optional[datetime] = None) -> datetime:
+    """保持期限の境界日時を返す（これより前に取得したデータが削除対象）"""
+    return (now or datetime.now()) - timedelta(days=retention_days)
+
+
+def _get_expired_partitions(cursor, cutoff: datetime) -> List[str]:
+    """
+    fetch_date でレンジパーティション化されている場合、丸ごと期限切れのパーティション名を返す
+
+    対応形式:
+        PARTITION BY RANGE (TO_DAYS(fetch_date))
+        PARTITION BY RANGE COLUMNS (fetch_date)
+    """
+    cursor.execute("""
+    SELECT PARTITION_NAME, PARTITION_METHOD, PARTITION_EXPRESSION, PARTITION_DESCRIPTION
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'videos' AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = cursor.fetchall()
+    if not partitions:
+        return []
+
+    cursor.execute("SELECT TO_DAYS(%s)", (cutoff,))
+    cutoff_days = cursor.fetchone()[0]
+
+    expired = []
+    for name, method, expression, description in partitions:
+        expression = (expression or "").lower()
+        if "fetch_date" not in expression or not description or description == "MAXVALUE":
+            continue
+
+        # LESS THAN の上限値が境界以下なら、パーティション内の全行が期限切れ
+        if method == "RANGE" and "to_days" in expression:
+            if int(description) <= cutoff_days:
+                expired.append(name)
+        elif method == "RANGE COLUMNS":
+            upper = datetime.fromisoformat(description.strip("'"))
+            if upper <= cutoff:
+                expired.append(name)
+    return expired
+
+
+def drop_expired_partitions(cutoff: datetime, dry_run: bool = False) -> List[str]:
+    """期限切れパーティションを DROP PARTITION で削除（行単位の削除よりロック・binlogが小さい）"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        expired = _get_expired_partitions(cursor, cutoff)
+        if expired and not dry_run:
+            cursor.execute(f"ALTER TABLE videos DROP PARTITION {', '.join(expired)}")
+            conn.commit()
+        return expired
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _ensure_archive_table(cursor):
+    """アーカイブテーブルを作成（videos と同じ定義）"""
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} LIKE videos")
+
+
+def purge_expired_rows(
+    cutoff: datetime,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    archive: bool = False,
+    pause: float = RETENTION_BATCH_PAUSE,
+    dry_run: bool = False
+) -> int:
+    """
+    期限切れの行を主キー順の小さなバッチで削除（またはアーカイブ後に削除）する
+
+    各バッチを個別のトランザクションでコミットするため、長時間のロックや
+    巨大なトランザクションによる binlog の肥大化を避けられる。
+
+    Args:
+        cutoff: この日時より前に取得した行が対象
+        batch_size: 1トランザクションで処理する行数
+        archive: True の場合、削除前にアーカイブテーブルへコピー
+        pause: バッチ間の待機秒数（レプリケーション遅延の抑制用）
+        dry_run: True の場合は対象件数を数えるだけで削除しない
+
+    Returns:
+        削除（dry_run の場合は対象）した行数
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    processed = 0
+    last_id = 0
+
+    try:
+        if archive and not dry_run:
+            _ensure_archive_table(cursor)
+
+        while True:
+            # キーセットページング: OFFSET を使わず前回の最終IDから続ける
+            cursor.execute("""
+            SELECT id FROM videos
+            WHERE id > %s AND fetch_date < %s
+            ORDER BY id
+            LIMIT %s
+            """, (last_id, cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            if dry_run:
+                processed += len(ids)
+                continue
+
+            placeholders = ", ".join(["%s"] * len(ids))
+            if archive:
+                cursor.execute(
+                    f"REPLACE INTO {ARCHIVE_TABLE} SELECT * FROM videos WHERE id IN ({placeholders})",
+                    ids
+                )
+            # 選択後に再取得（fetch_date 更新）された行は削除しない
+            cursor.execute(
+                f"DELETE FROM videos WHERE id IN ({placeholders}) AND fetch_date < %s",
+                (*ids, cutoff)
+            )
+            processed += cursor.rowcount
+            conn.commit()
+
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return processed
+
+
+def purge_expired_snapshots(
+    cutoff: datetime,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE,
+    dry_run: bool = False
+) -> int:
+    """期限切れの再生数の履歴を batch_size 件ずつ削除"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    processed = 0
+
+    try:
+        if dry_run:
+            cursor.execute("SELECT COUNT(*) FROM video_snapshots WHERE fetch_date < %s", (cutoff,))
+            return cursor.fetchone()[0]
+
+        while True:
+            # 取得日時のインデックスを使い、1トランザクションあたりの削除件数を制限する
+            cursor.execute(
+                "DELETE FROM video_snapshots WHERE fetch_date < %s LIMIT %s",
+                (cutoff, batch_size)
+            )
+            deleted = cursor.rowcount
+            conn.commit()
+            processed += deleted
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    return processed
+
+
+def run_retention(
+    retention_days: int = DATA_RETENTION_DAYS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    archive: bool = False,
+    dry_run: bool = False
+) -> Dict:
+    """
+    保持期間を過ぎたデータを削除する（CLI・スケジューラ共通の入口）
+
+    パーティション化されている場合は期限切れパーティションを先に DROP し、
+    残り（境界をまたぐパーティション内の行）をバッチ削除する。
+    アーカイブ指定時は行を退避する必要があるため、常にバッチ処理を使う。
+    """
+    cutoff = get_retention_cutoff(retention_days)
+    print(f"保持期間 {retention_days} 日: {cutoff.strftime('%Y/%m/%d %H:%M')} より前のデータを処理します")
+
+    dropped: List[str] = []
+    if not archive:
+        dropped = drop_expired_partitions(cutoff, dry_run=dry_run)
+        if dropped:
+            print(f"期限切れパーティションを削除しました: {', '.join(dropped)}")
+
+    rows = purge_expired_rows(cutoff, batch_size=batch_size, archive=archive, dry_run=dry_run)
+    action = "対象" if dry_run else ("アーカイブ・削除" if archive else "削除")
+    print(f"{rows:,}件のデータを{action}しました")
+
+    snapshots = purge_expired_snapshots(cutoff, batch_size=batch_size, dry_run=dry_run)
+    print(f"{snapshots:,}件の再生数の履歴を{'対象' if dry_run else '削除'}しました")
+
+    return {
+        "cutoff": cutoff,
+        "dropped_partitions": dropped,
+        "rows": rows,
+        "snapshots": snapshots,
+        "archived": archive and not dry_run,
+        "dry_run": dry_run
+    }
+
+
+def parse_args():
+    """コマンドライン引数をパース（cron などからの単独実行用）"""
+    parser = argparse.ArgumentParser(description="古いデータの削除")
+    parser.add_argument("--days", type=int, default=DATA_RETENTION_DAYS, help="データ保持日数")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="1バッチあたりの行数")
+    parser.add_argument("--archive", action="store_true", help="削除前にアーカイブテーブルへ退避")
+    parser.add_argument("--dry-run", action="store_true", help="削除せずに対象件数のみ表示")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from app.db import setup_database
+
+    args = parse_args()
+    setup_database()
+    run_retention(
+        retention_days=args.days,
+        batch_size=args.batch_size,
+        archive=args.archive,
+        dry_run=args.dry_run
+    )
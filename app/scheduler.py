@@ -0,0 +1,210 @@
+# 監視リストのハッシュタグ・動画を、再生数の伸びに応じた間隔で取得し続けるスケジューラ
+import asyncio
+import logging
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.api.client import TikTokAPIClient
+from app.api.rate_limiter import RateLimiter
+from app.config import (
+    JOB_CONCURRENCY, SCHEDULER_CALL_BUDGET, SCHEDULER_HASHTAG_COUNT, SCHEDULER_IDLE_SLEEP,
+    SCHEDULER_MAX_INTERVAL, SCHEDULER_MIN_INTERVAL, SCHEDULER_RETENTION_INTERVAL,
+    SCHEDULER_TARGET_VIEWS, SCHEDULER_VIDEO_BATCH_SIZE
+)
+from app.db import (
+    get_due_watch_items, get_next_poll_time, save_video_data, set_next_poll_times, update_watch_items
+)
+from app.logger import SampledLogger
+from app.pipeline import prepare_batch
+from app.retention import run_retention
+from app.velocity import load_velocity
+
+# 取得間隔に加えるゆらぎ（同時に登録した対象の取得時刻を分散させる）
+INTERVAL_JITTER = 0.1
+
+logger = logging.getLogger(__name__)
+# 対象ごとの取得エラー（監視リストの対象の数だけ発生しうるため出力数を制限する）
+_fetch_error_log = SampledLogger(logger)
+
+
+def next_poll_interval(views_per_hour: float, target_views: int = SCHEDULER_TARGET_VIEWS,
+                       min_interval: int = SCHEDULER_MIN_INTERVAL, max_interval: int = SCHEDULER_MAX_INTERVAL) -> int:
+    """
+    次回までの取得間隔（秒）
+
+    再生数が target_views 増える見込みの時間を間隔とする。伸びの速い対象ほど短く、
+    伸びていない対象は max_interval になる。
+    """
+    if views_per_hour <= 0:
+        return max_interval
+    return int(min(max(target_views / views_per_hour * 3600, min_interval), max_interval))
+
+
+def plan_calls(items: List[Dict[str, Any]], budget: int,
+               video_batch_size: int = SCHEDULER_VIDEO_BATCH_SIZE) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    取得予定の対象をAPI呼び出しにまとめる
+
+    動画は video_batch_size 件ずつ1回の呼び出しにまとめ、ハッシュタグは1件ずつ呼び出す。
+    予定の早い対象から budget 回分までを返し、残りは次回の処理に回す。
+    """
+    calls: List[Tuple[str, List[Dict[str, Any]]]] = []
+    pending_videos: List[Dict[str, Any]] = []
+    for item in items:
+        if item["item_type"] == "video":
+            pending_videos.append(item)
+            if len(pending_videos) == video_batch_size:
+                calls.append(("video", pending_videos))
+                pending_videos = []
+        else:
+            calls.append(("hashtag", [item]))
+        if len(calls) >= budget:
+            return calls[:budget]
+    if pending_videos:
+        calls.append(("video", pending_videos))
+    return calls[:budget]
+
+
+class PollingScheduler:
+    """
+    監視リストを定期取得するスケジューラ
+
+    取得予定（next_poll_at）はデータベースに保存するため、再起動しても
+    予定どおりに再開する。停止中に予定を過ぎた対象は、再開時に最短の取得間隔の中へ
+    均等に割り振り直すため、再開直後にまとめて取得しない。1回の処理も
+    SCHEDULER_CALL_BUDGET 回の呼び出しまでに抑える。
+    """
+
+    def __init__(self, use_mock: Optional[bool] = None, budget: int = SCHEDULER_CALL_BUDGET,
+                 concurrency: int = JOB_CONCURRENCY):
+        self.rate_limiter = RateLimiter()
+        self.api_client = TikTokAPIClient(use_mock=use_mock, rate_limiter=self.rate_limiter)
+        self.budget = budget
+        self.concurrency = concurrency
+
+    def _fetch(self, kind: str, items: List[Dict[str, Any]]) -> Dict[str, float]:
+        """
+        1回分の呼び出しを実行して保存し、対象ごとの1時間あたりの再生数を返す（ワーカースレッドで実行）
+
+        ハッシュタグの伸びは、履歴が2回分以上ある動画の伸びの中央値とする。
+        履歴が1回分しかなく伸びが分からない対象は NaN、取得できなかった対象は
+        結果に含めない（取得失敗として扱う）。
+        """
+        if self.api_client.use_mock:
+            self.rate_limiter.acquire()
+        if kind == "video":
+            videos = asyncio.run(self.api_client.get_videos_by_ids([item["item_value"] for item in items]))
+        else:
+            videos = asyncio.run(self.api_client.get_hashtag_videos(
+                items[0]["item_value"], count=SCHEDULER_HASHTAG_COUNT
+            ))
+        if not videos:
+            # 空の結果は取得エラー（クライアントがエラーを空リストにする場合を含む）として扱う
+            return {}
+
+        save_video_data(prepare_batch(videos))
+        velocity = load_velocity([video["id"] for video in videos])
+        velocity = velocity[velocity["observations"] >= 2]
+        if kind == "video":
+            by_id = dict(zip(velocity["video_id"], velocity["views_per_hour"]))
+            fetched = {video["id"] for video in videos}
+            return {
+                item["item_value"]: float(by_id.get(item["item_value"], math.nan))
+                for item in items if item["item_value"] in fetched
+            }
+        return {items[0]["item_value"]: float(velocity["views_per_hour"].median()) if len(velocity) else math.nan}
+
+    def _schedule(self, item: Dict[str, Any], velocity: Optional[float], now: datetime) -> Dict[str, Any]:
+        """
+        取得結果から次回の予定を決める
+
+        失敗した場合（None）は間隔を倍にして再試行し、伸びがまだ分からない場合（NaN。
+        新しく追加した対象など）は現在の間隔のまま次の履歴を取る。
+        """
+        if velocity is None:
+            interval = min(item["interval_seconds"] * 2, SCHEDULER_MAX_INTERVAL)
+            velocity = item["last_velocity"]
+        elif math.isnan(velocity):
+            interval = item["interval_seconds"]
+            velocity = item["last_velocity"]
+        else:
+            interval = next_poll_interval(velocity)
+        delay = interval * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+        return {
+            "id": item["id"],
+            "next_poll_at": now + timedelta(seconds=delay),
+            "last_polled_at": now,
+            "interval_seconds": interval,
+            "last_velocity": velocity
+        }
+
+    def spread_overdue(self, now: Optional[datetime] = None, window: int = SCHEDULER_MIN_INTERVAL) -> int:
+        """
+        予定を過ぎた対象の予定を window 秒の間に均等に割り振り直し、割り振った対象の数を返す
+
+        1回の処理で取得しきれる場合はそのままにする。動画はまとめて取得する単位ごとに
+        同じ時刻にし、予定の早かった対象から順に割り振る。
+        """
+        now = now or datetime.now()
+        calls = plan_calls(get_due_watch_items(now), budget=sys.maxsize)
+        if len(calls) <= self.budget:
+            return 0
+        schedule = [
+            (item["id"], now + timedelta(seconds=position * window / len(calls)))
+            for position, (_, items) in enumerate(calls)
+            for item in items
+        ]
+        set_next_poll_times(schedule)
+        logger.info("予定を過ぎた%d件を%d秒の間に割り振りました", len(schedule), window)
+        return len(schedule)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """取得予定を過ぎた対象を1回分処理し、処理した対象の数を返す"""
+        now = now or datetime.now()
+        due = await asyncio.to_thread(get_due_watch_items, now, self.budget * SCHEDULER_VIDEO_BATCH_SIZE)
+        calls = plan_calls(due, self.budget)
+        if not calls:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(kind: str, items: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    velocities = await asyncio.to_thread(self._fetch, kind, items)
+                except Exception as e:
+                    _fetch_error_log.warning("定期取得エラー: %s %s - %s", kind, ", ".join(item["item_value"] for item in items), e)
+                    velocities = {}
+            return [self._schedule(item, velocities.get(item["item_value"]), now) for item in items]
+
+        results = await asyncio.gather(*(run(kind, items) for kind, items in calls))
+        updates = [update for result in results for update in result]
+        await asyncio.to_thread(update_watch_items, updates)
+        logger.info("%d件を取得しました（API呼び出し %d回）", len(updates), len(calls))
+        return len(updates)
+
+    async def run_forever(self):
+        """停止されるまで取得を繰り返す（保持期間を過ぎたデータの削除も定期的に行う）"""
+        next_retention = time.monotonic() + SCHEDULER_RETENTION_INTERVAL
+        # 停止中に溜まった対象を再開直後にまとめて取得しない
+        await asyncio.to_thread(self.spread_overdue)
+        while True:
+            processed = await self.run_once()
+
+            if time.monotonic() >= next_retention:
+                await asyncio.to_thread(run_retention)
+                next_retention = time.monotonic() + SCHEDULER_RETENTION_INTERVAL
+
+            # 取得した場合はまだ予定を過ぎた対象が残っている可能性があるので続ける
+            # （呼び出しの間隔はレート制限で調整される）
+            if processed:
+                continue
+            next_poll = await asyncio.to_thread(get_next_poll_time)
+            wait = SCHEDULER_IDLE_SLEEP
+            if next_poll is not None:
+                wait = min(max((next_poll - datetime.now()).total_seconds(), 1), SCHEDULER_IDLE_SLEEP)
+            await asyncio.sleep(wait)
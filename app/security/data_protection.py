@@ -1,10 +1,71 @@
-from cryptography.fernet import Fernet
 import os
 
+from cryptography.fernet import Fernet, InvalidToken
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.config import (
+    ENCRYPTED_COLUMNS, ENCRYPTION_KEY_FILE,
+    ENCRYPT_PARALLEL_THRESHOLD, ENCRYPT_WORKERS
+)
+from app.models import VideoBatch
+from app.security.keys import load_or_create_key
+
+# Fernet トークンの先頭（バージョンバイト 0x80 の base64）。暗号化済みの値の判定に使う
+FERNET_TOKEN_PREFIX = "gAAAAA"
+
+
+def load_encryption_key() -> bytes:
+    """暗号鍵を取得（ENCRYPTION_KEY が未設定の場合は鍵ファイルを使用し、なければ1回だけ生成）"""
+    return load_or_create_key("ENCRYPTION_KEY", ENCRYPTION_KEY_FILE, Fernet.generate_key)
+
+
+def check_encryption_key():
+    """
+    ENCRYPTION_KEY が設定されている場合、Fernet の鍵として使える値か確認する
+
+    起動時に呼び、最初の保存で失敗する前に設定の誤りを知らせる。
+
+    Raises:
+        ValueError: 鍵の形式が正しくない場合
+    """
+    value = os.getenv("ENCRYPTION_KEY")
+    if not value:
+        return
+    try:
+        Fernet(value.encode())
+    except ValueError:
+        raise ValueError(
+            "ENCRYPTION_KEY が Fernet の鍵の形式（32バイトを URL-safe base64 でエンコードした値）ではありません。"
+            "空にすると鍵ファイルを生成して使います"
+        ) from None
+
+
+@lru_cache(maxsize=None)
+def get_cipher(key: bytes) -> Fernet:
+    """鍵ごとに Fernet インスタンスをキャッシュして返す"""
+    return Fernet(key)
+
+
+def is_encrypted(value) -> bool:
+    """暗号化済みの値かどうか（暗号化導入前の平文の行と区別する）"""
+    return isinstance(value, str) and value.startswith(FERNET_TOKEN_PREFIX)
+
+
 class DataProtection:
-    def __init__(self):
-        self.key = os.getenv('ENCRYPTION_KEY', Fernet.generate_key())
-        self.cipher_suite = Fernet(self.key)
+    def __init__(self, key: Optional[bytes] = None):
+        self._key = key
+
+    @property
+    def key(self) -> bytes:
+        """暗号鍵（実際に暗号化・復号化するまで読み込まない）"""
+        if self._key is None:
+            self._key = load_encryption_key()
+        return self._key
+
+    @property
+    def cipher_suite(self) -> Fernet:
+        return get_cipher(self.key)
 
     def encrypt_data(self, data):
         """データの暗号化"""
@@ -12,4 +73,78 @@ class DataProtection:
 
     def decrypt_data(self, encrypted_data):
         """データの復号化"""
-        return self.cipher_suite.decrypt(encrypted_data).decode() 
\ No newline at end of file
+        return self.cipher_suite.decrypt(encrypted_data).decode()
+
+    def encrypt_values(self, values: Sequence[Optional[str]], workers: int = ENCRYPT_WORKERS) -> List[Optional[str]]:
+        """
+        値のリストをまとめて暗号化（None はそのまま）
+
+        件数が ENCRYPT_PARALLEL_THRESHOLD 以上の場合はプロセスプールで並列に暗号化する。
+        """
+        if workers > 1 and len(values) >= ENCRYPT_PARALLEL_THRESHOLD:
+            from concurrent.futures import ProcessPoolExecutor
+
+            size = -(-len(values) // workers)
+            chunks = [values[i:i + size] for i in range(0, len(values), size)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.key,)) as executor:
+                return [token for part in executor.map(_encrypt_chunk, chunks) for token in part]
+        return _encrypt_values(self.cipher_suite, values)
+
+    def decrypt_value(self, value):
+        """
+        暗号化済みの値なら復号化し、それ以外はそのまま返す
+
+        暗号化の判定は先頭の文字列によるため、たまたま同じ文字列で始まる平文は
+        復号化できない。その場合も読み出しを止めず、平文としてそのまま返す。
+        """
+        if not is_encrypted(value):
+            return value
+        try:
+            return self.cipher_suite.decrypt(value.encode("ascii")).decode("utf-8")
+        except (InvalidToken, UnicodeEncodeError):
+            return value
+
+    def encrypt_batch(self, batch: VideoBatch, columns: Sequence[str] = ENCRYPTED_COLUMNS) -> VideoBatch:
+        """バッチの指定列を暗号化（辞書エンコードされた一意な値のみを暗号化）"""
+        for name in columns:
+            batch = batch.map_strings(name, self.encrypt_values, vectorized=True)
+        return batch
+
+    def decrypt_rows(self, rows: List[Dict], columns: Optional[Iterable[str]] = None) -> List[Dict]:
+        """行（辞書）の暗号化された列を復号化（columns 指定時はその列のみ）"""
+        targets = [name for name in ENCRYPTED_COLUMNS if columns is None or name in columns]
+        if not rows or not targets:
+            return rows
+        decrypt = self.decrypt_value
+        for row in rows:
+            for name in targets:
+                if name in row:
+                    row[name] = decrypt(row[name])
+        return rows
+
+    def decrypt_chunks(self, chunks: Iterable[List[Dict]], columns: Optional[Iterable[str]] = None) -> Iterator[List[Dict]]:
+        """チャンクを読み出す時点で1チャンクずつ復号化する"""
+        for rows in chunks:
+            yield self.decrypt_rows(rows, columns)
+
+
+def _encrypt_values(cipher: Fernet, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """値のリストを暗号化して文字列のトークンで返す"""
+    encrypt = cipher.encrypt
+    return [
+        None if value is None else encrypt(value.encode("utf-8")).decode("ascii")
+        for value in values
+    ]
+
+
+# プロセスプールのワーカーで使う Fernet インスタンス
+_worker_cipher: Optional[Fernet] = None
+
+
+def _init_worker(key: bytes):
+    global _worker_cipher
+    _worker_cipher = Fernet(key)
+
+
+def _encrypt_chunk(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    return _encrypt_values(_worker_cipher, values)
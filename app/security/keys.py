@@ -0,0 +1,68 @@
+# 暗号鍵・仮名化鍵の読み込み
+import os
+import tempfile
+import time
+from typing import Callable
+
+
+def _read_key(key_file: str, attempts: int = 50, delay: float = 0.01) -> bytes:
+    """鍵ファイルを読み込む（空の場合は書き込み中とみなして少し待ってから読み直す）"""
+    for _ in range(attempts):
+        with open(key_file, "rb") as f:
+            key = f.read().strip()
+        if key:
+            return key
+        time.sleep(delay)
+    raise ValueError(f"鍵ファイルが空です: {key_file}")
+
+
+def load_or_create_key(env_name: str, key_file: str, generate: Callable[[], bytes]) -> bytes:
+    """
+    鍵を環境変数または鍵ファイルから読み込む
+
+    環境変数が未設定の場合は鍵ファイルを使い、ファイルもなければ生成して保存する。
+    プロセスや実行をまたいで同じ鍵を使うため、生成は1回だけ行う。鍵は一時ファイルに
+    書き込んで fsync してから os.link で公開するので、他のプロセスから書きかけの鍵が
+    見えることはなく、複数プロセスが同時に起動しても先に公開した1つの鍵に揃う。
+
+    Args:
+        env_name: 鍵を格納する環境変数名
+        key_file: 鍵ファイルのパス
+        generate: 新しい鍵を生成する関数
+
+    Returns:
+        鍵（bytes）
+    """
+    value = os.getenv(env_name)
+    if value:
+        return value.encode()
+
+    try:
+        return _read_key(key_file)
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(key_file) or "."
+    os.makedirs(directory, exist_ok=True)
+    key = generate()
+    # mkstemp は所有者のみ読み書きできる権限（0600）でファイルを作る
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".key.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # 既存のファイルは上書きしない（先に公開された鍵を使う）
+            os.link(tmp_path, key_file)
+        except FileExistsError:
+            return _read_key(key_file)
+    finally:
+        os.remove(tmp_path)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return key
@@ -0,0 +1,69 @@
+# 作成者IDなどの仮名化
+import hashlib
+import hmac
+import secrets
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from app.config import PSEUDONYM_CACHE_SIZE, PSEUDONYM_KEY_FILE
+from app.models import VideoBatch
+from app.security.keys import load_or_create_key
+
+
+class Pseudonymizer:
+    """
+    鍵付きHMACによる決定的な仮名化
+
+    Python の hash() と異なり、同じ鍵を使う限りプロセスや実行をまたいで
+    同じIDには同じ仮名が割り当てられるため、仮名化後のデータでも結合・重複排除ができる。
+    一度計算した仮名は上限付きのLRUキャッシュに保持する（複数のジョブのスレッドから
+    共有されるため、キャッシュの操作はロックする）。
+    """
+
+    def __init__(self, key: Optional[bytes] = None, cache_size: int = PSEUDONYM_CACHE_SIZE):
+        self._key = key or load_or_create_key(
+            "PSEUDONYM_KEY", PSEUDONYM_KEY_FILE, lambda: secrets.token_hex(32).encode()
+        )
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def pseudonymize(self, value: str) -> str:
+        """1件の値を仮名に変換"""
+        with self._lock:
+            cached = self._cache.get(value)
+            if cached is not None:
+                self._cache.move_to_end(value)
+                return cached
+
+        # HMAC の計算はロックの外で行う（同じ値を同時に計算しても結果は同じ）
+        digest = hmac.new(self._key, value.encode("utf-8"), hashlib.sha256).hexdigest()
+        pseudonym = f"user_{digest[:16]}"
+        with self._lock:
+            self._cache[value] = pseudonym
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return pseudonym
+
+    def pseudonymize_batch(self, batch: VideoBatch) -> VideoBatch:
+        """
+        バッチの作成者情報を仮名化
+
+        辞書エンコードされた列の一意な値だけを変換するため、
+        計算量は行数ではなく作成者数に比例する。
+        """
+        batch = batch.map_strings("creator_id", self.pseudonymize)
+        return batch.map_strings("creator_name", lambda _: "Anonymous")
+
+
+@lru_cache(maxsize=None)
+def get_pseudonymizer() -> Pseudonymizer:
+    """プロセス共通の Pseudonymizer を取得"""
+    return Pseudonymizer()
+
+
+def anonymize_batch(batch: VideoBatch) -> VideoBatch:
+    """バッチを仮名化（データ取得パイプラインの匿名化ステージ）"""
+    return get_pseudonymizer().pseudonymize_batch(batch)
@@ -0,0 +1,518 @@
+# 行を保持せずに統計・上位要素を求めるストリーミング集計（マージ・シリアライズ可能）
+import heapq
+import itertools
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.analytics import COUNTER_COLUMNS, as_batch
+from app.config import (
+    STATS_SKETCH_K, TRENDING_CAPACITY, TRENDING_HALF_LIFE_HOURS, TRENDING_SEEN_CAPACITY, TRENDING_SEEN_HOURS,
+    TRENDING_STATE_FILE
+)
+from app.models import VideoBatch
+
+try:
+    import fcntl
+except ImportError:  # Windows ではファイルロックを行わない
+    fcntl = None
+
+
+class RunningMoments:
+    """
+    件数・合計・平均・分散・最小値・最大値を一定メモリで保持する（Welford 法）
+
+    ページ単位の値はまず NumPy で要約し、Chan らの並列版の式で既存の値と合成する。
+    同じ式で別ワーカーの結果もマージできる。
+    """
+
+    __slots__ = ("count", "total", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def update(self, values: np.ndarray):
+        """値の配列をまとめて追加"""
+        if not len(values):
+            return
+        other = RunningMoments()
+        other.count = int(len(values))
+        other.total = values.sum().item()
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = values.min().item()
+        other.max = values.max().item()
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments"):
+        """別の集計結果を合成"""
+        if not other.count:
+            return
+        if not self.count:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """標本分散（2件未満は0）"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningMoments":
+        moments = cls()
+        for name in cls.__slots__:
+            setattr(moments, name, data[name])
+        return moments
+
+
+class KLLSketch:
+    """
+    分位点を近似する KLL スケッチ
+
+    レベル h の要素は 2**h 件分の重みを持つ。レベルが容量を超えると
+    ソートして1つおきに上のレベルへ送る（圧縮）ため、保持する要素数は
+    おおよそ 3k 件で頭打ちになる。順位の誤差はおおむね 1.7 / k 程度。
+    """
+
+    def __init__(self, k: int = STATS_SKETCH_K, seed: Optional[int] = None):
+        self.k = k
+        self.compactors: List[List[float]] = [[]]
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        """スケッチが表す元データの件数"""
+        return sum(len(items) << h for h, items in enumerate(self.compactors))
+
+    def _capacity(self, level: int) -> int:
+        """上のレベルほど大きい容量（最上位が k）"""
+        depth = len(self.compactors) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, values: Union[Sequence[float], np.ndarray]):
+        """値をまとめて追加"""
+        self.compactors[0].extend(np.asarray(values, dtype=np.float64).tolist())
+        self._compress()
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    # 奇数件の場合は1件を残し、残りをソートして1つおきに上のレベルへ
+                    keep = [items.pop()] if len(items) % 2 else []
+                    items.sort()
+                    self.compactors[level + 1].extend(items[self._random.getrandbits(1)::2])
+                    self.compactors[level] = keep
+                    break
+
+    def merge(self, other: "KLLSketch"):
+        """別のスケッチを合成"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self._compress()
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """分位点（0〜1）の近似値を返す"""
+        items = [(value, 1 << h) for h, level in enumerate(self.compactors) for value in level]
+        if not items:
+            return [None] * len(qs)
+        items.sort()
+        values = np.array([value for value, _ in items])
+        cumulative = np.cumsum([weight for _, weight in items])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return values[np.minimum(positions, len(values) - 1)].tolist()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "compactors": [list(items) for items in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.compactors = [list(items) for items in data["compactors"]] or [[]]
+        return sketch
+
+
+class StreamingStats:
+    """
+    動画のカウンタ（再生数・いいね数など）のストリーミング統計
+
+    取得したページを update() で順に渡すと、行を保持せずに一定メモリで
+    件数・合計・平均・標準偏差・最小値・最大値・中央値・p90・p99 を返せる。
+    to_dict() / from_dict() で保存でき、ワーカーごとの結果は merge() で合成できる。
+
+    使用例:
+        stats = StreamingStats()
+        for page in pages:
+            stats.update(page)
+        stats.result()["views"]["median"]
+    """
+
+    def __init__(self, k: int = STATS_SKETCH_K):
+        self.k = k
+        self.moments = {label: RunningMoments() for label in COUNTER_COLUMNS}
+        self.sketches = {label: KLLSketch(k) for label in COUNTER_COLUMNS}
+
+    @property
+    def count(self) -> int:
+        return self.moments["views"].count
+
+    def update(self, data: Union[Sequence[Dict], VideoBatch]):
+        """1ページ分のデータ（APIレスポンスのリストまたは VideoBatch）を追加"""
+        batch = as_batch(data)
+        for label, name in COUNTER_COLUMNS.items():
+            values = batch.column(name)
+            self.moments[label].update(values)
+            self.sketches[label].update(values)
+
+    def merge(self, other: "StreamingStats"):
+        """別のワーカー・実行の統計を合成"""
+        for label in COUNTER_COLUMNS:
+            self.moments[label].merge(other.moments[label])
+            self.sketches[label].merge(other.sketches[label])
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """現時点の統計（analytics.summarize と同じキーに std を加えたもの）"""
+        result = {}
+        for label in COUNTER_COLUMNS:
+            moments = self.moments[label]
+            median, p90, p99 = self.sketches[label].quantiles((0.5, 0.9, 0.99))
+            result[label] = {
+                "count": moments.count,
+                "sum": moments.total,
+                "mean": moments.mean,
+                "std": math.sqrt(moments.variance),
+                "min": moments.min if moments.count else 0,
+                "max": moments.max if moments.count else 0,
+                "median": median or 0.0,
+                "p90": p90 or 0.0,
+                "p99": p99 or 0.0
+            }
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON に保存できる形式に変換"""
+        return {
+            "k": self.k,
+            "counters": {
+                label: {
+                    "moments": self.moments[label].to_dict(),
+                    "sketch": self.sketches[label].to_dict()
+                }
+                for label in COUNTER_COLUMNS
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingStats":
+        stats = cls(k=data["k"])
+        for label, state in data["counters"].items():
+            stats.moments[label] = RunningMoments.from_dict(state["moments"])
+            stats.sketches[label] = KLLSketch.from_dict(state["sketch"])
+        return stats
+
+
+class SpaceSaving:
+    """
+    出現回数の多い要素を一定メモリで追跡する（Space-Saving アルゴリズム）
+
+    最大 capacity 件のカウンタを持ち、満杯のときは最小のカウンタを新しい要素に
+    置き換える（置き換え前の回数を誤差として記録する）。推定回数は真の回数以上で、
+    誤差は 総数 / capacity 以下に収まる。
+    """
+
+    def __init__(self, capacity: int = TRENDING_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # (回数, 要素) の最小ヒープ。回数が更新された古いエントリは取り出し時に読み飛ばす
+        self._heap: List = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _push(self, item: str):
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> str:
+        """最小のカウンタを持つ要素を返す"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item
+
+    def update(self, counts: Dict[str, int]):
+        """要素ごとの出現回数をまとめて追加（ページ内は事前に集計しておく）"""
+        for item, count in counts.items():
+            if item in self.counts:
+                self.counts[item] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[item] = count
+                self.errors[item] = 0
+            else:
+                evicted = self._pop_min()
+                floor = self.counts.pop(evicted)
+                del self.errors[evicted]
+                self.counts[item] = floor + count
+                self.errors[item] = floor
+            self._push(item)
+
+    def decay(self, factor: float):
+        """すべての回数・誤差に factor を掛ける（順位と誤差の上限はそのまま保たれる）"""
+        self.counts = {item: count * factor for item, count in self.counts.items()}
+        self.errors = {item: error * factor for item, error in self.errors.items()}
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _floor(self) -> int:
+        """追跡されていない要素の回数の上限"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving"):
+        """
+        別の集計を合成
+
+        片方にしかない要素は、もう片方の最小回数（未追跡要素の上限）を加えて誤差に計上する。
+        """
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, floor) + other.errors.get(item, other_floor)
+
+        kept = heapq.nlargest(self.capacity, counts, key=counts.get)
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """推定回数の多い順に上位 n 件を返す（guaranteed は確実に数えられた回数）"""
+        return [
+            {"item": item, "count": self.counts[item], "guaranteed": self.counts[item] - self.errors[item]}
+            for item in heapq.nlargest(n, self.counts, key=self.counts.get)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "items": [[item, count, self.errors[item]] for item, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        summary = cls(capacity=data["capacity"])
+        for item, count, error in data["items"]:
+            summary.counts[item] = count
+            summary.errors[item] = error
+        summary._heap = [(count, item) for item, count in summary.counts.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+
+def _count_values(batch: VideoBatch, name: str) -> Dict[str, int]:
+    """文字列列の値ごとの件数（辞書エンコードのコードを np.bincount で数える）"""
+    codes, categories = batch.codes(name)
+    counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+    return {categories[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+def _count_hashtags(batch: VideoBatch) -> Dict[str, int]:
+    """個々のハッシュタグの件数（タグ文字列の分割は一意な値ごとに1回だけ）"""
+    counts: Dict[str, int] = {}
+    for value, count in _count_values(batch, "hashtags").items():
+        for tag in value.split():
+            if tag.startswith("#"):
+                counts[tag] = counts.get(tag, 0) + count
+    return counts
+
+
+class TrendingTracker:
+    """
+    ハッシュタグ・クリエイター・楽曲の上位を取得しながら追跡する
+
+    件数は half_life_hours ごとに半分に減衰させるため、以前によく見た要素ではなく
+    最近よく見る要素が上位になる。同じ動画を再取得しても seen_hours の間は数え直さない
+    （それ以降に再び取得された場合は、まだ流行っているものとして数える）。覚えておく動画IDは
+    seen_capacity 件までとし、超えた分は古いものから忘れるため、保存する状態の大きさは
+    取得量によらず一定に収まる。
+    save() / load() で実行をまたいで保持し、merge() で別の実行の結果と合成できる。
+    """
+
+    # 追跡対象（名前 → 件数を求める関数）
+    KINDS = {
+        "hashtags": _count_hashtags,
+        "creators": lambda batch: _count_values(batch, "creator_id"),
+        "music": lambda batch: _count_values(batch, "music_title")
+    }
+
+    def __init__(self, capacity: int = TRENDING_CAPACITY, half_life_hours: float = TRENDING_HALF_LIFE_HOURS,
+                 seen_hours: float = TRENDING_SEEN_HOURS, seen_capacity: int = TRENDING_SEEN_CAPACITY):
+        self.capacity = capacity
+        self.half_life_hours = half_life_hours
+        self.seen_hours = seen_hours
+        self.seen_capacity = seen_capacity
+        self.summaries = {kind: SpaceSaving(capacity) for kind in self.KINDS}
+        # 最後に減衰させた時刻（UNIX 時間）と、数えた動画ID → 数えた時刻（数えた順）
+        self.updated_at: Optional[float] = None
+        self.seen: Dict[str, float] = {}
+
+    def decay(self, now: Optional[float] = None):
+        """前回からの経過時間に応じて件数を減衰させ、期限を過ぎた動画IDを忘れる"""
+        now = time.time() if now is None else now
+        if self.updated_at is not None and now > self.updated_at:
+            factor = 0.5 ** ((now - self.updated_at) / 3600 / self.half_life_hours)
+            for summary in self.summaries.values():
+                summary.decay(factor)
+        if self.updated_at is None or now > self.updated_at:
+            self.updated_at = now
+        expires = self.updated_at - self.seen_hours * 3600
+        # 数えた順に並んでいるので、先頭から期限切れの間だけ取り除く
+        for video_id, _ in list(itertools.takewhile(lambda item: item[1] <= expires, self.seen.items())):
+            del self.seen[video_id]
+
+    def _trim_seen(self):
+        """覚えておく動画IDを seen_capacity 件に収める（古いものから忘れる）"""
+        excess = len(self.seen) - self.seen_capacity
+        if excess > 0:
+            for video_id in list(itertools.islice(self.seen, excess)):
+                del self.seen[video_id]
+
+    def update(self, data: Union[Sequence[Dict], VideoBatch], now: Optional[float] = None):
+        """1ページ分のデータを追加（まだ数えていない動画のみ）"""
+        self.decay(now)
+        batch = as_batch(data)
+        codes, categories = batch.codes("video_id")
+        _, first = np.unique(codes, return_index=True)
+        rows = [row for row in np.sort(first) if codes[row] >= 0 and categories[codes[row]] not in self.seen]
+        for row in rows:
+            self.seen[categories[codes[row]]] = self.updated_at
+        self._trim_seen()
+        if not rows:
+            return
+        if len(rows) < len(batch):
+            batch = batch.take(rows)
+        for kind, count in self.KINDS.items():
+            self.summaries[kind].update(count(batch))
+
+    def merge(self, other: "TrendingTracker"):
+        """
+        別の実行の結果を合成（両方を新しい方の時刻まで減衰させてから足し合わせる）
+
+        両方で数えた動画はそれぞれで数えられたままになる。
+        """
+        if other.updated_at is not None:
+            self.decay(other.updated_at)
+            other.decay(self.updated_at)
+        for kind in self.KINDS:
+            self.summaries[kind].merge(other.summaries[kind])
+        seen = dict(self.seen)
+        for video_id, counted in other.seen.items():
+            seen[video_id] = max(counted, seen.get(video_id, counted))
+        self.seen = dict(sorted(seen.items(), key=lambda item: item[1]))
+        self._trim_seen()
+
+    def top(self, kind: str, n: int = 10) -> List[Dict[str, Any]]:
+        return self.summaries[kind].top(n)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "updated_at": self.updated_at,
+            "seen": self.seen,
+            "summaries": {kind: summary.to_dict() for kind, summary in self.summaries.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrendingTracker":
+        tracker = cls()
+        # 減衰を導入する前の形式は種類ごとの集計のみ
+        summaries = data.get("summaries", data)
+        for kind, state in summaries.items():
+            tracker.summaries[kind] = SpaceSaving.from_dict(state)
+        if "summaries" in data:
+            tracker.updated_at = data["updated_at"]
+            tracker.seen = data["seen"]
+        return tracker
+
+    def save(self, path: str = TRENDING_STATE_FILE):
+        """状態をJSONファイルに保存（一意な一時ファイルに書いてから置き換える）"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str = TRENDING_STATE_FILE) -> "TrendingTracker":
+        """保存済みの状態を読み込む（ファイルがなければ空の状態）"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+@contextmanager
+def _state_lock(path: str):
+    """保存済みの集計を読み込んで更新・保存する間、他のプロセス・スレッドの更新を待たせる"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def record_trending(data: Union[Sequence[Dict], VideoBatch], path: str = TRENDING_STATE_FILE,
+                    now: Optional[float] = None) -> TrendingTracker:
+    """取得したデータを保存済みのトレンド集計に加えて保存（読み込みから保存までロックする）"""
+    with _state_lock(path):
+        tracker = TrendingTracker.load(path)
+        tracker.update(data, now)
+        tracker.save(path)
+    return tracker
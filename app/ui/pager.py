@@ -0,0 +1,174 @@
+# 取得結果をページ単位で表示するビューア（表示するページの行だけを整形する）
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from tabulate import tabulate
+
+from app.config import PAGER_PAGE_SIZE
+from app.models import VideoBatch
+from app.ranking import DERIVED_METRICS, RANK_FIELDS, rank_indices
+
+
+def _truncate(text: str, width: int = 30) -> str:
+    return text[:width] + "..." if len(text) > width else text
+
+
+# 表示する列: 見出し → (VideoBatch の列, 整形関数)
+PAGER_COLUMNS: Dict[str, Tuple[str, Callable]] = {
+    "投稿日時": ("post_date", lambda v: v.strftime("%Y/%m/%d %H:%M")),
+    "作成者": ("creator_id", lambda v: v or "不明"),
+    "タイトル": ("description", lambda v: _truncate(v or "")),
+    "再生数": ("view_count", "{:,}".format),
+    "いいね数": ("like_count", "{:,}".format),
+    "コメント数": ("comment_count", "{:,}".format),
+    "シェア数": ("share_count", "{:,}".format),
+    "動画URL": ("video_url", lambda v: v or "")
+}
+
+# 並び替えキーの表示名
+SORT_LABELS = {
+    "views": "再生数",
+    "likes": "いいね数",
+    "comments": "コメント数",
+    "shares": "シェア数",
+    "date": "投稿日時",
+    "engagement_rate": "エンゲージメント率",
+    "like_rate": "いいね率"
+}
+
+# 文字列で絞り込む列
+SEARCH_COLUMNS = ("creator_id", "hashtags", "description")
+
+HELP_TEXT = (
+    "Enter/n: 次のページ  p: 前のページ  g 番号: ページへ移動  "
+    "s キー [asc]: 並び替え  f 文字列: 絞り込み（f のみで解除）  q: 終了"
+)
+
+
+class ResultPager:
+    """
+    取得結果のページ表示
+
+    結果は最初に1回だけ列指向のバッチに変換し、並び替えは行の順序の配列、
+    絞り込みは行ごとの真偽値配列として保持する。表示時には現在のページの
+    行だけを取り出して整形するため、件数が多くても表示にかかる時間は変わらない。
+    """
+
+    def __init__(self, data: Union[List[Dict], VideoBatch], columns: Optional[Sequence[str]] = None,
+                 page_size: int = PAGER_PAGE_SIZE):
+        self.batch = data if isinstance(data, VideoBatch) else VideoBatch.from_api_responses(data)
+        self.columns = list(columns or PAGER_COLUMNS)
+        self.page_size = max(page_size, 1)
+        self.order = np.arange(len(self.batch))
+        self.mask = np.ones(len(self.batch), dtype=bool)
+        self.sort_label = "取得順"
+        self.query = ""
+        self.page = 0
+        self._refresh_view()
+
+    def _refresh_view(self):
+        """並び順と絞り込みから表示する行の位置を求める"""
+        self.view = self.order[self.mask[self.order]]
+        self.page = min(self.page, max(self.page_count - 1, 0))
+
+    @property
+    def page_count(self) -> int:
+        return max((len(self.view) + self.page_size - 1) // self.page_size, 1)
+
+    def sort(self, key: str, ascending: bool = False):
+        """並び替え（同じ値の行は元の順序を維持）"""
+        if key not in RANK_FIELDS and key not in DERIVED_METRICS:
+            raise ValueError(f"並び替えキーは {', '.join(SORT_LABELS)} のいずれかを指定してください")
+        order = rank_indices(self.batch, key)
+        self.order = order[::-1] if ascending else order
+        self.sort_label = f"{SORT_LABELS.get(key, key)}（{'昇順' if ascending else '降順'}）"
+        self.page = 0
+        self._refresh_view()
+
+    def filter(self, query: str):
+        """作成者・ハッシュタグ・説明文に文字列を含む行に絞り込む（空文字列で解除）"""
+        self.query = query.strip()
+        if not self.query:
+            self.mask = np.ones(len(self.batch), dtype=bool)
+        else:
+            needle = self.query.lower().lstrip("#")
+            mask = np.zeros(len(self.batch), dtype=bool)
+            for name in SEARCH_COLUMNS:
+                # 一意な値ごとに判定し、コード配列で行に展開する
+                codes, categories = self.batch.codes(name)
+                hits = np.fromiter((bool(v) and needle in v.lower() for v in categories), dtype=bool, count=len(categories))
+                mask |= (codes >= 0) & hits[np.maximum(codes, 0)]
+            self.mask = mask
+        self.page = 0
+        self._refresh_view()
+
+    def go_to(self, page: int):
+        """ページへ移動（1始まり、範囲外は先頭・末尾に丸める）"""
+        self.page = min(max(page - 1, 0), self.page_count - 1)
+
+    def page_rows(self) -> List[List[str]]:
+        """現在のページの行を整形"""
+        start = self.page * self.page_size
+        rows = self.batch.take(self.view[start:start + self.page_size])
+        formatted = []
+        for label in self.columns:
+            name, formatter = PAGER_COLUMNS[label]
+            formatted.append([formatter(value) for value in rows.column(name).astype(object)])
+        return [list(row) for row in zip(*formatted)]
+
+    def render(self) -> str:
+        """現在のページの表と位置の表示"""
+        start = self.page * self.page_size
+        end = min(start + self.page_size, len(self.view))
+        status = f"ページ {self.page + 1}/{self.page_count}（{len(self.view):,}件中 {start + 1 if end else 0:,}-{end:,}件、並び順: {self.sort_label}"
+        if self.query:
+            status += f"、絞り込み: '{self.query}'"
+        table = tabulate(self.page_rows(), headers=self.columns, tablefmt="simple") if end else "該当する動画がありません。"
+        return f"{table}\n{status}）"
+
+    def handle(self, command: str) -> bool:
+        """コマンドを処理し、終了する場合は False を返す"""
+        action, _, argument = command.strip().partition(" ")
+        if action in ("", "n"):
+            if self.page + 1 >= self.page_count:
+                return False
+            self.page += 1
+        elif action == "p":
+            self.page = max(self.page - 1, 0)
+        elif action == "g" and argument.strip().isdigit():
+            self.go_to(int(argument))
+        elif action == "s" and argument:
+            key, _, direction = argument.strip().partition(" ")
+            self.sort(key, ascending=direction.strip() == "asc")
+        elif action == "f":
+            self.filter(argument)
+        elif action == "q":
+            return False
+        else:
+            print(HELP_TEXT)
+        return True
+
+    def run(self, interactive: Optional[bool] = None):
+        """
+        ページを表示する
+
+        対話的に実行されている場合はページごとに操作を受け付け、
+        それ以外（パイプ・cron など）は全ページを順に出力する。
+        """
+        if interactive is None:
+            interactive = sys.stdin.isatty() and sys.stdout.isatty()
+        if not interactive:
+            for page in range(self.page_count):
+                self.page = page
+                print(self.render())
+            return
+
+        print(HELP_TEXT)
+        while True:
+            print("\n" + self.render())
+            try:
+                if not self.handle(input("> ")):
+                    break
+            except ValueError as e:
+                print(e)
@@ -1,12 +1,40 @@
 import os
 import time
 from typing import List, Dict, Optional
-from datetime import datetime
-import pandas as pd
 from tabulate import tabulate
 
+from app.ui.pager import ResultPager
 from app.utils import extract_video_id
 
+# 統計表の行ラベル
+STATS_LABELS = {
+    "views": "再生数",
+    "likes": "いいね数",
+    "comments": "コメント数",
+    "shares": "シェア数"
+}
+
+def format_stats_table(stats: Dict, top: int = 5) -> str:
+    """compute_stats の結果を表形式の文字列にする"""
+    rows = []
+    for key, label in STATS_LABELS.items():
+        c = stats["counters"][key]
+        rows.append([label, f"{c['sum']:,}", f"{c['mean']:,.1f}", f"{c['median']:,.0f}", f"{c['p90']:,.0f}", f"{c['p99']:,.0f}"])
+    for key, label in (("engagement_rate", "エンゲージメント率"), ("like_rate", "いいね率")):
+        r = stats["rates"][key]
+        rows.append([label, "-", f"{r['mean']:.2%}", f"{r['median']:.2%}", f"{r['p90']:.2%}", f"{r['p99']:.2%}"])
+    lines = ["\n" + tabulate(rows, headers=["", "合計", "平均", "中央値", "p90", "p99"], tablefmt="simple")]
+
+    for key, title, label in (("by_hashtag", "人気ハッシュタグ", "hashtag"), ("by_creator", "人気クリエイター", "creator_id")):
+        groups = stats[key][:top]
+        if groups:
+            lines.append(f"\n--- {title} ---")
+            lines.append(tabulate(
+                [[g[label], g["videos"], f"{g['total_views']:,}", f"{g['engagement_rate']:.2%}"] for g in groups],
+                headers=["", "動画数", "総再生数", "エンゲージメント率"], tablefmt="simple"
+            ))
+    return "\n".join(lines)
+
 class TerminalUI:
     def __init__(self):
         self.header = "===== TikTok動画データ取得・分析アプリ ====="
@@ -195,12 +223,53 @@ class TerminalUI:
         print(f"平均再生回数: {stats['avg_views']:,.1f}")
         print(f"平均いいね数: {stats['avg_likes']:,.1f}")
         
+        if "counters" in stats:
+            print(f"エンゲージメント率: {stats['overall_engagement_rate']:.2%}")
+            print(format_stats_table(stats))
+        
         print("\n1. CSVエクスポート")
         print("2. データサマリー表示")
         print("3. データ削除")
         print("4. 終了")
+        print("5. 並び替え・絞り込みを変更（再取得なし）")
+        print("6. 最新の情報に更新（API）")
         
-        return input("\n選択してください (1-4): ")
+        return input("\n選択してください (1-6): ")
+
+    def view_settings_screen(self, settings: Dict) -> Dict:
+        """取得済みの結果の並び順・絞り込み条件の変更（未入力の項目は現在の値のまま）"""
+        print("\n=== 並び替え・絞り込み ===")
+        print("ソート順を選択してください：")
+        sort_map = {
+            "1": "views",
+            "2": "likes",
+            "3": "comments",
+            "4": "shares",
+            "5": "date",
+            "6": "engagement_rate"
+        }
+        print("1. 再生回数順")
+        print("2. いいね数順")
+        print("3. コメント数順")
+        print("4. シェア数順")
+        print("5. 投稿日時順")
+        print("6. エンゲージメント率順")
+        sort_choice = input(f"選択してください (未入力={settings.get('sort_by', 'views')}): ")
+        
+        min_views = input(f"最小再生回数 (未入力={settings.get('min_views', 0)}): ")
+        min_likes = input(f"最小いいね数 (未入力={settings.get('min_likes', 0)}): ")
+        count = input(f"表示する動画数 (未入力={settings.get('count', '全件')}): ")
+        
+        updated = dict(settings)
+        if sort_choice in sort_map:
+            updated["sort_by"] = sort_map[sort_choice]
+        if min_views.isdigit():
+            updated["min_views"] = int(min_views)
+        if min_likes.isdigit():
+            updated["min_likes"] = int(min_likes)
+        if count.isdigit():
+            updated["count"] = int(count)
+        return updated
 
     def show_privacy_policy(self):
         """プライバシーポリシーの表示"""
@@ -232,30 +301,8 @@ class TerminalUI:
             return
             
         try:
-            # データの整形
-            summary_data = []
-            for video in data:
-                stats = video.get("stats", {})
-                author = video.get("author", {})
-                create_time = datetime.fromtimestamp(video.get("createTime", 0))
-                
-                # 動画URLを取得（playAddrから）
-                video_url = video.get("video", {}).get("playAddr", "")
-                
-                summary_data.append({
-                    "投稿日時": create_time.strftime("%Y/%m/%d %H:%M"),
-                    "作成者": author.get("uniqueId", "不明"),
-                    "タイトル": video.get("desc", "")[:30] + "..." if len(video.get("desc", "")) > 30 else video.get("desc", ""),
-                    "再生数": f'{stats.get("playCount", 0):,}',
-                    "いいね数": f'{stats.get("diggCount", 0):,}',
-                    "コメント数": f'{stats.get("commentCount", 0):,}',
-                    "動画URL": video_url
-                })
-            
-            df = pd.DataFrame(summary_data)
-            print("\n" + tabulate(df, headers='keys', tablefmt='grid', showindex=False))
-            
+            # ページ単位で表示（q で結果画面に戻る）
+            ResultPager(data).run()
         except Exception as e:
             print(f"データ表示エラー: {e}")
-        
-        input("\nEnterキーで続行...")
\ No newline at end of file
+            input("\nEnterキーで続行...")
\ No newline at end of file
@@ -0,0 +1,138 @@
+# 取得ごとの履歴から再生数の伸び（速度・加速度）と異常値を検出する
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import VELOCITY_MIN_COHORT, VELOCITY_WINDOW_HOURS, VELOCITY_Z_THRESHOLD
+from app.db import get_video_snapshots
+
+# 正規分布で MAD を標準偏差に揃える係数（0.6745 = Φ^-1(0.75)）
+MAD_SCALE = 0.6745
+# MAD が0の場合に使う平均絶対偏差の係数（sqrt(pi/2)）
+MEAN_AD_SCALE = 1.253314
+
+# ハッシュタグがない動画のコホート名
+NO_HASHTAG = "(なし)"
+
+# 戻り値の列
+VELOCITY_COLUMNS = [
+    "video_id", "cohort", "observations", "view_count",
+    "views_per_hour", "acceleration", "robust_z", "is_anomaly"
+]
+
+
+def _hours(values) -> np.ndarray:
+    """日時の配列を時間単位の浮動小数点数に変換"""
+    return np.asarray(values, dtype="datetime64[us]").astype(np.int64) / 3.6e9
+
+
+def robust_zscores(values: np.ndarray, cohorts: np.ndarray, min_cohort: int = VELOCITY_MIN_COHORT) -> np.ndarray:
+    """
+    コホートごとの中央値と MAD によるロバストな z スコア
+
+    件数が min_cohort 未満のコホートは全体の中央値・MAD を使う。
+    MAD が0の場合は平均絶対偏差で代用し、それも0なら z スコアは0とする。
+    """
+    frame = pd.DataFrame({"value": values, "cohort": cohorts})
+    grouped = frame.groupby("cohort")["value"]
+    size = grouped.transform("size").to_numpy()
+    median = grouped.transform("median").to_numpy()
+    deviation = np.abs(values - median)
+    mad = frame.assign(deviation=deviation).groupby("cohort")["deviation"].transform("median").to_numpy()
+    mean_ad = frame.assign(deviation=deviation).groupby("cohort")["deviation"].transform("mean").to_numpy()
+
+    # 小さいコホートは全体の値で代用
+    small = size < min_cohort
+    if small.any():
+        global_median = np.median(values)
+        global_deviation = np.abs(values - global_median)
+        median = np.where(small, global_median, median)
+        mad = np.where(small, np.median(global_deviation), mad)
+        mean_ad = np.where(small, global_deviation.mean(), mean_ad)
+
+    centered = values - median
+    z = np.zeros(len(values), dtype=np.float64)
+    np.divide(MAD_SCALE * centered, mad, out=z, where=mad > 0)
+    fallback = (mad == 0) & (mean_ad > 0)
+    np.divide(centered, MEAN_AD_SCALE * mean_ad, out=z, where=fallback)
+    return z
+
+
+def compute_velocity(snapshots: List[Dict[str, Any]], z_threshold: float = VELOCITY_Z_THRESHOLD) -> pd.DataFrame:
+    """
+    動画ごとの再生数の伸びを計算
+
+    動画ID・取得日時でソートした履歴から、直近2回の取得の差分で
+    1時間あたりの再生数（速度）を、直近3回の取得から速度の変化率（加速度）を求める。
+    速度は先頭のハッシュタグごとのコホートで比較し、ロバストな z スコアが
+    z_threshold 以上（コホートより大きく伸びている）動画を急上昇とする
+    （伸びが止まった動画は z スコアが負になるので含めない）。
+
+    Args:
+        snapshots: video_id / fetch_date / view_count / hashtags を持つ行のリスト
+        z_threshold: 急上昇とみなす z スコア
+
+    Returns:
+        動画ごとの速度・加速度・z スコア（速度の大きい順）
+    """
+    if not snapshots:
+        return pd.DataFrame(columns=VELOCITY_COLUMNS)
+
+    frame = pd.DataFrame(snapshots).sort_values(["video_id", "fetch_date"], kind="stable")
+    video_ids = frame["video_id"].to_numpy()
+    hours = _hours(frame["fetch_date"].to_numpy())
+    views = frame["view_count"].to_numpy(dtype=np.float64)
+
+    # 直前の行が同じ動画かどうか
+    same = np.zeros(len(frame), dtype=bool)
+    same[1:] = video_ids[1:] == video_ids[:-1]
+
+    # 速度: 直前の取得からの再生数の増分 / 経過時間
+    elapsed = np.zeros(len(frame))
+    elapsed[1:] = hours[1:] - hours[:-1]
+    valid = same & (elapsed > 0)
+    gained = np.zeros(len(frame))
+    gained[1:] = views[1:] - views[:-1]
+    velocity = np.full(len(frame), np.nan)
+    np.divide(gained, elapsed, out=velocity, where=valid)
+
+    # 加速度: 速度の変化 / 2つの区間の中点の間隔
+    acceleration = np.full(len(frame), np.nan)
+    previous = np.full(len(frame), np.nan)
+    previous[1:] = velocity[:-1]
+    span = np.zeros(len(frame))
+    span[2:] = (hours[2:] - hours[:-2]) / 2
+    np.divide(velocity - previous, span, out=acceleration, where=valid & (span > 0) & ~np.isnan(previous))
+
+    # 動画ごとに最新の行を使う
+    last = np.ones(len(frame), dtype=bool)
+    last[:-1] = video_ids[:-1] != video_ids[1:]
+    starts = np.flatnonzero(~same)
+    observations = np.diff(np.append(starts, len(frame)))
+
+    velocity = np.nan_to_num(velocity[last])
+    cohorts = (
+        frame["hashtags"].fillna("").str.split().str[0].fillna(NO_HASHTAG).to_numpy()[last]
+    )
+    z = robust_zscores(velocity, cohorts)
+
+    result = pd.DataFrame({
+        "video_id": video_ids[last],
+        "cohort": cohorts,
+        "observations": observations,
+        "view_count": views[last].astype(np.int64),
+        "views_per_hour": velocity,
+        "acceleration": np.nan_to_num(acceleration[last]),
+        "robust_z": z,
+        "is_anomaly": z >= z_threshold
+    })
+    return result.sort_values("views_per_hour", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def load_velocity(video_ids: Optional[List[str]] = None, window_hours: int = VELOCITY_WINDOW_HOURS,
+                  now: Optional[datetime] = None) -> pd.DataFrame:
+    """直近 window_hours 時間の履歴から速度を計算（video_ids 指定時はその動画のみ）"""
+    since = (now or datetime.now()) - timedelta(hours=window_hours)
+    return compute_velocity(get_video_snapshots(since, video_ids))
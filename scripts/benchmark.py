@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+取得 → 変換 → 保存 → 出力 の各段階の処理速度を計測するベンチマーク
+
+外部のAPI・MySQLを使わず、合成データに対してモックAPI（MockVideoStore）、
+ローカルのHTTPサーバー（公式APIと同じ形式の応答を返す代役）、組み込みDB（SQLite）で
+実行する。段階ごとに処理時間・1秒あたりの件数・最大メモリを JSON に記録し、
+基準値（--baseline）より遅く・大きくなった段階があれば終了コード1で終了する。
+最大メモリは tracemalloc で計測するため、pyarrow など Python 外で確保したメモリは含まない。
+基準値は計測するマシンで --update-baseline により作り直すこと。
+
+例:
+    python scripts/benchmark.py                              # 1k〜1M で計測して基準値と比較
+    python scripts/benchmark.py --sizes 1000,10000 --output result.json
+    python scripts/benchmark.py --update-baseline            # 基準値を更新
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 鍵ファイルを作らないよう、ベンチマーク用の暗号鍵を使う
+from cryptography.fernet import Fernet  # noqa: E402
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+import app.db  # noqa: E402
+from app.analytics import compute_stats  # noqa: E402
+from app.api.client import TikTokAPIClient  # noqa: E402
+from app.api.mock import MockVideoStore  # noqa: E402
+from app.api.rate_limiter import RateLimiter  # noqa: E402
+from app.config import FETCH_MAX_PAGES  # noqa: E402
+from app.export import export_stream_to_csv, export_to_parquet  # noqa: E402
+from app.filters import VideoFilter  # noqa: E402
+from app.pipeline import prepare_batch  # noqa: E402
+from app.ranking import rank_videos  # noqa: E402
+from app.security.data_protection import DataProtection  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "benchmark_baseline.json")
+
+# 合成データの作成者・ハッシュタグ・楽曲の種類（実データと同様に繰り返し現れる）
+HASHTAGS = ["ダンス", "流行", "コメディ", "笑える", "簡単料理", "時短レシピ", "トレンド", "おすすめ", "メイク", "美容"]
+
+
+def generate_videos(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """公式APIの応答と同じ形式の合成データ（seed が同じなら同じデータ）"""
+    rng = random.Random(seed)
+    creators = max(count // 20, 1)
+    songs = max(count // 50, 1)
+    start = datetime(2025, 3, 1)
+    videos = []
+    for i in range(count):
+        views = rng.randint(1000, 5000000)
+        tags = " ".join(f"#{tag}" for tag in rng.sample(HASHTAGS, 2))
+        creator = rng.randrange(creators)
+        song = rng.randrange(songs)
+        videos.append({
+            "id": f"72{i:016d}",
+            "video_description": f"ベンチマーク用の説明文 {i} {tags}",
+            "create_time": (start + timedelta(minutes=i)).isoformat(),
+            "author": {"username": f"creator_{creator}", "display_name": f"クリエイター{creator}"},
+            "view_count": views,
+            "like_count": int(views * rng.uniform(0.05, 0.3)),
+            "comment_count": int(views * rng.uniform(0.005, 0.05)),
+            "share_count": int(views * rng.uniform(0.01, 0.1)),
+            "music_info": {"title": f"楽曲{song}", "author": f"アーティスト{song}"},
+            "embed_link": f"https://example.com/video/{i}"
+        })
+    return videos
+
+
+class StandInServer:
+    """
+    公式APIの video/list/ と同じ形式でページを返すローカルHTTPサーバー
+
+    応答は事前にJSONへ変換しておき、サーバー側の処理時間が計測に入らないようにする。
+    クライアントの取得ページ数の上限（FETCH_MAX_PAGES）内で全件を返せるよう、
+    1ページの件数は max(要求された件数, 全件 / FETCH_MAX_PAGES) とする。
+    """
+
+    def __init__(self, videos: List[Dict[str, Any]], page_size: int = 100):
+        size = max(page_size, math.ceil(len(videos) / FETCH_MAX_PAGES))
+        self.pages = []
+        for number, start in enumerate(range(0, len(videos), size)):
+            has_more = start + size < len(videos)
+            body = {"data": {"videos": videos[start:start + size], "cursor": number + 1, "has_more": has_more}}
+            self.pages.append(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                page = pages[request.get("cursor") or 0]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _to_sqlite(query: str) -> str:
+    """MySQL 向けの INSERT 文を SQLite の構文に置き換える"""
+    query = query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+    query = query.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+    return re.sub(r"VALUES\((\w+)\)", r"excluded.\1", query)
+
+
+class SQLiteConnection:
+    """app.db の関数から MySQL の接続と同じように使える SQLite の接続（組み込みDB）"""
+
+    SCHEMA = """
+    CREATE TABLE videos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_id TEXT NOT NULL UNIQUE, creator_id TEXT NOT NULL, creator_name TEXT NOT NULL,
+        video_url TEXT NOT NULL, view_count INTEGER NOT NULL, like_count INTEGER NOT NULL,
+        comment_count INTEGER NOT NULL, share_count INTEGER NOT NULL,
+        post_date TIMESTAMP NOT NULL, fetch_date TIMESTAMP NOT NULL,
+        description TEXT, music_title TEXT, music_author TEXT, hashtags TEXT
+    );
+    CREATE TABLE video_snapshots (
+        video_id TEXT NOT NULL, fetch_date TIMESTAMP NOT NULL,
+        view_count INTEGER NOT NULL, like_count INTEGER NOT NULL,
+        comment_count INTEGER NOT NULL, share_count INTEGER NOT NULL,
+        PRIMARY KEY (video_id, fetch_date)
+    );
+    """
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+    def cursor(self, **kwargs):
+        return SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        # 計測中は同じインメモリDBを使い続ける
+        pass
+
+    def count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        return self.cursor.execute(_to_sqlite(query), params)
+
+    def executemany(self, query, rows):
+        return self.cursor.executemany(_to_sqlite(query), rows)
+
+    def close(self):
+        self.cursor.close()
+
+
+def measure(func: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, Any]:
+    """関数の最短の実行時間と、最大メモリ（tracemalloc で別に1回実行）を計測"""
+    seconds = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - started)
+
+    result = {"seconds": seconds}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_size(size: int, repeat: int, memory: bool, workdir: str) -> Dict[str, Dict[str, Any]]:
+    """1つのデータ件数で全段階を計測"""
+    raw = generate_videos(size)
+    api_format = TikTokAPIClient(use_mock=True)._format_video_data(raw)
+    batch = prepare_batch(api_format)
+    encrypted = DataProtection().encrypt_batch(batch)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def fetch_mock():
+        store = MockVideoStore(api_format)
+        return rank_videos(store.query(VideoFilter(min_views=1000)), "views", size)
+
+    with StandInServer(raw) as server:
+        client = TikTokAPIClient(use_mock=False, rate_limiter=RateLimiter(limit=10 ** 9))
+        client.base_url = server.base_url
+        client.access_token = "benchmark"
+
+        def fetch_http():
+            videos = asyncio.run(client.get_trending_videos(count=size, sort_by="views", video_filter=VideoFilter()))
+            assert len(videos) == size, f"HTTPの取得件数が一致しません: {len(videos)}"
+
+        results["fetch_mock"] = measure(fetch_mock, repeat, memory)
+        results["fetch_http"] = measure(fetch_http, repeat, memory)
+
+    results["normalize"] = measure(lambda: prepare_batch(api_format), repeat, memory)
+    results["stats"] = measure(lambda: compute_stats(batch), repeat, memory)
+    results["encrypt"] = measure(lambda: DataProtection().encrypt_batch(batch), repeat, memory)
+
+    def save():
+        # 暗号化は encrypt で計測済みのため、暗号化済みのバッチで保存のみを計測する
+        app.db.ENCRYPT_STORAGE = False
+        connection = SQLiteConnection()
+        app.db.get_connection = lambda: connection
+        app.db.save_video_data(encrypted)
+        assert connection.count("videos") == size
+
+    results["save"] = measure(save, repeat, memory)
+
+    csv_path = os.path.join(workdir, "benchmark.csv")
+    parquet_path = os.path.join(workdir, "benchmark.parquet")
+    results["export_csv"] = measure(lambda: export_stream_to_csv([batch], csv_path), repeat, memory)
+    results["export_parquet"] = measure(lambda: export_to_parquet([batch], parquet_path), repeat, memory)
+
+    for result in results.values():
+        result["videos_per_second"] = size / result["seconds"] if result["seconds"] else 0.0
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    基準値と比較して悪化した段階の一覧を返す
+
+    処理速度は tolerance の割合より遅い場合、最大メモリは tolerance の割合と1MBより
+    大きい場合に悪化とする。基準値が10ms未満の計測は誤差が大きいため速度を比較しない。
+    """
+    regressions = []
+    for size, stages in results["results"].items():
+        for stage, current in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            if base["seconds"] >= 0.01 and current["videos_per_second"] < base["videos_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{stage} ({size}件): {current['videos_per_second']:,.0f}件/秒"
+                    f"（基準 {base['videos_per_second']:,.0f}件/秒）"
+                )
+            if "peak_mb" in current and "peak_mb" in base:
+                if current["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 1:
+                    regressions.append(f"{stage} ({size}件): 最大メモリ {current['peak_mb']:,.1f}MB（基準 {base['peak_mb']:,.1f}MB）")
+    return regressions
+
+
+def print_results(results: Dict[str, Any]):
+    for size, stages in results["results"].items():
+        print(f"\n=== {int(size):,}件 ===")
+        for stage, result in stages.items():
+            memory = f"  最大 {result['peak_mb']:8,.1f}MB" if "peak_mb" in result else ""
+            print(f"{stage:<15} {result['seconds']:9.3f}秒  {result['videos_per_second']:14,.0f}件/秒{memory}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="取得・変換・保存・出力のベンチマーク")
+    parser.add_argument("--sizes", type=lambda s: [int(v) for v in s.split(",")], default=list(DEFAULT_SIZES),
+                        help="計測するデータ件数（カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=3, help="各段階の実行回数（最短の時間を記録）")
+    parser.add_argument("--no-memory", action="store_true", help="最大メモリを計測しない")
+    parser.add_argument("--output", type=str, help="計測結果の出力先（JSON）")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="比較する基準値（JSON）")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="悪化とみなす割合")
+    parser.add_argument("--update-baseline", action="store_true", help="計測結果で基準値を更新")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    results: Dict[str, Any] = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat
+        },
+        "results": {}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"{size:,}件を計測しています...", flush=True)
+            results["results"][str(size)] = run_size(size, args.repeat, not args.no_memory, workdir)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n計測結果を {args.output} に出力しました")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基準値を {args.baseline} に保存しました")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("基準値がないため比較しません（--update-baseline で作成）")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\n基準値より悪化した段階があります:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("\n基準値からの悪化はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
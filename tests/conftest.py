@@ -0,0 +1,35 @@
+# テストで共有するデータの作成関数（各テストから from conftest import ... で使う）
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.models import VideoData
+
+
+def api_video(i: int, views: int = 0, likes: int = 0, comments: int = 0, shares: int = 0,
+              creator: Optional[str] = None, desc: str = "", days_ago: Optional[float] = None) -> Dict[str, Any]:
+    """
+    APIレスポンス形式の動画
+
+    投稿日時は days_ago 指定時は現在からその日数前、それ以外は i ごとに1秒ずつずらした固定の日時。
+    """
+    if days_ago is None:
+        create_time = 1742400000 + i
+    else:
+        create_time = int((datetime.now() - timedelta(days=days_ago)).timestamp())
+    return {
+        "id": str(i), "desc": desc, "createTime": create_time,
+        "author": {"uniqueId": creator or f"creator_{i}", "nickname": ""},
+        "stats": {"playCount": views, "diggCount": likes, "commentCount": comments, "shareCount": shares},
+        "music": {}, "video": {"playAddr": f"https://example.com/{i}"}
+    }
+
+
+def video_data(i: int, creator: str = "creator_0", description: Optional[str] = None,
+               hashtags: Optional[str] = "#ダンス", music_title: Optional[str] = "曲") -> VideoData:
+    """保存用の動画（カウンタは i に比例）"""
+    return VideoData(
+        video_id=str(i), creator_id=creator, creator_name="クリエイター", video_url=f"https://example.com/{i}",
+        view_count=i * 1000, like_count=i * 100, comment_count=i * 10, share_count=i,
+        post_date=datetime(2025, 3, 1, i), fetch_date=datetime(2025, 3, 20),
+        description=description, music_title=music_title, music_author=None, hashtags=hashtags
+    )
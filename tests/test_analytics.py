@@ -0,0 +1,42 @@
+from app.analytics import compute_stats, group_by_creator, group_by_hashtag, summarize
+from app.models import VideoBatch
+import numpy as np
+from conftest import video_data
+
+def _batch():
+    return VideoBatch.from_videos([
+        video_data(1, "creator_a", hashtags="#ダンス #トレンド", music_title=None),
+        video_data(2, "creator_b", hashtags="#ダンス", music_title=None),
+        video_data(3, "creator_a", hashtags=None, music_title=None),
+        video_data(4, "creator_b", hashtags="#料理 #ダンス", music_title=None)
+    ])
+
+def test_summarize():
+    """要約統計量の計算のテスト"""
+    result = summarize(np.arange(1, 101, dtype=np.int64))
+    assert result["count"] == 100
+    assert result["sum"] == 5050
+    assert result["median"] == 50.5
+    assert summarize(np.zeros(0, dtype=np.int64))["count"] == 0
+
+def test_group_by_creator_and_hashtag():
+    """作成者別・ハッシュタグ別の集計のテスト（複数タグはそれぞれに計上）"""
+    batch = _batch()
+    creators = group_by_creator(batch)
+    assert [(c["creator_id"], c["videos"], c["total_views"]) for c in creators] == [
+        ("creator_b", 2, 6000), ("creator_a", 2, 4000)
+    ]
+
+    tags = {t["hashtag"]: (t["videos"], t["total_views"]) for t in group_by_hashtag(batch)}
+    assert tags == {"#ダンス": (3, 7000), "#料理": (1, 4000), "#トレンド": (1, 1000)}
+    assert group_by_hashtag(batch, limit=1)[0]["hashtag"] == "#ダンス"
+
+def test_compute_stats_legacy_keys():
+    """従来の統計キーが維持されていることのテスト"""
+    stats = compute_stats(_batch())
+    assert stats["total_videos"] == 4
+    assert stats["total_views"] == 10000
+    assert stats["total_likes"] == 1000
+    assert stats["avg_views"] == 2500
+    assert stats["overall_engagement_rate"] == (1000 + 100 + 10) / 10000
+    assert stats["counters"]["shares"]["max"] == 4
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 from app.api.client import TikTokAPIClient, APIError
@@ -62,4 +63,32 @@ class TestTikTokAPIClient:
         test_data = {"video_id": "123", "views": 1000}
         encrypted = dp.encrypt_data(str(test_data))
         decrypted = dp.decrypt_data(encrypted)
-        assert str(test_data) == decrypted 
\ No newline at end of file
+        assert str(test_data) == decrypted 
+def test_get_videos_by_ids_pages_through_all_ids(monkeypatch):
+    """FETCH_PAGE_SIZE 件を超える動画IDもページに分けてすべて取得することのテスト"""
+    import app.api.client as client_module
+
+    requested = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, ids):
+            self.ids = ids
+
+        def json(self):
+            return {"data": {"videos": [{"id": video_id, "create_time": "2025-03-20T00:00:00"} for video_id in self.ids]}}
+
+    def fake_post(url, headers, json):
+        requested.append(json["filters"]["video_ids"])
+        return FakeResponse(json["filters"]["video_ids"])
+
+    monkeypatch.setattr(client_module, "FETCH_PAGE_SIZE", 3)
+    monkeypatch.setattr(client_module.requests, "post", fake_post)
+    client = TikTokAPIClient(use_mock=False)
+    client.access_token = "token"
+
+    video_ids = [str(i) for i in range(7)]
+    videos = asyncio.run(client.get_videos_by_ids(video_ids))
+    assert requested == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+    assert [video["id"] for video in videos] == video_ids
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "scripts", "benchmark.py")
+STAGES = {"fetch_mock", "fetch_http", "normalize", "stats", "encrypt", "save", "export_csv", "export_parquet"}
+
+def _run(tmp_path, *args):
+    output = tmp_path / "result.json"
+    result = subprocess.run(
+        [sys.executable, SCRIPT, "--sizes", "200", "--repeat", "1", "--output", str(output), *args],
+        cwd=tmp_path, capture_output=True, text=True
+    )
+    return result, json.loads(output.read_text(encoding="utf-8"))
+
+def test_benchmark_records_all_stages(tmp_path):
+    """全段階の処理時間・件数/秒・最大メモリが記録され、基準値を作れることのテスト"""
+    baseline = tmp_path / "baseline.json"
+    result, data = _run(tmp_path, "--baseline", str(baseline), "--update-baseline")
+    assert result.returncode == 0, result.stderr
+    stages = data["results"]["200"]
+    assert set(stages) == STAGES
+    assert all(s["videos_per_second"] > 0 and "peak_mb" in s for s in stages.values())
+    assert json.loads(baseline.read_text(encoding="utf-8"))["results"] == data["results"]
+
+def test_benchmark_fails_on_regression(tmp_path):
+    """基準値より大きく遅い段階があれば終了コード1になることのテスト"""
+    baseline = tmp_path / "baseline.json"
+    stage = {"seconds": 1.0, "videos_per_second": 1e12, "peak_mb": 1e6}
+    baseline.write_text(json.dumps({"results": {"200": {"save": stage}}}), encoding="utf-8")
+    result, _ = _run(tmp_path, "--baseline", str(baseline), "--no-memory")
+    assert result.returncode == 1
+    assert "save (200件)" in result.stdout
@@ -0,0 +1,47 @@
+import asyncio
+import app.db
+import app.sketches
+from app.cache import SessionCache
+from app.main import refresh_data
+from conftest import api_video
+
+SETTINGS = {"type": "hashtag", "hashtag": "ダンス", "count": 4, "sort_by": "views", "min_views": 100}
+VIDEOS = [api_video(1, 500, 50), api_video(2, 300, 90), api_video(3, 900, 10), api_video(4, 200, 70)]
+
+def test_resort_and_refilter_without_fetch():
+    """条件が取得時と同じか厳しい場合はキャッシュから並び替え・絞り込みできることのテスト"""
+    cache = SessionCache()
+    cache.store(SETTINGS, VIDEOS)
+
+    by_likes = cache.lookup({**SETTINGS, "sort_by": "likes"})
+    data, batch = by_likes.view({**SETTINGS, "sort_by": "likes"})
+    assert [video["id"] for video in data] == ["2", "4", "1", "3"]
+    assert batch.column("like_count").tolist() == [90, 70, 50, 10]
+
+    stricter = {**SETTINGS, "min_views": 400, "count": 2}
+    assert [video["id"] for video in cache.lookup(stricter).view(stricter)[0]] == ["3", "1"]
+
+    # 取得時より緩い条件・多い件数は取得し直す
+    assert cache.lookup({**SETTINGS, "min_views": 50}) is None
+    assert cache.lookup({**SETTINGS, "count": 10}) is None
+    assert cache.lookup({**SETTINGS, "hashtag": "料理"}) is None
+
+def test_refresh_saves_only_new_and_changed(monkeypatch):
+    """更新時に新しい動画と内容が変わった動画だけを保存することのテスト"""
+    saved = []
+    monkeypatch.setattr(app.db, "save_video_data", lambda batch: saved.extend(batch.column("video_id").tolist()))
+    monkeypatch.setattr(app.sketches, "record_trending", lambda batch: None)
+
+    class FakeClient:
+        async def fetch_videos(self, settings):
+            assert settings["min_views"] == 100 and settings["count"] == 4
+            return [api_video(1, 500, 50), api_video(2, 350, 90), api_video(5, 800)]
+
+    cache = SessionCache()
+    cache.store(SETTINGS, VIDEOS)
+    updated = asyncio.run(refresh_data(FakeClient(), cache, SETTINGS))
+
+    assert updated == 2
+    assert sorted(saved) == ["2", "5"]
+    data, _ = cache.get(SETTINGS).view(SETTINGS)
+    assert [video["id"] for video in data] == ["3", "5", "1", "2"]
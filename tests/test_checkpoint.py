@@ -0,0 +1,90 @@
+import asyncio
+import os
+import app.jobs as jobs
+from app.api.client import TikTokAPIClient
+from app.checkpoint import CrawlCheckpoint
+from app.filters import VideoFilter
+from app.jobs import Job, run_jobs
+from app.models import VideoBatch
+from conftest import api_video
+
+def test_fetch_until_resumes_from_cursor(tmp_path):
+    """中断したページングを記録済みのカーソルから再開することのテスト"""
+    directory = str(tmp_path)
+    client = TikTokAPIClient(use_mock=True)
+    requested = []
+
+    def request_page(cursor):
+        requested.append(cursor)
+        if cursor == 2 and requested.count(2) == 1:
+            raise ConnectionError("接続が切れました")
+        page = cursor or 0
+        return [api_video(page * 10 + i, views=page * 10 + i) for i in range(10)], page + 1, page < 2
+
+    checkpoint = CrawlCheckpoint.open({"query": "test"}, directory=directory)
+    try:
+        asyncio.run(client._fetch_until(request_page, VideoFilter(), 100, progress=checkpoint.progress("main")))
+    except ConnectionError:
+        pass
+
+    resumed = CrawlCheckpoint.open({"query": "test"}, resume=True, directory=directory)
+    videos = asyncio.run(client._fetch_until(request_page, VideoFilter(), 100, progress=resumed.progress("main")))
+    assert requested == [None, 1, 2, 2]
+    assert [video["id"] for video in videos] == [str(i) for i in range(30)]
+    # 条件が異なる場合は最初から
+    assert CrawlCheckpoint.open({"query": "other"}, resume=True, directory=directory).items == {}
+    # 別の条件で開いても元の条件のチェックポイントは残る
+    assert CrawlCheckpoint.open({"query": "test"}, resume=True, directory=directory).progress("main").exhausted
+
+def test_run_jobs_resume_skips_completed(monkeypatch, tmp_path):
+    """再開時に完了済みのジョブを取得し直さず、未保存のデータは取得せずに保存することのテスト"""
+    directory = str(tmp_path)
+    fetched, saved = [], []
+    failures = [RuntimeError("保存失敗")]
+
+    async def fake_get_videos(api_client, mode, search_term, **kwargs):
+        fetched.append(search_term)
+        return [api_video(len(fetched), views=len(fetched))]
+
+    def fake_save(batch):
+        # 最初の保存のみ失敗させる
+        if failures:
+            raise failures.pop()
+        saved.append(len(batch))
+
+    monkeypatch.setattr(jobs, "get_videos_by_mode", fake_get_videos)
+    monkeypatch.setattr(jobs, "save_video_data", fake_save)
+    monkeypatch.setattr(jobs, "prepare_batch", lambda videos: VideoBatch.from_api_responses(videos))
+    monkeypatch.setattr(jobs, "record_trending", lambda batch: None)
+    job_list = [Job(type="hashtag", query="a"), Job(type="hashtag", query="b")]
+
+    first = asyncio.run(run_jobs(job_list, concurrency=1, use_mock=True, checkpoint_dir=directory))
+    assert first["failed"] == 1
+    assert len(os.listdir(directory)) == 1
+
+    second = asyncio.run(run_jobs(job_list, concurrency=1, use_mock=True, resume=True, checkpoint_dir=directory))
+    assert fetched == ["a", "b"]
+    assert saved == [1, 1]
+    assert second["skipped"] == 1 and second["failed"] == 0
+    assert os.listdir(directory) == []
+
+def test_checkpoint_appends_pages_and_ignores_torn_line(tmp_path):
+    """ページごとに追記し、書き込み途中で中断した最後の行は読み飛ばすことのテスト"""
+    directory = str(tmp_path)
+    checkpoint = CrawlCheckpoint.open({"query": "append"}, directory=directory)
+    progress = checkpoint.progress("main")
+    progress.record_page(1, [api_video(1, views=1)])
+    progress.record_page(2, [api_video(2, views=2)])
+    with open(checkpoint.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"key": "main", "page": {"cur')
+
+    resumed = CrawlCheckpoint.open({"query": "append"}, resume=True, directory=directory).progress("main")
+    assert (resumed.cursor, resumed.pages) == (2, 2)
+    assert [video["id"] for video in resumed.videos] == ["1", "2"]
+    # 切り詰めた後に追記した行も読める
+    resumed.record_page(3, [api_video(3, views=3)])
+    again = CrawlCheckpoint.open({"query": "append"}, resume=True, directory=directory).progress("main")
+    assert [video["id"] for video in again.videos] == ["1", "2", "3"]
+    assert [name for name in os.listdir(directory) if name.endswith(".tmp")] == []
@@ -0,0 +1,32 @@
+from app.api.mock import load_mock_data
+from app.executor import StageExecutor, batch_from_buffer, batch_to_buffer, serialize_csv_rows
+from app.models import VIDEO_FIELDS, VideoBatch
+
+def _records(batch):
+    return [{k: v for k, v in record.items() if k != "fetch_date"} for record in batch.to_records()]
+
+def test_buffer_round_trip():
+    """Arrow のバッファを経由しても値（欠損値を含む）が変わらないことのテスト"""
+    batch = VideoBatch.from_api_responses(load_mock_data())
+    records = batch.to_records()
+    records[0]["music_title"] = None
+    batch = VideoBatch.from_records(records)
+
+    restored = batch_from_buffer(batch_to_buffer(batch))
+    assert restored.to_records() == records
+    assert restored.column("post_date").dtype == batch.column("post_date").dtype
+
+def test_process_pool_matches_inline():
+    """プロセスプールでの変換・CSV出力が1プロセスでの処理と一致することのテスト"""
+    data = load_mock_data()
+    executor = StageExecutor(workers=2, threshold=10, chunk_size=7)
+    try:
+        assert executor.is_parallel(len(data))
+        batch = executor.convert(data)
+        expected = VideoBatch.from_api_responses(data)
+        assert _records(batch) == _records(expected)
+
+        csv_bytes = b"".join(executor.serialize_csv(batch, VIDEO_FIELDS))
+        assert csv_bytes == serialize_csv_rows(batch, VIDEO_FIELDS)
+    finally:
+        executor.close()
@@ -0,0 +1,175 @@
+import csv
+from datetime import datetime
+from app.export import export_incremental, export_stream_to_csv, export_to_parquet
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+def test_export_stream_to_csv(tmp_path):
+    """チャンク単位のCSV出力のテスト"""
+    def chunks():
+        for start in range(0, 25, 10):
+            yield [
+                {"video_id": str(i), "view_count": i * 100, "fetch_date": datetime(2025, 3, 20)}
+                for i in range(start, min(start + 10, 25))
+            ]
+
+    path = tmp_path / "videos.csv"
+    assert export_stream_to_csv(chunks(), str(path)) == 25
+
+    rows = _read_csv(path)
+    assert len(rows) == 25
+    assert rows[0] == {"video_id": "0", "view_count": "0", "fetch_date": "2025-03-20 00:00:00"}
+    assert rows[-1]["view_count"] == "2400"
+
+def test_export_stream_to_csv_columns(tmp_path):
+    """列指定のテスト"""
+    path = tmp_path / "videos.csv"
+    export_stream_to_csv([[{"video_id": "1", "view_count": 10, "description": "x"}]], str(path), columns=["video_id"])
+    assert _read_csv(path) == [{"video_id": "1"}]
+
+def _video_rows(start, stop):
+    return [
+        {
+            "video_id": str(i),
+            "view_count": i * 100,
+            "fetch_date": datetime(2025, 3, 20 + i % 2),
+            "hashtags": "#ダンス #流行" if i % 3 else "",
+        }
+        for i in range(start, stop)
+    ]
+
+def test_export_to_parquet_row_groups(tmp_path):
+    """Parquet出力の行グループ・列指定のテスト"""
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "videos.parquet"
+    chunks = [_video_rows(0, 30), _video_rows(30, 60), _video_rows(60, 70)]
+    total = export_to_parquet(chunks, str(path), columns=["video_id", "view_count"], row_group_size=25)
+    assert total == 70
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.schema_arrow.names == ["video_id", "view_count"]
+    assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [25, 25, 20]
+    assert parquet_file.read()["view_count"].to_pylist() == [i * 100 for i in range(70)]
+
+def test_export_to_parquet_partitioned(tmp_path):
+    """日付・ハッシュタグでのパーティション出力のテスト"""
+    import pyarrow.dataset as ds
+
+    path = tmp_path / "videos"
+    total = export_to_parquet([_video_rows(0, 12)], str(path), columns=["video_id"], partition_by=["fetch_date", "hashtag"])
+    assert total == 12
+
+    table = ds.dataset(str(path), format="parquet", partitioning="hive").to_table()
+    assert table.num_rows == 12
+    assert sorted(set(table["fetch_day"].to_pylist())) == ["2025-03-20", "2025-03-21"]
+    assert "ダンス" in table["hashtag"].to_pylist()
+
+def test_partition_hashtag_matches_extracted_hashtags():
+    """パーティションのハッシュタグが全角＃を含めて抽出結果と同じで、後ろの記号を含まないことのテスト"""
+    import pyarrow as pa
+    from app.export import _add_partition_columns
+
+    table = pa.table({"hashtags": ["＃ダンス #流行", "#foo, #bar", None, "", "#猫", "＃ダンス #流行"]})
+    tags = _add_partition_columns(table, ["hashtag"])["hashtag"].to_pylist()
+    assert tags == ["ダンス", "foo", None, None, "猫", "ダンス"]
+
+def test_export_incremental(tmp_path, monkeypatch):
+    """ウォーターマークによる差分エクスポートのテスト"""
+    import app.db
+
+    rows = [{"id": i, "video_id": str(i), "fetch_date": datetime(2025, 3, 20, i)} for i in range(1, 6)]
+    watermarks = {}
+
+    def iter_changed_videos(since_fetch_date=None, since_id=0, chunk_size=2, until=None):
+        changed = [
+            r for r in rows
+            if (since_fetch_date is None or (r["fetch_date"], r["id"]) > (since_fetch_date, since_id))
+            and (until is None or r["fetch_date"] < until)
+        ]
+        for start in range(0, len(changed), 2):
+            yield changed[start:start + 2]
+
+    monkeypatch.setattr(app.db, "iter_changed_videos", iter_changed_videos)
+    monkeypatch.setattr(app.db, "get_export_watermark", watermarks.get)
+    monkeypatch.setattr(
+        app.db, "save_export_watermark",
+        lambda target, fetch_date, last_id: watermarks.update({target: {"last_fetch_date": fetch_date, "last_id": last_id}})
+    )
+
+    first = export_incremental("nightly", str(tmp_path))
+    assert len(_read_csv(first)) == 5
+    assert watermarks["nightly"] == {"last_fetch_date": datetime(2025, 3, 20, 5), "last_id": 5}
+
+    # 変更がなければファイルは作られない
+    assert export_incremental("nightly", str(tmp_path)) is None
+
+    rows.append({"id": 2, "video_id": "2", "fetch_date": datetime(2025, 3, 20, 6)})
+    second = export_incremental("nightly", str(tmp_path), export_format="parquet")
+    import pyarrow.parquet as pq
+    assert pq.read_table(second)["video_id"].to_pylist() == ["2"]
+
+    # 直近の行は遅れてコミットされる行を取りこぼさないよう次回に回し、ウォーターマークも進めない
+    rows.append({"id": 7, "video_id": "7", "fetch_date": datetime.now()})
+    assert export_incremental("nightly", str(tmp_path)) is None
+    assert watermarks["nightly"]["last_fetch_date"] == datetime(2025, 3, 20, 6)
+    assert export_incremental("nightly", str(tmp_path), lag_seconds=-60) is not None
+
+def test_export_stream_to_csv_gzip(tmp_path, monkeypatch):
+    """並列gzip圧縮出力のテスト（複数メンバーでも通常のCSVと同じ内容に展開できる）"""
+    import gzip
+    import app.export
+
+    # 小さなブロックで複数のgzipメンバーに分割させる
+    monkeypatch.setattr(app.export, "EXPORT_COMPRESSION_BLOCK_SIZE", 256)
+    monkeypatch.setattr(app.export, "EXPORT_SERIALIZE_ROWS", 7)
+
+    chunks = [_video_rows(0, 40), _video_rows(40, 100)]
+    plain = tmp_path / "videos.csv"
+    compressed = tmp_path / "videos.csv.gz"
+    export_stream_to_csv(chunks, str(plain))
+    assert export_stream_to_csv(chunks, str(compressed), compression="gzip") == 100
+
+    raw = compressed.read_bytes()
+    assert raw.count(b"\x1f\x8b\x08") > 1
+    assert gzip.decompress(raw) == plain.read_bytes()
+
+def test_setup_database_adds_missing_fetch_date_index(monkeypatch):
+    """既存の videos テーブルに取得日時のインデックスがなければ作成し、あれば作成しないことのテスト"""
+    import app.db
+
+    class FakeCursor:
+        def __init__(self, existing):
+            self.existing = existing
+            self.queries = []
+
+        def execute(self, query, params=()):
+            self.queries.append(" ".join(query.split()))
+            self.params = params
+
+        def fetchone(self):
+            return (1 if self.params in self.existing else 0,)
+
+        def close(self):
+            pass
+
+    class FakeConnection:
+        def __init__(self, cursor):
+            self._cursor = cursor
+
+        def cursor(self):
+            return self._cursor
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    for existing, created in [(set(), True), ({("videos", "idx_fetch_date")}, False)]:
+        cursor = FakeCursor(existing)
+        monkeypatch.setattr(app.db, "get_connection", lambda: FakeConnection(cursor))
+        app.db.setup_database()
+        assert ("CREATE INDEX idx_fetch_date ON videos (fetch_date)" in cursor.queries) == created
@@ -0,0 +1,63 @@
+import asyncio
+from app.api.client import TikTokAPIClient
+from app.api.mock import MockVideoStore
+from app.db import _build_search_clause
+from app.filters import VideoFilter
+from app.models import VideoBatch
+from conftest import api_video
+
+VIDEOS = [
+    api_video(0, 5000, 100, days_ago=1, desc="#猫 #かわいい"),
+    api_video(1, 500, 100, days_ago=1, desc="#猫"),
+    api_video(2, 8000, 10, days_ago=1, desc="#猫"),
+    api_video(3, 9000, 900, days_ago=20, desc="#猫"),
+    api_video(4, 7000, 700, days_ago=2, desc="#犬")
+]
+
+def test_filter_matches_and_mask():
+    """APIレスポンスとVideoBatchで同じ条件が適用されることのテスト"""
+    video_filter = VideoFilter(min_views=1000, min_likes=50, days_ago=7)
+    assert [v["id"] for v in video_filter.apply(VIDEOS)] == ["0", "4"]
+    batch = VideoBatch.from_api_responses(VIDEOS)
+    assert batch.column("video_id")[video_filter.mask(batch)].tolist() == ["0", "4"]
+
+def test_filter_to_sql():
+    """絞り込み条件がWHERE句に変換されることのテスト"""
+    where, params = _build_search_clause("猫", VideoFilter(min_views=1000, min_likes=10))
+    assert where == "WHERE (creator_id LIKE %s OR hashtags LIKE %s) AND view_count >= %s AND like_count >= %s"
+    assert params == ["%猫%", "%猫%", 1000, 10]
+    assert _build_search_clause(None, VideoFilter()) == ("", [])
+
+def test_mock_store_query():
+    """モックのインデックスでハッシュタグと範囲条件を絞り込むテスト"""
+    store = MockVideoStore(VIDEOS)
+    result = store.query(VideoFilter(min_views=1000, days_ago=7), "猫")
+    assert [v["id"] for v in result] == ["0", "2"]
+    assert [v["id"] for v in store.query(VideoFilter(min_likes=500))] == ["3", "4"]
+
+def test_fetch_until_pages():
+    """条件に合う件数がそろうまでページを取得することのテスト"""
+    pages = {None: (VIDEOS[:2], "a", True), "a": (VIDEOS[2:4], "b", True), "b": (VIDEOS[4:], None, False)}
+    requested = []
+
+    def request_page(cursor):
+        requested.append(cursor)
+        return pages[cursor]
+
+    client = TikTokAPIClient()
+    video_filter = VideoFilter(min_views=1000, min_likes=50)
+    result = asyncio.run(client._fetch_until(request_page, video_filter, 2))
+    assert [v["id"] for v in result] == ["0", "3"]
+    assert requested == [None, "a"]
+
+    requested.clear()
+    result = asyncio.run(client._fetch_until(request_page, video_filter, 10, max_pages=2))
+    assert len(result) == 2 and requested == [None, "a"]
+
+def test_mock_trending_fills_count_with_pushed_down_filter():
+    """モックのトレンド取得でも、絞り込み条件を満たす動画が要求件数そろうことのテスト"""
+    from app.api.mock import get_mock_trending_videos
+    for video_filter in (VideoFilter(min_likes=200000), VideoFilter(min_views=800000, min_likes=150000)):
+        videos = get_mock_trending_videos(count=20, video_filter=video_filter)
+        assert len(videos) == 20
+        assert len(video_filter.apply(videos)) == 20
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+import app.jobs as jobs
+from app.api.rate_limiter import RateLimiter
+from app.jobs import Job, load_jobs, run_jobs
+from app.models import VideoBatch
+
+def test_load_jobs_yaml_and_jsonl(tmp_path):
+    """YAML（共通設定つき）とJSONLのジョブファイルの読み込みのテスト"""
+    yaml_path = tmp_path / "jobs.yaml"
+    yaml_path.write_text(
+        "defaults: {count: 50, min_views: 1000}\n"
+        "jobs:\n"
+        "  - {type: hashtag, query: ダンス}\n"
+        "  - {type: video, ids: ['123'], count: 1}\n",
+        encoding="utf-8"
+    )
+    loaded = load_jobs(str(yaml_path))
+    assert loaded == [
+        Job(type="hashtag", query="ダンス", count=50, min_views=1000),
+        Job(type="video", ids=["123"], count=1, min_views=1000)
+    ]
+
+    jsonl_path = tmp_path / "jobs.jsonl"
+    jsonl_path.write_text(json.dumps({"type": "user", "query": "creator_1"}) + "\n\n", encoding="utf-8")
+    assert load_jobs(str(jsonl_path)) == [Job(type="user", query="creator_1")]
+
+    with pytest.raises(ValueError):
+        Job.from_dict({"type": "hashtag"})
+
+def test_rate_limiter_waits_for_next_window():
+    """上限に達したら次のウィンドウまで待機することのテスト"""
+    limiter = RateLimiter(limit=2, window=0.2)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+def test_run_jobs_bounded_concurrency(monkeypatch, tmp_path):
+    """同時実行数の上限と、失敗したジョブの記録のテスト"""
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def fake_run_job(api_client, rate_limiter, job, progress=None):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        if job.query == "error":
+            raise RuntimeError("取得失敗")
+        return VideoBatch.empty()
+
+    monkeypatch.setattr(jobs, "_run_job", fake_run_job)
+    monkeypatch.setattr(jobs, "record_trending", lambda batch: None)
+    job_list = [Job(type="hashtag", query=str(i)) for i in range(9)] + [Job(type="hashtag", query="error")]
+    summary = asyncio.run(run_jobs(
+        job_list, concurrency=3, use_mock=True, checkpoint_dir=str(tmp_path)
+    ))
+
+    assert peak == 3
+    assert summary["jobs"] == 10
+    assert summary["failed"] == 1
+    assert summary["errors"] == {"hashtag:error": "取得失敗"}
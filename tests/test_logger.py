@@ -0,0 +1,95 @@
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+import app.logger as app_logger
+from app.logger import SampledLogger, setup_logging, stop_logging
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def recorded():
+    logger = logging.getLogger("test_sampled")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    yield logger, handler.messages
+    logger.removeHandler(handler)
+
+
+def test_sampled_logger_limits_and_reports_suppressed(recorded):
+    """時間あたりの出力数を超えたログは省略され、次のログに省略した件数が添えられることのテスト"""
+    logger, messages = recorded
+    sampled = SampledLogger(logger, rate=2, interval=60)
+    for i in range(5):
+        sampled.warning("保存エラー: %s", i)
+    assert messages == ["保存エラー: 0", "保存エラー: 1"]
+
+    sampled._window_end = 0.0  # 次の時間枠に進める
+    sampled.warning("保存エラー: %s", 5)
+    assert messages[-1] == "保存エラー: 5（同種のログ 3件を省略）"
+
+
+def test_sampled_logger_skips_disabled_levels(recorded):
+    """出力しないレベルのログは件数にも数えないことのテスト"""
+    logger, messages = recorded
+    sampled = SampledLogger(logger, rate=1, interval=60)
+    for _ in range(100):
+        sampled.debug("行ごとの詳細")
+    sampled.info("取得しました")
+    assert messages == ["取得しました"]
+
+
+def test_setup_logging_writes_through_queue(tmp_path):
+    """ルートロガーはキューに積むだけで、ファイルへの書き込みは出力スレッドが行うことのテスト"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    log_file = tmp_path / "app.log"
+    try:
+        setup_logging(level="INFO", log_file=str(log_file), console=False)
+        assert [type(h) for h in root.handlers] == [QueueHandler]
+        assert setup_logging() is app_logger._listener
+        logging.getLogger("app.test").info("キュー経由のログ")
+        stop_logging()
+        assert "キュー経由のログ" in log_file.read_text(encoding="utf-8")
+    finally:
+        stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+
+def test_mock_video_logs_are_limited_per_event(monkeypatch):
+    """多く発生する種類のログが、別の種類のログの出力枠を使い切らないことのテスト"""
+    import app.api.mock as mock
+
+    logger = logging.getLogger("app.api.mock")
+    handler = RecordingHandler()
+    saved_level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    monkeypatch.setattr(mock, "load_mock_data", lambda: [{"id": "1", "video": {}}])
+    try:
+        for name in ("_lookup_log", "_found_by_id_log", "_not_found_log"):
+            monkeypatch.setattr(mock, name, SampledLogger(logger, rate=2, interval=60))
+        for _ in range(5):
+            mock.get_mock_video_by_id("1")
+        mock.get_mock_video_by_id("missing")
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(saved_level)
+
+    assert handler.messages.count("動画ID: 1 の動画を取得しました") == 2
+    assert handler.messages[-1] == "動画ID/URL: missing の動画は見つかりませんでした"
@@ -0,0 +1,78 @@
+import numpy as np
+from app.models import VideoBatch, VideoData
+from conftest import video_data
+
+def test_video_data_slots():
+    """VideoDataがインスタンス辞書を持たないことのテスト"""
+    video = video_data(1)
+    assert not hasattr(video, "__dict__")
+    assert video.to_dict()["view_count"] == 1000
+
+def test_video_batch_round_trip():
+    """VideoBatchとVideoDataの相互変換のテスト"""
+    videos = [video_data(i, creator=f"creator_{i % 2}", description="説明" if i % 2 else None) for i in range(5)]
+    batch = VideoBatch.from_videos(videos)
+
+    assert len(batch) == 5
+    assert batch.column("view_count").dtype == np.int64
+    assert batch.column("post_date").dtype == np.dtype("datetime64[us]")
+    codes, categories = batch.codes("creator_id")
+    assert list(categories) == ["creator_0", "creator_1"]
+    assert batch.to_videos() == videos
+    assert VideoBatch.from_records(batch.to_records()).to_videos() == videos
+
+def test_video_batch_take_and_concat():
+    """行の抽出・連結のテスト"""
+    batch = VideoBatch.from_videos([video_data(i) for i in range(4)])
+    picked = batch.take([3, 1])
+    assert picked.column("video_id").tolist() == ["3", "1"]
+
+    merged = VideoBatch.concat([batch, picked])
+    assert len(merged) == 6
+    assert merged.column("like_count").tolist() == [0, 100, 200, 300, 300, 100]
+    assert merged.to_arrow().num_rows == 6
+
+def test_video_batch_concat_merges_dictionaries():
+    """連結時に文字列列の辞書が合わせられ、同じ値が1つのコードになることのテスト（欠損値は -1 のまま）"""
+    left = VideoBatch.from_videos([video_data(i, creator=f"creator_{i % 2}", description="説明" if i else None) for i in range(3)])
+    right = VideoBatch.from_videos([video_data(i, creator=f"creator_{i}", description=None) for i in range(1, 4)])
+    merged = VideoBatch.concat([left, right])
+
+    codes, categories = merged.codes("creator_id")
+    assert list(categories) == ["creator_0", "creator_1", "creator_2", "creator_3"]
+    assert codes.tolist() == [0, 1, 0, 1, 2, 3]
+    assert merged.codes("description")[0].tolist() == [-1, 0, 0, -1, -1, -1]
+    assert merged.to_videos() == left.to_videos() + right.to_videos()
+
+def test_extract_hashtags():
+    """ハッシュタグ抽出のテスト（日本語・本文に続くタグ・全角＃）"""
+    from app.models import extract_hashtags
+    assert extract_hashtags("モックデータ説明文 #ダンス #流行") == "#ダンス #流行"
+    assert extract_hashtags("今日のごはん#簡単料理！＃時短レシピ") == "#簡単料理 #時短レシピ"
+    assert extract_hashtags(None) == ""
+
+def test_from_api_responses():
+    """APIレスポンスの一括変換のテスト"""
+    from app.api.mock import load_mock_data
+    data = load_mock_data()
+    videos = VideoData.from_api_responses(data)
+
+    assert len(videos) == len(data)
+    assert len({v.fetch_date for v in videos}) == 1
+    for video, item in zip(videos, data):
+        expected = VideoData.from_api_response(item)
+        expected.fetch_date = video.fetch_date
+        assert video == expected
+
+    batch = VideoBatch.from_api_responses(data)
+    assert batch.column("view_count").tolist() == [v["stats"]["playCount"] for v in data]
+
+def test_from_api_responses_process_pool(monkeypatch):
+    """プロセスプールでの並列変換のテスト"""
+    import app.models
+    from app.api.mock import load_mock_data
+    monkeypatch.setattr(app.models, "CONVERT_CHUNK_SIZE", 7)
+
+    data = load_mock_data()
+    batch = VideoBatch.from_api_responses(data, workers=2)
+    assert batch.column("video_id").tolist() == [v["id"] for v in data]
@@ -0,0 +1,39 @@
+import pytest
+from app.ui.pager import ResultPager
+from conftest import api_video
+
+VIDEOS = [api_video(i, views, i, creator=f"creator_{i % 3}", desc="#ダンス" if i % 2 else "#料理") for i, views in enumerate([5, 9, 1, 7, 3, 8, 2])]
+
+def _creators(pager):
+    return [row[1] for row in pager.page_rows()]
+
+def test_pages_format_only_visible_rows():
+    """ページごとに表示する行だけを整形し、移動できることのテスト"""
+    pager = ResultPager(VIDEOS, columns=["再生数", "作成者"], page_size=3)
+    assert pager.page_count == 3
+    assert pager.page_rows() == [["5", "creator_0"], ["9", "creator_1"], ["1", "creator_2"]]
+
+    pager.handle("g 3")
+    assert pager.page_rows() == [["2", "creator_0"]]
+    assert pager.handle("n") is False  # 最後のページで次へ進むと終了
+    pager.handle("p")
+    assert pager.page == 1
+
+def test_sort_and_filter_compose():
+    """並び替えと絞り込みを組み合わせられることのテスト"""
+    pager = ResultPager(VIDEOS, columns=["再生数", "作成者"], page_size=10)
+    pager.handle("s views")
+    assert [row[0] for row in pager.page_rows()] == ["9", "8", "7", "5", "3", "2", "1"]
+
+    pager.handle("f ダンス")
+    assert [row[0] for row in pager.page_rows()] == ["9", "8", "7"]
+    pager.handle("s views asc")
+    assert [row[0] for row in pager.page_rows()] == ["7", "8", "9"]
+
+    pager.handle("f creator_0")
+    assert _creators(pager) == ["creator_0", "creator_0", "creator_0"]
+    pager.handle("f")
+    assert len(pager.view) == len(VIDEOS)
+
+    with pytest.raises(ValueError):
+        pager.sort("unknown")
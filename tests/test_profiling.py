@@ -0,0 +1,79 @@
+import threading
+import time
+import tracemalloc
+
+import app.profiling as profiling
+from app.profiling import Profiler, span
+
+
+def test_span_is_noop_when_disabled():
+    """無効時は共有の何もしない区間を返すことのテスト"""
+    assert profiling.get_profiler() is None
+    assert span("a") is span("b")
+    with span("a"):
+        pass
+
+
+def test_nested_spans_record_paths_and_self_time():
+    """入れ子の区間が呼び出し経路ごとに集計され、自身の時間から内側の時間が除かれることのテスト"""
+    profiler = Profiler(trace_memory=False)
+    for _ in range(2):
+        with profiler.span("fetch"):
+            with profiler.span("api.request"):
+                time.sleep(0.01)
+            with profiler.span("api.parse"):
+                pass
+
+    assert set(profiler.stats) == {("fetch",), ("fetch", "api.request"), ("fetch", "api.parse")}
+    fetch = profiler.stats[("fetch",)]
+    request = profiler.stats[("fetch", "api.request")]
+    assert fetch.count == 2 and request.count == 2
+    assert request.wall >= 0.02
+    assert fetch.self_wall < fetch.wall - request.wall + 1e-6
+    assert "fetch;api.request" in " ".join(profiler.folded())
+    assert "fetch > api.request" in profiler.summary()
+
+
+def test_spans_are_tracked_per_thread():
+    """別スレッドの区間は呼び出し元の区間の内側として扱わないことのテスト"""
+    profiler = Profiler(trace_memory=False)
+
+    def worker():
+        with profiler.span("db.write"):
+            pass
+
+    with profiler.span("job"):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert set(profiler.stats) == {("job",), ("db.write",)}
+
+
+def test_memory_is_traced():
+    """tracemalloc で区間内の最大確保量が記録されることのテスト"""
+    was_tracing = tracemalloc.is_tracing()
+    profiler = Profiler(trace_memory=True)
+    try:
+        with profiler.span("outer"):
+            with profiler.span("normalize"):
+                data = [bytes(1024) for _ in range(1000)]
+                del data
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    assert profiler.stats[("outer", "normalize")].peak >= 1000 * 1024
+    assert profiler.stats[("outer",)].peak >= profiler.stats[("outer", "normalize")].peak
+
+
+def test_write_report(tmp_path):
+    """折りたたみ形式と集計表のファイルが書き出されることのテスト"""
+    profiler = Profiler(trace_memory=False)
+    with profiler.span("save"):
+        time.sleep(0.001)
+    base = profiler.write_report(str(tmp_path))
+
+    folded = open(f"{base}.folded", encoding="utf-8").read().split()
+    assert folded[0] == "save" and int(folded[1]) > 0
+    assert "save" in open(f"{base}.txt", encoding="utf-8").read()
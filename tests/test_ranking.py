@@ -0,0 +1,31 @@
+import numpy as np
+from app.models import VideoBatch
+from app.ranking import rank_videos, top_k_indices
+from conftest import api_video
+
+def test_top_k_matches_full_sort():
+    """上位k件の選択が全件ソートの結果と一致することのテスト（同順位は元の順序）"""
+    rng = np.random.default_rng(0)
+    primary = rng.integers(0, 50, 10000)
+    secondary = rng.integers(0, 50, 10000)
+    expected = sorted(range(10000), key=lambda i: (-primary[i], -secondary[i], i))[:100]
+    assert top_k_indices([primary, secondary], 100).tolist() == expected
+    assert top_k_indices([primary], 0).tolist() == []
+
+def test_rank_videos_keys():
+    """単一キー・複数キー・派生指標での並び替えのテスト"""
+    videos = [api_video(0, 1000, 10), api_video(1, 500, 50, 50), api_video(2, 1000, 30), api_video(3, 0, 0)]
+
+    assert [v["id"] for v in rank_videos(videos, "views", 2)] == ["0", "2"]
+    assert [v["id"] for v in rank_videos(videos, ["views", "likes"])] == ["2", "0", "1", "3"]
+    assert [v["id"] for v in rank_videos(videos, "engagement_rate", 1)] == ["1"]
+    assert [v["id"] for v in rank_videos(videos, "date", 2)] == ["3", "2"]
+    # 未対応のキーは元の順序のまま件数だけ絞り込む
+    assert [v["id"] for v in rank_videos(videos, "unknown", 3)] == ["0", "1", "2"]
+
+def test_rank_video_batch():
+    """VideoBatchを並び替えた場合もVideoBatchが返ることのテスト"""
+    batch = VideoBatch.from_api_responses([api_video(i, views, 0) for i, views in enumerate([5, 9, 1, 7])])
+    ranked = rank_videos(batch, "views", 3)
+    assert isinstance(ranked, VideoBatch)
+    assert ranked.column("video_id").tolist() == ["1", "3", "0"]
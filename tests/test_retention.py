@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+import app.retention as retention
+from app.retention import drop_expired_partitions, purge_expired_rows, purge_expired_snapshots, run_retention
+
+CUTOFF = datetime(2025, 3, 1)
+OLD = CUTOFF - timedelta(days=1)
+NEW = CUTOFF + timedelta(days=1)
+
+class FakeDatabase:
+    """videos・video_snapshots・パーティション情報を持つ、実行したSQLを記録するデータベース"""
+
+    def __init__(self, videos, snapshots=(), partitions=()):
+        self.videos = dict(videos)
+        self.snapshots = list(snapshots)
+        self.partitions = list(partitions)
+        self.archive = {}
+        self.queries = []
+        self.commits = 0
+        # SELECT の直後に呼ばれる（選択後の再取得を再現する）
+        self.after_select = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        db = self.db
+        query = " ".join(query.split())
+        db.queries.append((query, tuple(params)))
+        if "information_schema.PARTITIONS" in query:
+            self.result = db.partitions
+        elif query.startswith("SELECT TO_DAYS"):
+            self.result = [(params[0].toordinal() + 365,)]
+        elif query.startswith("SELECT id FROM videos"):
+            last_id, cutoff, limit = params
+            ids = sorted(i for i, fetched in db.videos.items() if i > last_id and fetched < cutoff)[:limit]
+            self.result = [(i,) for i in ids]
+            if db.after_select:
+                db.after_select(ids)
+        elif query.startswith("REPLACE INTO videos_archive"):
+            db.archive.update({i: db.videos[i] for i in params if i in db.videos})
+        elif query.startswith("DELETE FROM videos WHERE id IN"):
+            *ids, cutoff = params
+            deleted = [i for i in ids if i in db.videos and db.videos[i] < cutoff]
+            for i in deleted:
+                del db.videos[i]
+            self.rowcount = len(deleted)
+        elif query.startswith("SELECT COUNT(*) FROM video_snapshots"):
+            self.result = [(sum(1 for fetched in db.snapshots if fetched < params[0]),)]
+        elif query.startswith("DELETE FROM video_snapshots"):
+            cutoff, limit = params
+            expired = [fetched for fetched in db.snapshots if fetched < cutoff][:limit]
+            for fetched in expired:
+                db.snapshots.remove(fetched)
+            self.rowcount = len(expired)
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+    def close(self):
+        pass
+
+def _use(monkeypatch, db):
+    monkeypatch.setattr(retention, "get_connection", lambda: db)
+    return db
+
+def test_purge_expired_rows_in_keyset_batches(monkeypatch):
+    """期限切れの行を前回の最終IDから続けてバッチごとに削除・コミットすることのテスト"""
+    db = _use(monkeypatch, FakeDatabase({i: OLD if i % 2 else NEW for i in range(1, 12)}))
+    assert purge_expired_rows(CUTOFF, batch_size=2, pause=0) == 6
+
+    assert sorted(db.videos) == [2, 4, 6, 8, 10]
+    selects = [params for query, params in db.queries if query.startswith("SELECT id FROM videos")]
+    assert [last_id for last_id, _, _ in selects] == [0, 3, 7, 11]
+    assert db.commits == 3
+
+def test_purge_expired_rows_rechecks_fetch_date(monkeypatch):
+    """選択後に再取得された行は削除しないことのテスト"""
+    db = _use(monkeypatch, FakeDatabase({1: OLD, 2: OLD, 3: OLD}))
+
+    def refetch(ids):
+        if 2 in ids:
+            db.videos[2] = NEW
+
+    db.after_select = refetch
+    assert purge_expired_rows(CUTOFF, batch_size=10, pause=0) == 2
+    assert db.videos == {2: NEW}
+    delete = next(query for query, _ in db.queries if query.startswith("DELETE FROM videos"))
+    assert delete.endswith("AND fetch_date < %s")
+
+def test_purge_expired_rows_archives_before_delete(monkeypatch):
+    """アーカイブ指定時は削除前にアーカイブテーブルへ退避することのテスト"""
+    db = _use(monkeypatch, FakeDatabase({1: OLD, 2: NEW, 3: OLD}))
+    assert purge_expired_rows(CUTOFF, batch_size=10, archive=True, pause=0) == 2
+
+    assert db.archive == {1: OLD, 3: OLD}
+    assert db.videos == {2: NEW}
+    statements = [query.split(" (")[0].split(" WHERE")[0] for query, _ in db.queries]
+    assert statements.index("REPLACE INTO videos_archive SELECT * FROM videos") < statements.index("DELETE FROM videos")
+    assert statements[0] == "CREATE TABLE IF NOT EXISTS videos_archive LIKE videos"
+
+def test_purge_dry_run_does_not_delete(monkeypatch):
+    """dry_run では対象件数を数えるだけで削除しないことのテスト"""
+    db = _use(monkeypatch, FakeDatabase({1: OLD, 2: OLD}, snapshots=[OLD, OLD, NEW]))
+    assert purge_expired_rows(CUTOFF, batch_size=1, dry_run=True, pause=0) == 2
+    assert purge_expired_snapshots(CUTOFF, dry_run=True) == 2
+    assert len(db.videos) == 2 and len(db.snapshots) == 3
+    assert not any(query.startswith(("DELETE", "REPLACE")) for query, _ in db.queries)
+
+def test_purge_expired_snapshots_in_batches(monkeypatch):
+    """再生数の履歴を batch_size 件ずつ削除することのテスト"""
+    db = _use(monkeypatch, FakeDatabase({}, snapshots=[OLD] * 5 + [NEW]))
+    assert purge_expired_snapshots(CUTOFF, batch_size=2, pause=0) == 5
+    assert db.snapshots == [NEW]
+    assert db.commits == 3
+
+def test_drop_expired_partitions(monkeypatch):
+    """上限が境界以下のパーティションだけを DROP することのテスト（非パーティションの表では何もしない）"""
+    cutoff_days = CUTOFF.toordinal() + 365
+    partitions = [
+        ("p_old", "RANGE", "to_days(`fetch_date`)", str(cutoff_days - 10)),
+        ("p_edge", "RANGE", "to_days(`fetch_date`)", str(cutoff_days)),
+        ("p_new", "RANGE", "to_days(`fetch_date`)", str(cutoff_days + 10)),
+        ("p_max", "RANGE", "to_days(`fetch_date`)", "MAXVALUE")
+    ]
+    db = _use(monkeypatch, FakeDatabase({}, partitions=partitions))
+    assert drop_expired_partitions(CUTOFF) == ["p_old", "p_edge"]
+    assert ("ALTER TABLE videos DROP PARTITION p_old, p_edge", ()) in db.queries
+
+    db = _use(monkeypatch, FakeDatabase({}))
+    assert drop_expired_partitions(CUTOFF) == []
+    assert not any(query.startswith("ALTER") for query, _ in db.queries)
+
+def test_run_retention_partitioned_and_archive(monkeypatch):
+    """パーティション化された表では DROP 後に残りを削除し、アーカイブ時は DROP しないことのテスト"""
+    partitions = [("p_old", "RANGE COLUMNS", "`fetch_date`", "'2025-02-01 00:00:00'")]
+    monkeypatch.setattr(retention, "get_retention_cutoff", lambda days: CUTOFF)
+
+    db = _use(monkeypatch, FakeDatabase({1: OLD, 2: NEW}, snapshots=[OLD], partitions=partitions))
+    result = run_retention(batch_size=10)
+    assert result["dropped_partitions"] == ["p_old"]
+    assert (result["rows"], result["snapshots"]) == (1, 1)
+
+    db = _use(monkeypatch, FakeDatabase({1: OLD, 2: NEW}, partitions=partitions))
+    result = run_retention(batch_size=10, archive=True)
+    assert result["dropped_partitions"] == [] and result["archived"]
+    assert db.archive == {1: OLD}
+    assert not any(query.startswith("ALTER") for query, _ in db.queries)
@@ -0,0 +1,68 @@
+from datetime import datetime
+from app.scheduler import PollingScheduler, next_poll_interval, plan_calls
+
+def _item(i, item_type="video"):
+    return {"id": i, "item_type": item_type, "item_value": str(i), "interval_seconds": 600, "last_velocity": 50.0}
+
+def test_next_poll_interval():
+    """伸びが速いほど取得間隔が短くなることのテスト"""
+    assert next_poll_interval(0, 10000, 300, 86400) == 86400
+    assert next_poll_interval(10000, 10000, 300, 86400) == 3600
+    assert next_poll_interval(10**7, 10000, 300, 86400) == 300
+    assert next_poll_interval(1, 10000, 300, 86400) == 86400
+
+def test_plan_calls_batches_videos_within_budget():
+    """動画はまとめて1回の呼び出しにし、上限回数までに抑えることのテスト"""
+    items = [_item(i) for i in range(5)] + [_item(100, "hashtag")] + [_item(i) for i in range(5, 7)]
+    calls = plan_calls(items, budget=10, video_batch_size=3)
+    assert [(kind, [item["id"] for item in batch]) for kind, batch in calls] == [
+        ("video", [0, 1, 2]), ("hashtag", [100]), ("video", [3, 4, 5]), ("video", [6])
+    ]
+    assert len(plan_calls(items, budget=2, video_batch_size=3)) == 2
+
+def test_schedule_backs_off_on_failure():
+    """取得に失敗した対象は間隔を倍にして再試行することのテスト"""
+    scheduler = PollingScheduler(use_mock=True)
+    now = datetime(2025, 3, 20)
+    update = scheduler._schedule(_item(1), None, now)
+    assert update["interval_seconds"] == 1200
+    assert update["last_velocity"] == 50.0
+    assert 1080 <= (update["next_poll_at"] - now).total_seconds() <= 1320
+
+def test_schedule_keeps_interval_until_velocity_is_known():
+    """履歴が1回分で伸びが分からない対象は、最長間隔にせず現在の間隔で再取得することのテスト"""
+    scheduler = PollingScheduler(use_mock=True)
+    now = datetime(2025, 3, 20)
+    update = scheduler._schedule(_item(1), float("nan"), now)
+    assert update["interval_seconds"] == 600
+    assert update["last_velocity"] == 50.0
+
+def test_fetch_treats_empty_result_as_failure(monkeypatch):
+    """空の取得結果は伸び0ではなく取得失敗として扱うことのテスト"""
+    scheduler = PollingScheduler(use_mock=True)
+
+    async def no_videos(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(scheduler.api_client, "get_hashtag_videos", no_videos)
+    assert scheduler._fetch("hashtag", [_item(1, "hashtag")]) == {}
+
+def test_spread_overdue_items_on_restart(monkeypatch):
+    """停止中に予定を過ぎた対象は、再開時に呼び出し単位で取得間隔の中に均等に割り振り直すことのテスト"""
+    import app.scheduler as scheduler_module
+
+    now = datetime(2025, 3, 20)
+    overdue = [_item(i) for i in range(4)] + [_item(100, "hashtag"), _item(101, "hashtag")]
+    saved = []
+    monkeypatch.setattr(scheduler_module, "get_due_watch_items", lambda now: overdue)
+    monkeypatch.setattr(scheduler_module, "set_next_poll_times", saved.extend)
+
+    scheduler = PollingScheduler(use_mock=True, budget=2)
+    assert scheduler.spread_overdue(now, window=300) == 6
+    offsets = {item_id: (next_poll_at - now).total_seconds() for item_id, next_poll_at in saved}
+    assert offsets == {100: 0, 101: 100, 0: 200, 1: 200, 2: 200, 3: 200}
+
+    # 1回の処理で取得しきれる場合は予定を変えない
+    saved.clear()
+    assert PollingScheduler(use_mock=True, budget=3).spread_overdue(now, window=300) == 0
+    assert saved == []
@@ -0,0 +1,138 @@
+from datetime import datetime
+from app.models import VideoBatch, VideoData
+from app.security.pseudonymization import Pseudonymizer
+
+def _batch(creators):
+    return VideoBatch.from_videos([
+        VideoData(
+            video_id=str(i), creator_id=creator, creator_name=f"{creator}の名前", video_url="",
+            view_count=i, like_count=0, comment_count=0, share_count=0,
+            post_date=datetime(2025, 3, 1), fetch_date=datetime(2025, 3, 20), description="説明文"
+        )
+        for i, creator in enumerate(creators)
+    ])
+
+def test_pseudonymize_is_deterministic():
+    """同じ鍵なら別インスタンス（別プロセス相当）でも同じ仮名になることのテスト"""
+    first = Pseudonymizer(key=b"secret")
+    second = Pseudonymizer(key=b"secret", cache_size=1)
+    assert first.pseudonymize("creator_1") == second.pseudonymize("creator_1")
+    assert first.pseudonymize("creator_1") != first.pseudonymize("creator_2")
+    assert Pseudonymizer(key=b"other").pseudonymize("creator_1") != first.pseudonymize("creator_1")
+
+def test_pseudonymize_batch():
+    """バッチ単位の仮名化のテスト"""
+    pseudonymizer = Pseudonymizer(key=b"secret")
+    batch = pseudonymizer.pseudonymize_batch(_batch(["a", "b", "a"]))
+
+    creator_ids = batch.column("creator_id").tolist()
+    assert creator_ids[0] == creator_ids[2] == pseudonymizer.pseudonymize("a")
+    assert creator_ids[1] == pseudonymizer.pseudonymize("b")
+    assert batch.column("creator_name").tolist() == ["Anonymous"] * 3
+    assert len(batch.codes("creator_name")[1]) == 1
+
+def test_load_or_create_key(tmp_path, monkeypatch):
+    """鍵ファイルが一度だけ生成され、以降は同じ鍵が使われることのテスト"""
+    from app.security.keys import load_or_create_key
+    monkeypatch.delenv("TEST_KEY", raising=False)
+    key_file = str(tmp_path / "keys" / ".test_key")
+
+    key = load_or_create_key("TEST_KEY", key_file, lambda: b"generated")
+    assert key == b"generated"
+    assert load_or_create_key("TEST_KEY", key_file, lambda: b"another") == b"generated"
+
+    monkeypatch.setenv("TEST_KEY", "from-env")
+    assert load_or_create_key("TEST_KEY", key_file, lambda: b"another") == b"from-env"
+
+def test_load_or_create_key_concurrent(tmp_path, monkeypatch):
+    """同時に生成しても全員が同じ鍵を使い、書きかけ（空）の鍵を読まないことのテスト"""
+    import os
+    import threading
+    from app.security.keys import load_or_create_key
+    monkeypatch.delenv("TEST_KEY", raising=False)
+    key_file = str(tmp_path / ".test_key")
+    keys = []
+
+    def worker(i):
+        keys.append(load_or_create_key("TEST_KEY", key_file, lambda: f"key-{i}".encode()))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(keys)) == 1 and keys[0]
+    assert os.listdir(tmp_path) == [".test_key"]
+    assert os.stat(key_file).st_mode & 0o777 == 0o600
+
+def test_encrypt_batch_and_decrypt_rows():
+    """列単位の暗号化と読み出し時の復号化のテスト"""
+    from cryptography.fernet import Fernet
+    from app.security.data_protection import DataProtection, is_encrypted
+
+    dp = DataProtection(key=Fernet.generate_key())
+    batch = _batch(["a", "b", "a"])
+    encrypted = dp.encrypt_batch(batch, columns=["description"])
+
+    rows = encrypted.to_records()
+    assert all(is_encrypted(row["description"]) for row in rows)
+    assert rows[0]["creator_id"] == "a"
+
+    # 暗号化導入前の平文の行はそのまま読める
+    rows.append({"description": "平文のまま"})
+    # 暗号化済みの値と同じ文字列で始まるだけの平文も読み出しを止めない
+    rows.append({"description": "gAAAAAで始まる平文"})
+    rows.append({"description": "gAAAAABnot-a-token"})
+    assert [row["description"] for row in dp.decrypt_rows(rows)] == (
+        ["説明文"] * 3 + ["平文のまま", "gAAAAAで始まる平文", "gAAAAABnot-a-token"]
+    )
+
+def test_encrypt_values_parallel(monkeypatch):
+    """プロセスプールでの並列暗号化のテスト"""
+    import app.security.data_protection as data_protection
+    from cryptography.fernet import Fernet
+
+    monkeypatch.setattr(data_protection, "ENCRYPT_PARALLEL_THRESHOLD", 4)
+    dp = data_protection.DataProtection(key=Fernet.generate_key())
+    values = [f"value_{i}" for i in range(10)] + [None]
+    tokens = dp.encrypt_values(values, workers=2)
+    assert [dp.decrypt_value(t) for t in tokens] == values
+
+def test_check_encryption_key(monkeypatch):
+    """ENCRYPTION_KEY の形式の誤りを起動時に検出し、未設定なら鍵ファイルに任せることのテスト"""
+    import pytest
+    from cryptography.fernet import Fernet
+    from app.security.data_protection import check_encryption_key
+
+    monkeypatch.setenv("ENCRYPTION_KEY", "your_encryption_key_here")
+    with pytest.raises(ValueError, match="ENCRYPTION_KEY"):
+        check_encryption_key()
+    monkeypatch.setenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    check_encryption_key()
+    monkeypatch.delenv("ENCRYPTION_KEY")
+    check_encryption_key()
+
+def test_pseudonymizer_cache_is_thread_safe():
+    """複数のスレッドから同時に使ってもキャッシュが壊れず、同じ仮名を返すことのテスト"""
+    import threading
+
+    pseudonymizer = Pseudonymizer(key=b"secret", cache_size=8)
+    expected = {f"creator_{i}": Pseudonymizer(key=b"secret").pseudonymize(f"creator_{i}") for i in range(32)}
+    errors = []
+
+    def worker(offset):
+        try:
+            for n in range(2000):
+                value = f"creator_{(n + offset) % 32}"
+                assert pseudonymizer.pseudonymize(value) == expected[value]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(pseudonymizer._cache) <= 8
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import numpy as np
+from app.models import VideoBatch
+from app.sketches import KLLSketch, RunningMoments, SpaceSaving, StreamingStats, TrendingTracker, record_trending
+
+def _batch(views):
+    n = len(views)
+    return VideoBatch.from_columns({
+        "video_id": [str(i) for i in range(n)], "creator_id": ["creator"] * n, "creator_name": [None] * n,
+        "video_url": [None] * n, "view_count": views, "like_count": views // 10,
+        "comment_count": views // 100, "share_count": views // 1000,
+        "post_date": np.zeros(n, dtype="datetime64[us]"), "fetch_date": np.zeros(n, dtype="datetime64[us]"),
+        "description": [None] * n, "music_title": [None] * n, "music_author": [None] * n, "hashtags": [None] * n
+    })
+
+def _tagged_batch(hashtags, creators, start=0):
+    """ハッシュタグ・クリエイターを指定したバッチ（動画IDは start からの連番）"""
+    b = _batch(np.arange(1, len(hashtags) + 1, dtype=np.int64) * 1000)
+    columns = {name: b.column(name) for name in VideoBatch.INT_COLUMNS + VideoBatch.DATETIME_COLUMNS}
+    columns.update({name: list(b.column(name)) for name in VideoBatch.STRING_COLUMNS})
+    columns.update(hashtags=hashtags, creator_id=creators, video_id=[str(start + i) for i in range(len(hashtags))])
+    return VideoBatch.from_columns(columns)
+
+NOW = 1_750_000_000.0
+
+def test_running_moments_merge():
+    """ページ単位の追加・マージがまとめて計算した結果と一致することのテスト"""
+    values = np.random.default_rng(0).integers(0, 10**6, 10000)
+    left, right = RunningMoments(), RunningMoments()
+    for page in np.array_split(values[:6000], 7):
+        left.update(page)
+    right.update(values[6000:])
+    left.merge(right)
+
+    assert left.count == 10000
+    assert left.total == values.sum()
+    assert abs(left.mean - values.mean()) < 1e-6
+    assert abs(left.variance - values.var(ddof=1)) / values.var() < 1e-9
+    assert (left.min, left.max) == (values.min(), values.max())
+
+def test_kll_quantiles_bounded_memory():
+    """KLLスケッチの分位点の誤差と保持件数のテスト"""
+    values = np.random.default_rng(1).permutation(100000)
+    sketch = KLLSketch(k=200, seed=0)
+    for page in np.array_split(values, 100):
+        sketch.update(page)
+
+    assert len(sketch) == 100000
+    assert sum(len(level) for level in sketch.compactors) < 1000
+    for q, estimate in zip((0.5, 0.9, 0.99), sketch.quantiles((0.5, 0.9, 0.99))):
+        assert abs(estimate / 100000 - q) < 0.02
+
+def test_streaming_stats_serialize_and_merge():
+    """ワーカーごとの統計をJSON経由で合成できることのテスト"""
+    views = np.random.default_rng(2).integers(1000, 10**6, 4000)
+    workers = [StreamingStats(), StreamingStats()]
+    for i, page in enumerate(np.array_split(views, 8)):
+        workers[i % 2].update(_batch(page))
+
+    merged = StreamingStats.from_dict(json.loads(json.dumps(workers[0].to_dict())))
+    merged.merge(StreamingStats.from_dict(json.loads(json.dumps(workers[1].to_dict()))))
+    result = merged.result()
+
+    assert merged.count == 4000
+    assert result["views"]["sum"] == views.sum()
+    assert result["views"]["max"] == views.max()
+    assert abs(result["views"]["std"] - views.std(ddof=1)) / views.std() < 1e-9
+    assert abs(result["views"]["median"] - np.median(views)) / np.median(views) < 0.05
+
+def test_space_saving_heavy_hitters():
+    """Space-Savingで頻出要素が誤差の範囲内で求まることのテスト"""
+    rng = np.random.default_rng(3)
+    items = rng.zipf(1.5, 50000) % 5000
+    summary = SpaceSaving(capacity=100)
+    for page in np.array_split(items, 50):
+        values, counts = np.unique(page, return_counts=True)
+        summary.update({str(v): int(c) for v, c in zip(values, counts)})
+
+    values, counts = np.unique(items, return_counts=True)
+    exact = dict(zip(map(str, values), counts.tolist()))
+    top = summary.top(5)
+    assert len(summary) == 100
+    assert [entry["item"] for entry in top] == [str(v) for v in values[np.argsort(-counts)[:5]]]
+    for entry in top:
+        assert entry["guaranteed"] <= exact[entry["item"]] <= entry["count"]
+
+def test_trending_tracker_persist_and_merge(tmp_path):
+    """個々のハッシュタグの集計と、保存・合成のテスト"""
+    path = str(tmp_path / "trending.json")
+    record_trending(_tagged_batch(["#ダンス #猫", "#猫", None], ["a", "b", "a"]), path, now=NOW)
+    tracker = record_trending(_tagged_batch(["#猫 #料理"], ["c"], start=3), path, now=NOW)
+    assert tracker.top("hashtags", 1) == [{"item": "#猫", "count": 3, "guaranteed": 3}]
+
+    other = TrendingTracker()
+    other.update(_tagged_batch(["#料理", "#料理"], ["c", "c"], start=4), now=NOW)
+    tracker = TrendingTracker.load(path)
+    tracker.merge(other)
+    assert [e["item"] for e in tracker.top("creators", 2)] == ["c", "a"]
+    assert {(e["item"], e["count"]) for e in tracker.top("hashtags", 2)} == {("#猫", 3), ("#料理", 3)}
+
+def test_trending_tracker_skips_counted_videos_and_decays():
+    """再取得した動画は数え直さず、古い件数は半減期ごとに減衰することのテスト"""
+    tracker = TrendingTracker(half_life_hours=24, seen_hours=24)
+    tracker.update(_tagged_batch(["#猫", "#猫"], ["a", "a"]), now=NOW)
+    tracker.update(_tagged_batch(["#猫", "#猫", "#犬"], ["a", "a", "b"]), now=NOW + 3600)
+    assert [(e["item"], round(e["count"], 3)) for e in tracker.top("hashtags")] == [
+        ("#猫", round(2 * 0.5 ** (1 / 24), 3)), ("#犬", 1)
+    ]
+
+    # 数えてから seen_hours を過ぎた動画は再び数え、それまでの件数は半分になる
+    tracker.update(_tagged_batch(["#犬", "#犬"], ["b", "b"], start=5), now=NOW + 3600 + 48 * 3600)
+    tracker.update(_tagged_batch(["#猫"], ["a"]), now=NOW + 3600 + 48 * 3600)
+    hashtags = {e["item"]: e["count"] for e in tracker.top("hashtags")}
+    assert hashtags["#犬"] == 1 / 4 + 2
+    assert abs(hashtags["#猫"] - (2 * 0.5 ** (49 / 24) + 1)) < 1e-9
+
+    restored = TrendingTracker.from_dict(json.loads(json.dumps(tracker.to_dict())))
+    assert restored.top("hashtags") == tracker.top("hashtags")
+    assert restored.seen == tracker.seen
+
+def test_record_trending_concurrent_updates(tmp_path):
+    """複数のスレッドから同時に記録しても更新が失われないことのテスト"""
+    path = str(tmp_path / "trending.json")
+
+    def record(worker):
+        for page in range(5):
+            record_trending(_tagged_batch(["#猫"] * 4, ["a"] * 4, start=worker * 100 + page * 4), path, now=NOW)
+
+    threads = [threading.Thread(target=record, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert TrendingTracker.load(path).top("hashtags") == [{"item": "#猫", "count": 80, "guaranteed": 80}]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+def test_trending_tracker_seen_ids_are_bounded():
+    """覚えておく動画IDが上限を超えた場合は古いものから忘れ、保存する状態が一定に収まることのテスト"""
+    tracker = TrendingTracker(seen_capacity=5)
+    for page in range(4):
+        tracker.update(_tagged_batch(["#猫"] * 3, ["a"] * 3, start=page * 3), now=NOW + page)
+    assert list(tracker.seen) == ["7", "8", "9", "10", "11"]
+    assert len(TrendingTracker.from_dict(json.loads(json.dumps(tracker.to_dict()))).seen) == 5
+
+    # 忘れた動画は再び数える
+    tracker.update(_tagged_batch(["#犬"], ["b"]), now=NOW + 4)
+    assert {e["item"] for e in tracker.top("hashtags")} == {"#猫", "#犬"}
+    assert list(tracker.seen)[-1] == "0"
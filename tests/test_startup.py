@@ -0,0 +1,30 @@
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# コマンドラインの起動時に読み込んではいけない重い依存
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "mysql", "requests", "pytz", "webbrowser", "tabulate"]
+# app.main の読み込みにかける時間の上限（マイクロ秒）
+IMPORT_BUDGET_US = 100_000
+
+def _run(args, cwd):
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+def test_main_import_is_light(tmp_path):
+    """app.main の読み込みで重い依存を読み込まず、時間が上限内であることのテスト"""
+    code = f"import sys, app.main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = _run(["-X", "importtime", "-c", code], tmp_path)
+    assert result.stdout.strip() == ""
+
+    cumulative = re.search(r"\|\s*(\d+) \| app\.main$", result.stderr, re.MULTILINE)
+    assert int(cumulative.group(1)) < IMPORT_BUDGET_US
+
+def test_help_has_no_side_effects(tmp_path):
+    """--help がログファイルなどを作らずに終了することのテスト"""
+    result = _run(["-m", "app.main", "--help"], tmp_path)
+    assert "--jobs" in result.stdout
+    assert os.listdir(tmp_path) == []
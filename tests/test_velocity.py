@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+import numpy as np
+from app.velocity import compute_velocity, robust_zscores
+
+def _snapshots(video_id, hashtags, views):
+    start = datetime(2025, 3, 20)
+    return [
+        {"video_id": video_id, "fetch_date": start + timedelta(hours=2 * i), "view_count": v, "hashtags": hashtags}
+        for i, v in enumerate(views)
+    ]
+
+def test_compute_velocity():
+    """再生数/時と加速度の計算のテスト"""
+    rows = (
+        _snapshots("b", "#猫", [0, 100, 400])
+        + _snapshots("a", "#猫 #かわいい", [1000, 1200])
+        + _snapshots("c", None, [500])
+    )
+    result = compute_velocity(rows).set_index("video_id")
+
+    assert list(result.index) == ["b", "a", "c"]
+    assert result.loc["b", "views_per_hour"] == 150
+    assert result.loc["b", "acceleration"] == (150 - 50) / 2
+    assert result.loc["a", "views_per_hour"] == 100
+    assert result.loc["a", "observations"] == 2
+    assert result.loc["c", "views_per_hour"] == 0
+    assert result.loc["c", "cohort"] == "(なし)"
+
+def test_robust_zscores_by_cohort():
+    """コホートごとのロバストzスコアで外れ値が検出されることのテスト"""
+    values = np.array([10, 11, 9, 10, 12, 200, 1000, 1100, 900, 1000, 1050, 1000], dtype=np.float64)
+    cohorts = np.array(["#猫"] * 6 + ["#犬"] * 6)
+    z = robust_zscores(values, cohorts)
+
+    assert abs(z[5]) > 3.5
+    # 別のコホートでは大きな値でも外れ値にならない
+    assert (np.abs(z[6:]) < 3.5).all()
+
+def test_only_surges_are_anomalies():
+    """コホートより大きく伸びた動画だけが急上昇となり、伸びが止まった動画は含まれないことのテスト"""
+    rows = [row for i, gained in enumerate([200, 200, 210, 190, 200]) for row in _snapshots(f"n{i}", "#猫", [0, gained])]
+    rows += _snapshots("up", "#猫", [0, 2000]) + _snapshots("down", "#猫", [0, 0])
+    result = compute_velocity(rows).set_index("video_id")
+
+    assert result.loc["down", "robust_z"] < -3.5
+    assert list(result.index[result["is_anomaly"]]) == ["up"]